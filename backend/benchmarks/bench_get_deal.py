@@ -0,0 +1,86 @@
+"""
+Benchmark GET /api/deals/{id} with per-call connections vs the shared pool.
+
+Usage (from backend/):
+    python benchmarks/bench_get_deal.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import aiosqlite  # noqa: E402
+import httpx  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+
+async def get_deal_by_id_per_call(deal_id: str):
+    """Pre-pool implementation: one aiosqlite connection per call."""
+    async with aiosqlite.connect(database.DATABASE_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
+        row = await cursor.fetchone()
+        if row:
+            return database.row_to_deal_response(row)
+        return None
+
+
+async def run_load(deal_ids: list[str], total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(total))
+
+        async def worker():
+            for i in counter:
+                response = await client.get(f"/api/deals/{deal_ids[i % len(deal_ids)]}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, "bench.db")
+        database.MIGRATIONS_PATH = MIGRATIONS_DIR
+        database.DB_POOL_SIZE = args.pool_size
+        await database.init_db()
+        await database.init_pool()
+
+        deal_ids = []
+        for i in range(args.deals):
+            deal_id = str(uuid.uuid4())
+            await database.create_deal(deal_id, f"hash-{i}", f"Deal text {i} " * 50)
+            deal_ids.append(deal_id)
+
+        pooled_get = main.get_deal_by_id
+        main.get_deal_by_id = get_deal_by_id_per_call
+        before = await run_load(deal_ids, args.requests, args.concurrency)
+        main.get_deal_by_id = pooled_get
+        after = await run_load(deal_ids, args.requests, args.concurrency)
+
+        await database.close_pool()
+
+    print(f"requests={args.requests} concurrency={args.concurrency} pool_size={args.pool_size}")
+    print(f"per-call connections: {before:8.1f} req/s")
+    print(f"pooled connections:   {after:8.1f} req/s")
+    print(f"speedup:              {after / before:8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deals", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=database.DB_POOL_SIZE)
+    asyncio.run(main_async(parser.parse_args()))
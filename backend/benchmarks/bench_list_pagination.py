@@ -0,0 +1,139 @@
+"""
+Compare keyset pagination with OFFSET pagination at increasing page depths.
+
+Builds a synthetic deals table (one million rows by default), then times
+fetching a page at each depth with list_deals(cursor=...) vs LIMIT/OFFSET.
+
+Usage (from backend/):
+    python benchmarks/bench_list_pagination.py --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import database  # noqa: E402
+from migrator import discover_migrations  # noqa: E402
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+STATUSES = ["completed", "completed", "completed", "failed", "pending"]
+SECTORS = ["Fintech", "Healthcare", "Climate", "AI", "Consumer"]
+TAGS = ["fintech", "healthtech", "climate tech", "ai", "consumer"]
+
+
+def build_table(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    # Schema only; deal_tags is filled in bulk below instead of by the backfill
+    for migration in discover_migrations(MIGRATIONS_DIR):
+        if not migration.backfill:
+            conn.executescript(migration.sql)
+
+    start = datetime(2020, 1, 1)
+
+    def generate():
+        for i in range(rows):
+            created = (start + timedelta(seconds=i)).isoformat()
+            tag = TAGS[i % len(TAGS)]
+            yield (
+                f"{i:08d}", f"hash-{i}", "synthetic deal text", STATUSES[i % len(STATUSES)],
+                f"Company {i}", SECTORS[i % len(SECTORS)], "Seed", json.dumps([tag]),
+                created, created,
+            )
+
+    conn.executemany(
+        """
+        INSERT INTO deals (id, content_hash, raw_text, status, company_name, sector,
+                           stage, tags, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        generate(),
+    )
+    conn.execute(
+        """
+        INSERT INTO deal_tags (tag, created_at, deal_id)
+        SELECT j.value, d.created_at, d.id FROM deals d, json_each(d.tags) j
+        """
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def time_call(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Building synthetic table with {args.rows:,} rows...")
+        build_table(path, args.rows)
+
+        database.DATABASE_PATH = path
+        await database.init_pool()
+
+        filters = [("none", {}), ("status", {"status": "completed"}), ("tag", {"tag": "ai"})]
+        depths = [d for d in (0, 1_000, 10_000, 100_000, 500_000, 900_000) if d < args.rows]
+
+        print(f"{'filter':<8} {'depth':>9} {'keyset ms':>10} {'offset ms':>10}")
+        for label, kwargs in filters:
+            for depth in depths:
+                async with database.connection() as db:
+                    where, params = "", []
+                    if "status" in kwargs:
+                        where, params = "WHERE status = ?", [kwargs["status"]]
+                    if "tag" in kwargs:
+                        where = "WHERE id IN (SELECT deal_id FROM deal_tags WHERE tag = ?)"
+                        params = [kwargs["tag"]]
+
+                    # Position of the row just before the requested depth
+                    cursor = None
+                    if depth:
+                        cur = await db.execute(
+                            f"SELECT created_at, id FROM deals {where} "
+                            "ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+                            params + [depth - 1],
+                        )
+                        row = await cur.fetchone()
+                        if row is None:
+                            continue
+                        cursor = database.encode_cursor(row[0], row[1])
+
+                async def keyset():
+                    await database.list_deals(limit=args.limit, cursor=cursor, full=True, **kwargs)
+
+                async def offset():
+                    async with database.connection() as db:
+                        cur = await db.execute(
+                            f"SELECT * FROM deals {where} "
+                            "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                            params + [args.limit, depth],
+                        )
+                        rows = await cur.fetchall()
+                        [database.row_to_deal_response(r) for r in rows]
+
+                keyset_ms = await time_call(keyset, args.repeat)
+                offset_ms = await time_call(offset, args.repeat)
+                print(f"{label:<8} {depth:>9,} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+
+        await database.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main_async(parser.parse_args()))
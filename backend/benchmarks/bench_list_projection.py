@@ -0,0 +1,89 @@
+"""
+Measure response size and CPU time of GET /api/deals, summary vs full rows.
+
+Seeds completed deals with realistic raw_text and extracted fields, then
+calls the list endpoint the way DealList.tsx does.
+
+Usage (from backend/):
+    python benchmarks/bench_list_projection.py --calls 500 --limit 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+from models import ExtractedDeal  # noqa: E402
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+EXTRACTED = ExtractedDeal(
+    company_name="Bench Co",
+    founders=["A. Founder", "B. Founder"],
+    sector="Fintech",
+    geography="US",
+    stage="Series A",
+    round_size="$10M",
+    metrics={"ARR": "$2M", "growth": "200% YoY", "customers": "150"},
+    investment_brief=[f"Investment highlight number {i} with some detail" for i in range(8)],
+    tags=["fintech", "Series A", "payments"],
+)
+
+
+async def measure(client: httpx.AsyncClient, params: dict, calls: int) -> tuple[float, float]:
+    total_bytes = 0
+    cpu_start = time.process_time()
+    for _ in range(calls):
+        response = await client.get("/api/deals", params=params)
+        response.raise_for_status()
+        total_bytes += len(response.content)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    return total_bytes / calls, cpu_ms / calls
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, "bench.db")
+        database.MIGRATIONS_PATH = MIGRATIONS_DIR
+        await database.init_db()
+        await database.init_pool()
+
+        raw_text = "Pitch email paragraph with traction and team details. " * 150
+        for i in range(args.limit):
+            deal_id = str(uuid.uuid4())
+            await database.create_deal(deal_id, f"hash-{i}", raw_text)
+            await database.update_deal_extracted(deal_id, EXTRACTED)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            full_bytes, full_cpu = await measure(
+                client, {"limit": args.limit, "full": "true"}, args.calls
+            )
+            summary_bytes, summary_cpu = await measure(
+                client, {"limit": args.limit}, args.calls
+            )
+
+        await database.close_pool()
+
+    print(f"calls={args.calls} limit={args.limit}")
+    print(f"full:    {full_bytes:10.0f} bytes/call {full_cpu:8.3f} CPU ms/call")
+    print(f"summary: {summary_bytes:10.0f} bytes/call {summary_cpu:8.3f} CPU ms/call")
+    print(
+        f"reduction: {100 * (1 - summary_bytes / full_bytes):.1f}% bytes, "
+        f"{100 * (1 - summary_cpu / full_cpu):.1f}% CPU"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    asyncio.run(main_async(parser.parse_args()))
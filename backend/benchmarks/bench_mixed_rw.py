@@ -0,0 +1,93 @@
+"""
+Measure mixed read/write throughput under different SQLite journal modes.
+
+Writers mimic the extraction pipeline (status updates plus the final
+extracted-data write) while readers hit list_deals, as the UI does.
+
+Usage (from backend/):
+    python benchmarks/bench_mixed_rw.py --seconds 5 --modes DELETE WAL
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import database  # noqa: E402
+from models import DealStatus, ExtractedDeal  # noqa: E402
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+EXTRACTED = ExtractedDeal(
+    company_name="Bench Co",
+    founders=["A. Founder"],
+    sector="Fintech",
+    stage="Seed",
+    metrics={"ARR": "$1M"},
+    investment_brief=["Fast growth", "Strong team"],
+    tags=["fintech"],
+)
+
+
+async def run_mode(journal_mode: str, args) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, "bench.db")
+        database.MIGRATIONS_PATH = MIGRATIONS_DIR
+        database.SQLITE_PRAGMAS["journal_mode"] = journal_mode
+        database.DB_POOL_SIZE = args.writers + args.readers
+        await database.init_db()
+        await database.init_pool()
+
+        deal_ids = []
+        for i in range(args.deals):
+            deal_id = str(uuid.uuid4())
+            await database.create_deal(deal_id, f"hash-{i}", f"Deal text {i} " * 50)
+            deal_ids.append(deal_id)
+
+        deadline = time.perf_counter() + args.seconds
+        writes = reads = 0
+
+        async def writer(offset: int):
+            nonlocal writes
+            i = offset
+            while time.perf_counter() < deadline:
+                deal_id = deal_ids[i % len(deal_ids)]
+                await database.update_deal_status(deal_id, DealStatus.EXTRACTING)
+                await database.update_deal_status(deal_id, DealStatus.VALIDATING)
+                await database.update_deal_extracted(deal_id, EXTRACTED)
+                writes += 3
+                i += args.writers
+
+        async def reader():
+            nonlocal reads
+            while time.perf_counter() < deadline:
+                await database.list_deals(limit=10)
+                reads += 1
+
+        await asyncio.gather(
+            *(writer(i) for i in range(args.writers)),
+            *(reader() for _ in range(args.readers)),
+        )
+        await database.close_pool()
+        return writes / args.seconds, reads / args.seconds
+
+
+async def main_async(args):
+    print(f"writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    for mode in args.modes:
+        writes, reads = await run_mode(mode, args)
+        print(f"journal_mode={mode:<8} writes/s={writes:8.1f} reads/s={reads:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deals", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--modes", nargs="+", default=["DELETE", "WAL"])
+    asyncio.run(main_async(parser.parse_args()))
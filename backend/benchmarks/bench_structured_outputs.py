@@ -0,0 +1,173 @@
+"""
+Compare JSON mode with schema-enforced structured outputs on a recorded corpus.
+
+`record` runs every deal text through the real extraction path in each mode
+(extract_deal_data, then local repair and repair_json as the pipeline would)
+and appends one JSON line per deal and mode: outcome, latency and token usage.
+It calls the OpenAI API, so OPENAI_API_KEY must be set. Deal texts come from
+a directory of .txt files, a JSONL file with a "raw_text" field per line, or
+the raw_text column of an existing deals database.
+
+`report` summarises one or more recordings per mode: share of deals that
+failed first validation, share that needed an LLM repair round trip,
+failures, p50/p95 latency including repairs, and tokens per deal.
+
+Usage (from backend/):
+    python benchmarks/bench_structured_outputs.py record --input corpus/ --output run.jsonl
+    python benchmarks/bench_structured_outputs.py record --from-db data/deals.db --limit 50 --output run.jsonl
+    python benchmarks/bench_structured_outputs.py report run.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pydantic import ValidationError  # noqa: E402
+
+import llm_service  # noqa: E402
+from json_repair import repair_locally  # noqa: E402
+
+MODES = {"json_object": False, "structured": True}
+
+
+def load_corpus(args) -> list[str]:
+    texts = []
+    if args.from_db:
+        conn = sqlite3.connect(args.from_db)
+        texts = [row[0] for row in conn.execute("SELECT raw_text FROM deals ORDER BY created_at")]
+        conn.close()
+    elif os.path.isdir(args.input):
+        for name in sorted(os.listdir(args.input)):
+            if name.endswith(".txt"):
+                with open(os.path.join(args.input, name)) as f:
+                    texts.append(f.read())
+    else:
+        with open(args.input) as f:
+            texts = [json.loads(line)["raw_text"] for line in f if line.strip()]
+    return texts[:args.limit] if args.limit else texts
+
+
+async def run_one(text: str) -> dict:
+    """Extract one deal the way process_deal_extraction does, recording usage."""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "calls": 0}
+    create = llm_service.create_chat_completion
+
+    async def recording_create(messages, **kwargs):
+        response = await create(messages, **kwargs)
+        usage["calls"] += 1
+        if response.usage is not None:
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                usage[key] += getattr(response.usage, key)
+        return response
+
+    llm_service.create_chat_completion = recording_create
+    try:
+        start = time.perf_counter()
+        response = await llm_service.extract_deal_data(text)
+        extract_ms = (time.perf_counter() - start) * 1000
+        repair_ms = 0.0
+        outcome, error = "valid", None
+        for attempt in range(llm_service.MAX_RETRIES):
+            try:
+                await llm_service.validate_and_parse(response)
+                break
+            except (json.JSONDecodeError, ValidationError) as e:
+                error = str(e)
+                if repair_locally(response)[0] is not None:
+                    outcome = "local_repair"
+                    break
+                if attempt == llm_service.MAX_RETRIES - 1:
+                    outcome = "failed"
+                    break
+                outcome = "llm_repair"
+                start = time.perf_counter()
+                response = await llm_service.repair_json(response, error)
+                repair_ms += (time.perf_counter() - start) * 1000
+    finally:
+        llm_service.create_chat_completion = create
+
+    return {
+        "outcome": outcome,
+        "error": error if outcome != "valid" else None,
+        "extract_ms": extract_ms,
+        "repair_ms": repair_ms,
+        **usage,
+    }
+
+
+async def record(args):
+    texts = load_corpus(args)
+    if not texts:
+        sys.exit("Corpus is empty")
+    modes = args.modes.split(",")
+    print(f"Recording {len(texts)} deal(s) x {len(modes)} mode(s) with {llm_service.EXTRACTION_MODEL}")
+    with open(args.output, "a") as out:
+        for index, text in enumerate(texts):
+            for mode in modes:
+                llm_service.EXTRACTION_STRUCTURED_OUTPUTS = MODES[mode]
+                result = await run_one(text)
+                result.update(deal=index, mode=mode, model=llm_service.EXTRACTION_MODEL)
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                print(f"  deal {index:>4} {mode:<12} {result['outcome']:<13} "
+                      f"{result['extract_ms'] + result['repair_ms']:>8.0f} ms "
+                      f"{result['total_tokens']:>6} tokens")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def report(args):
+    rows = []
+    for path in args.recordings:
+        with open(path) as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+
+    print(f"{'mode':<12} {'deals':>6} {'repair %':>9} {'llm rep %':>10} {'failed %':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'tokens/deal':>12}")
+    for mode in MODES:
+        group = [r for r in rows if r["mode"] == mode]
+        if not group:
+            continue
+        n = len(group)
+        latencies = [r["extract_ms"] + r["repair_ms"] for r in group]
+
+        def share(predicate):
+            return 100 * sum(map(predicate, group)) / n
+
+        print(f"{mode:<12} {n:>6} {share(lambda r: r['outcome'] != 'valid'):>9.1f} "
+              f"{share(lambda r: r['calls'] > 1):>10.1f} "
+              f"{share(lambda r: r['outcome'] == 'failed'):>9.1f} "
+              f"{percentile(latencies, 50):>8.0f} {percentile(latencies, 95):>8.0f} "
+              f"{sum(r['total_tokens'] for r in group) / n:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="run the corpus against the API")
+    source = rec.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="directory of .txt files or JSONL with raw_text")
+    source.add_argument("--from-db", help="SQLite deals database to read raw_text from")
+    rec.add_argument("--output", required=True, help="JSONL recording to append to")
+    rec.add_argument("--modes", default="json_object,structured")
+    rec.add_argument("--limit", type=int, default=0)
+
+    rep = commands.add_parser("report", help="summarise recordings")
+    rep.add_argument("recordings", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args))
+    else:
+        report(args)
@@ -0,0 +1,111 @@
+"""
+Benchmark WebSocket fan-out: sequential sends vs per-connection send queues.
+
+Thousands of fake subscribers watch one deal; a small share of them are slow.
+For each implementation it reports how long the broadcasting coroutine (the
+extraction pipeline) is blocked per broadcast, and when the last fast
+subscriber has received every message.
+
+Usage (from backend/):
+    python benchmarks/bench_websocket_fanout.py --subscribers 5000 --slow 0.01
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from models import DealStatus, WebSocketMessage  # noqa: E402
+from websocket import WebSocketManager  # noqa: E402
+
+STATUSES = [DealStatus.EXTRACTING, DealStatus.VALIDATING, DealStatus.COMPLETED]
+
+
+class FakeSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+        self.done_at = 0.0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.done_at = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+class SequentialManager(WebSocketManager):
+    """Pre-queue implementation: serialize and await each send in turn."""
+
+    async def connect(self, deal_id, websocket):
+        await websocket.accept()
+        self.connections.setdefault(deal_id, {})[websocket] = None
+
+    def _publish(self, deal_id, message):
+        raise NotImplementedError
+
+    async def broadcast_status(self, deal_id, status, error=None):
+        message = WebSocketMessage(type="status_update", deal_id=deal_id, status=status, error=error)
+        for websocket in list(self.connections.get(deal_id, ())):
+            await websocket.send_text(message.model_dump_json())
+
+
+def make_sockets(args) -> tuple[list[FakeSocket], list[FakeSocket]]:
+    slow_count = int(args.subscribers * args.slow)
+    fast = [FakeSocket(0) for _ in range(args.subscribers - slow_count)]
+    slow = [FakeSocket(args.slow_delay) for _ in range(slow_count)]
+    return fast, slow
+
+
+async def run(manager: WebSocketManager, args) -> tuple[float, float]:
+    fast, slow = make_sockets(args)
+    # Spread slow clients through the send order
+    sockets = list(fast)
+    step = max(1, len(fast) // (len(slow) + 1))
+    for i, socket in enumerate(slow):
+        sockets.insert((i + 1) * step + i, socket)
+    for socket in sockets:
+        await manager.connect("deal-1", socket)
+
+    start = time.perf_counter()
+    blocked = 0.0
+    for status in STATUSES:
+        before = time.perf_counter()
+        await manager.broadcast_status("deal-1", status)
+        blocked += time.perf_counter() - before
+    while any(s.received < len(STATUSES) for s in fast):
+        await asyncio.sleep(0.001)
+    fast_done = max(s.done_at for s in fast) - start
+
+    if not isinstance(manager, SequentialManager):
+        await manager.flush()
+        for socket in sockets:
+            manager.disconnect("deal-1", socket)
+    return blocked / len(STATUSES), fast_done
+
+
+async def main_async(args):
+    print(f"subscribers={args.subscribers} slow={args.slow:.1%} slow_delay={args.slow_delay}s "
+          f"broadcasts={len(STATUSES)}")
+    for name, manager in (
+        ("sequential sends", SequentialManager()),
+        ("send queues", WebSocketManager(queue_size=len(STATUSES))),
+    ):
+        blocked, fast_done = await run(manager, args)
+        print(f"{name:<17} blocked per broadcast: {blocked * 1000:9.1f} ms   "
+              f"all fast subscribers done: {fast_done * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--slow", type=float, default=0.01, help="share of slow subscribers")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="seconds per send to a slow subscriber")
+    asyncio.run(main_async(parser.parse_args()))
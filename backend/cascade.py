@@ -0,0 +1,100 @@
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+import database
+from models import ExtractedDeal
+
+logger = logging.getLogger(__name__)
+
+# Models tried in order; the last one is the final tier. A single model (the
+# default) disables the cascade; e.g. "gpt-4o-mini,gpt-4o" tries the cheaper one first
+EXTRACTION_MODEL_CASCADE = os.getenv("EXTRACTION_MODEL_CASCADE", "gpt-4o")
+# Escalate a lower tier's result with fewer brief bullets than this
+CASCADE_MIN_BRIEF_ITEMS = int(os.getenv("CASCADE_MIN_BRIEF_ITEMS", "1"))
+
+# Company names that mean the model could not find one
+PLACEHOLDER_NAMES = {"", "unknown", "n/a", "na", "none", "null", "company", "tbd", "not specified"}
+
+ACCEPTED = "accepted"
+ESCALATED = "escalated"
+FAILED = "failed"
+
+
+def parse_cascade(spec: str) -> list[str]:
+    """Parse "gpt-4o-mini,gpt-4o" into the ordered list of model tiers."""
+    models = [m.strip() for m in spec.split(",") if m.strip()]
+    if not models:
+        raise ValueError("EXTRACTION_MODEL_CASCADE must name at least one model")
+    return models
+
+
+def quality_issues(deal: ExtractedDeal, min_brief_items: Optional[int] = None) -> list[str]:
+    """Checks that a lower tier's valid result is good enough to keep."""
+    if min_brief_items is None:
+        min_brief_items = CASCADE_MIN_BRIEF_ITEMS
+    issues = []
+    if deal.company_name.strip().lower() in PLACEHOLDER_NAMES:
+        issues.append("placeholder company_name")
+    bullets = [b for b in deal.investment_brief if b.strip()]
+    if len(bullets) < max(min_brief_items, 1):
+        issues.append(f"{len(bullets)} brief bullet(s)")
+    return issues
+
+
+async def record_attempt(
+    deal_id: str, tier: int, model: str, outcome: str, latency: float,
+    reason: Optional[str] = None,
+):
+    """Record one tier's attempt; failures are logged, never raised."""
+    try:
+        async with database.connection() as db:
+            await db.execute(
+                """
+                INSERT INTO extraction_attempts
+                    (deal_id, tier, model, outcome, reason, latency_ms, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (deal_id, tier, model, outcome, reason, latency * 1000,
+                 datetime.utcnow().isoformat()),
+            )
+            await db.commit()
+    except Exception as e:
+        logger.warning("[%s] Could not record extraction attempt: %s", deal_id, e)
+
+
+async def get_attempts(deal_id: str) -> list[dict]:
+    async with database.connection() as db:
+        cursor = await db.execute(
+            """
+            SELECT tier, model, outcome, reason, latency_ms, created_at
+            FROM extraction_attempts WHERE deal_id = ? ORDER BY id
+            """,
+            (deal_id,),
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def tier_stats() -> list[dict]:
+    """Per-tier attempt counts, acceptance rate and latency."""
+    async with database.connection() as db:
+        cursor = await db.execute(
+            """
+            SELECT tier, model,
+                   COUNT(*) AS attempts,
+                   SUM(outcome = ?) AS accepted,
+                   SUM(outcome = ?) AS escalated,
+                   SUM(outcome = ?) AS failed,
+                   AVG(latency_ms) AS avg_latency_ms,
+                   MAX(latency_ms) AS max_latency_ms
+            FROM extraction_attempts
+            GROUP BY tier, model
+            ORDER BY tier, model
+            """,
+            (ACCEPTED, ESCALATED, FAILED),
+        )
+        rows = [dict(row) for row in await cursor.fetchall()]
+    for row in rows:
+        row["success_rate"] = row["accepted"] / row["attempts"] if row["attempts"] else 0.0
+    return rows
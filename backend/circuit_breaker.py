@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open the circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds the circuit stays open before a probe call is let through
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency that is known to be down."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stop calling a dependency after repeated failures.
+
+    Closed: calls go through; `failure_threshold` consecutive failures open
+    the circuit. Open: calls fail immediately with CircuitOpenError until
+    `reset_timeout` has passed. Half-open: one probe call goes through; its
+    success closes the circuit, its failure opens it again.
+
+    Only `failure_errors` count as failures; anything else (a bad request, a
+    429 handled by the rate limiter) says nothing about the dependency being
+    down. The call that opens the circuit also raises CircuitOpenError, so
+    callers handle "down" in one place.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        failure_errors: tuple[type[BaseException], ...] = (asyncio.TimeoutError,),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_errors = failure_errors
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.last_error: Optional[str] = None
+        self.last_change: Optional[str] = None
+
+        # Counters
+        self.opened = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning("%s circuit %s -> %s", self.name, self.state, state)
+        self.state = state
+        self.last_change = datetime.utcnow().isoformat()
+
+    def _before_call(self):
+        if self.state == OPEN and self.retry_after() == 0:
+            self._transition(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def _on_success(self):
+        self.consecutive_failures = 0
+        self._transition(CLOSED)
+
+    def _on_failure(self, error: BaseException):
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            self._transition(OPEN)
+
+    @asynccontextmanager
+    async def guard(self):
+        """Run a call through the breaker, failing fast while it is open."""
+        self._before_call()
+        probe = self.state == HALF_OPEN
+        try:
+            yield
+        except self.failure_errors as e:
+            self._on_failure(e)
+            if self.state == OPEN:
+                raise CircuitOpenError(self.name, self.retry_after()) from e
+            raise
+        else:
+            self._on_success()
+        finally:
+            if probe:
+                self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+            "last_change": self.last_change,
+        }
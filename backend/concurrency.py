@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CONCURRENCY_INITIAL = float(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+LLM_CONCURRENCY_MIN = float(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = float(os.getenv("LLM_CONCURRENCY_MAX", "16"))
+# Calls slower than this many seconds count as congestion
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "30"))
+# Factor the limit is multiplied by on congestion
+LLM_CONCURRENCY_BACKOFF = float(os.getenv("LLM_CONCURRENCY_BACKOFF", "0.5"))
+
+# Number of recent limit changes kept for the metrics endpoint
+DECISION_HISTORY = 50
+
+
+class AIMDLimiter:
+    """Adaptive in-flight limit using additive increase / multiplicative decrease.
+
+    Each healthy call (no overload error, latency under target) taken while
+    the limit was in use adds 1/limit, so the limit grows by about one per
+    round of calls. A 429, timeout or slow call multiplies it by `backoff`.
+    Calls that started before the last decrease cannot cut it again, so one
+    congestion episode costs a single decrease rather than one per caller.
+    """
+
+    def __init__(
+        self,
+        initial: float = LLM_CONCURRENCY_INITIAL,
+        min_limit: float = LLM_CONCURRENCY_MIN,
+        max_limit: float = LLM_CONCURRENCY_MAX,
+        latency_target: float = LLM_LATENCY_TARGET,
+        backoff: float = LLM_CONCURRENCY_BACKOFF,
+        overload_errors: tuple[type[BaseException], ...] = (asyncio.TimeoutError,),
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial, min_limit), max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.overload_errors = overload_errors
+        self.in_flight = 0
+        self.decisions: deque[dict] = deque(maxlen=DECISION_HISTORY)
+        self._changed = asyncio.Condition()
+        self._last_decrease = 0.0
+
+        # Counters
+        self.increases = 0
+        self.decreases = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot for the duration of a call."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            saturated = self.in_flight >= int(self.limit)
+
+        start = time.monotonic()
+        try:
+            yield
+        except self.overload_errors as e:
+            self._decrease(start, type(e).__name__)
+            raise
+        else:
+            latency = time.monotonic() - start
+            if latency > self.latency_target:
+                self._decrease(start, f"latency {latency:.1f}s")
+            elif saturated:
+                self._increase()
+        finally:
+            async with self._changed:
+                self.in_flight -= 1
+                self._changed.notify_all()
+
+    def _record(self, action: str, reason: str, previous: float):
+        self.decisions.append({
+            "at": datetime.utcnow().isoformat(),
+            "action": action,
+            "reason": reason,
+            "from": int(previous),
+            "to": int(self.limit),
+        })
+
+    def _increase(self):
+        previous = self.limit
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if int(self.limit) > int(previous):
+            self.increases += 1
+            self._record("increase", "healthy", previous)
+
+    def _decrease(self, started: float, reason: str):
+        if started < self._last_decrease:
+            return
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+        self._record("decrease", reason, previous)
+        logger.warning(
+            "LLM concurrency limit %d -> %d (%s)", int(previous), int(self.limit), reason
+        )
+
+    def stats(self, recent: Optional[int] = 10) -> dict:
+        decisions = list(self.decisions)
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min": int(self.min_limit),
+            "max": int(self.max_limit),
+            "latency_target_seconds": self.latency_target,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "recent_decisions": decisions[-recent:] if recent else decisions,
+        }
@@ -1,12 +1,69 @@
 import aiosqlite
+import base64
 import json
 import os
-from datetime import datetime
-from typing import Optional
-from models import DealStatus, DealResponse, ExtractedDeal
+import re
+import sqlite3
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Union
+from models import DealStatus, DealResponse, DealSummary, ExtractedDeal
+from db_pool import ConnectionPool
+from deal_cache import DealCache
+from migrator import run_migrations
 
 DATABASE_PATH = os.getenv("DATABASE_PATH", "./data/deals.db")
 MIGRATIONS_PATH = os.getenv("MIGRATIONS_PATH", "./migrations")
+# Seconds to sleep between backfill chunks so live writers are not starved
+MIGRATION_BACKFILL_PAUSE = float(os.getenv("MIGRATION_BACKFILL_PAUSE", "0.01"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))
+
+# Read-through cache for get_deal_by_id; DEAL_CACHE_SIZE=0 disables it
+DEAL_CACHE_SIZE = int(os.getenv("DEAL_CACHE_SIZE", "1024"))
+DEAL_CACHE_TTL = float(os.getenv("DEAL_CACHE_TTL", "300"))
+
+# PRAGMA profile applied to every connection, in order. journal_mode is
+# persistent in the database file; the others are per-connection settings.
+# busy_timeout comes first so that switching to WAL waits for other
+# processes starting at the same time instead of failing.
+SQLITE_PRAGMAS = {
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),  # ms
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-20000"),  # negative = KiB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# UPDATE/INSERT ... RETURNING needs SQLite 3.35+; older builds re-read the
+# row on the same connection instead.
+SQLITE_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_pool: Optional[ConnectionPool] = None
+deal_cache = DealCache(max_size=DEAL_CACHE_SIZE, ttl=DEAL_CACHE_TTL)
+
+
+async def apply_pragmas(db: aiosqlite.Connection):
+    """Apply the configured PRAGMA profile to a connection."""
+    for name, value in SQLITE_PRAGMAS.items():
+        if value == "":
+            continue
+        if not re.fullmatch(r"-?\w+", value):
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+        await db.execute(f"PRAGMA {name} = {value}")
+
+
+async def read_pragmas(db: aiosqlite.Connection) -> dict:
+    """Read the active value of every PRAGMA in the profile."""
+    active = {}
+    for name in SQLITE_PRAGMAS:
+        cursor = await db.execute(f"PRAGMA {name}")
+        row = await cursor.fetchone()
+        active[name] = row[0] if row else None
+    return active
 
 
 async def init_db():
@@ -14,11 +71,45 @@ async def init_db():
     os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
 
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        migration_file = os.path.join(MIGRATIONS_PATH, "001_initial.sql")
-        if os.path.exists(migration_file):
-            with open(migration_file) as f:
-                await db.executescript(f.read())
-            await db.commit()
+        await apply_pragmas(db)
+        await run_migrations(db, MIGRATIONS_PATH, backfill_pause=MIGRATION_BACKFILL_PAUSE)
+
+
+async def init_pool() -> ConnectionPool:
+    """Open the shared connection pool used by all database functions."""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(
+            DATABASE_PATH,
+            size=DB_POOL_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+            on_connect=apply_pragmas,
+        )
+        await _pool.open()
+    return _pool
+
+
+async def close_pool():
+    """Close the shared connection pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Return the shared connection pool, if it has been opened."""
+    return _pool
+
+
+@asynccontextmanager
+async def connection() -> AsyncIterator[aiosqlite.Connection]:
+    """Check out a pooled connection."""
+    if _pool is None:
+        raise RuntimeError("Database pool is not initialized; call init_pool() first")
+    async with _pool.acquire() as db:
+        yield db
 
 
 async def get_db():
@@ -50,86 +141,271 @@ def row_to_deal_response(row: aiosqlite.Row) -> DealResponse:
     )
 
 
+SUMMARY_COLUMNS = ("id", "status", "company_name", "sector", "stage", "created_at")
+
+
+def row_to_deal_summary(row: aiosqlite.Row) -> DealSummary:
+    """Convert a summary projection row to DealSummary."""
+    return DealSummary(
+        id=row["id"],
+        status=DealStatus(row["status"]),
+        company_name=row["company_name"],
+        sector=row["sector"],
+        stage=row["stage"],
+        created_at=datetime.fromisoformat(row["created_at"]),
+    )
+
+
+async def _write_returning(
+    db: aiosqlite.Connection, sql: str, params: tuple, deal_id: str
+) -> Optional[aiosqlite.Row]:
+    """Run a single-row write and return the written row, then commit.
+
+    Uses RETURNING when available so the write and read are one statement;
+    otherwise falls back to a SELECT on the same connection and transaction.
+    """
+    if SQLITE_SUPPORTS_RETURNING:
+        cursor = await db.execute(f"{sql} RETURNING *", params)
+        row = await cursor.fetchone()
+        await cursor.close()
+    else:
+        await db.execute(sql, params)
+        cursor = await db.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
+        row = await cursor.fetchone()
+    await db.commit()
+    return row
+
+
+def _cache_written(deal_id: str, row: Optional[aiosqlite.Row]) -> Optional[DealResponse]:
+    """Refresh the deal cache from a written row and return it."""
+    if row is None:
+        deal_cache.invalidate(deal_id)
+        return None
+    deal = row_to_deal_response(row)
+    deal_cache.put(deal)
+    return deal
+
+
 async def create_deal(deal_id: str, content_hash: str, raw_text: str) -> DealResponse:
     """Create a new deal in pending status."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connection() as db:
         now = datetime.utcnow().isoformat()
-        await db.execute(
+        row = await _write_returning(
+            db,
             """
             INSERT INTO deals (id, content_hash, raw_text, status, created_at, updated_at)
             VALUES (?, ?, ?, ?, ?, ?)
             """,
             (deal_id, content_hash, raw_text, DealStatus.PENDING.value, now, now),
+            deal_id,
         )
-        await db.commit()
+        deal = row_to_deal_response(row)
+        deal_cache.put(deal)
+        return deal
 
-        cursor = await db.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
-        row = await cursor.fetchone()
-        return row_to_deal_response(row)
 
+async def create_or_get_deal(
+    deal_id: str, content_hash: str, raw_text: str
+) -> tuple[Optional[DealResponse], Optional[str]]:
+    """Atomically create a deal unless one with the same content hash exists.
+
+    Returns (new_deal, None) when the row was inserted, or (None, existing_id)
+    when the content hash was already taken. Concurrent identical submissions
+    resolve to exactly one insert.
+    """
+    async with connection() as db:
+        now = datetime.utcnow().isoformat()
+        params = (deal_id, content_hash, raw_text, DealStatus.PENDING.value, now, now)
+        if SQLITE_SUPPORTS_RETURNING:
+            cursor = await db.execute(
+                """
+                INSERT INTO deals (id, content_hash, raw_text, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(content_hash) DO NOTHING
+                RETURNING *
+                """,
+                params,
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
+        else:
+            cursor = await db.execute(
+                """
+                INSERT OR IGNORE INTO deals
+                    (id, content_hash, raw_text, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                params,
+            )
+            row = None
+            if cursor.rowcount == 1:
+                cursor = await db.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
+                row = await cursor.fetchone()
+
+        if row:
+            await db.commit()
+            deal = row_to_deal_response(row)
+            deal_cache.put(deal)
+            return deal, None
 
-async def get_deal_by_hash(content_hash: str) -> Optional[DealResponse]:
-    """Get deal by content hash for dedupe check."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM deals WHERE content_hash = ?", (content_hash,)
+            "SELECT id FROM deals WHERE content_hash = ?", (content_hash,)
         )
-        row = await cursor.fetchone()
-        if row:
-            return row_to_deal_response(row)
-        return None
+        existing = await cursor.fetchone()
+        await db.commit()
+        return None, existing["id"]
 
 
 async def get_deal_by_id(deal_id: str) -> Optional[DealResponse]:
-    """Get deal by ID."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
-        row = await cursor.fetchone()
-        if row:
-            return row_to_deal_response(row)
-        return None
+    """Get deal by ID, served from the deal cache when possible."""
+    cached = deal_cache.get(deal_id)
+    if cached is not None:
+        return cached
 
+    token = deal_cache.begin_load()
+    deal = None
+    try:
+        async with connection() as db:
+            cursor = await db.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
+            row = await cursor.fetchone()
+            if row:
+                deal = row_to_deal_response(row)
+        return deal
+    finally:
+        deal_cache.finish_load(token, deal)
 
-async def list_deals(limit: int = 10) -> list[DealResponse]:
-    """List latest deals."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM deals ORDER BY created_at DESC LIMIT ?", (limit,)
-        )
-        rows = await cursor.fetchall()
-        return [row_to_deal_response(row) for row in rows]
+
+def _to_db_timestamp(value: datetime) -> str:
+    """Format a datetime like stored timestamps (naive UTC ISO-8601)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def encode_cursor(created_at: str, deal_id: str) -> str:
+    """Encode a keyset position as an opaque pagination cursor."""
+    raw = json.dumps([created_at, deal_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Decode a pagination cursor; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, deal_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if not isinstance(created_at, str) or not isinstance(deal_id, str):
+        raise ValueError("Invalid pagination cursor")
+    return created_at, deal_id
+
+
+async def list_deals(
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    status: Optional[DealStatus] = None,
+    stage: Optional[str] = None,
+    sector: Optional[str] = None,
+    tag: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    full: bool = False,
+) -> tuple[list[Union[DealSummary, DealResponse]], Optional[str]]:
+    """List deals newest first using keyset pagination on (created_at, id).
+
+    Returns the page and a cursor for the next page (None on the last page).
+    Each query seeks into an index, so cost does not grow with page depth.
+    Rows are DealSummary projections unless `full` is set.
+    """
+    if full:
+        columns = "d.*"
+        convert = row_to_deal_response
+    else:
+        columns = ", ".join(f"d.{c}" for c in SUMMARY_COLUMNS)
+        convert = row_to_deal_summary
+
+    # With a tag filter, walk deal_tags (tag, created_at, deal_id) instead of
+    # the deals table so the seek stays on a single index.
+    if tag is not None:
+        sql = f"SELECT {columns} FROM deal_tags k JOIN deals d ON d.id = k.deal_id"
+        key_created, key_id = "k.created_at", "k.deal_id"
+        where = ["k.tag = ?"]
+        params: list = [tag.lower()]
+    else:
+        sql = f"SELECT {columns} FROM deals d"
+        key_created, key_id = "d.created_at", "d.id"
+        where = []
+        params = []
+
+    if status is not None:
+        where.append("d.status = ?")
+        params.append(DealStatus(status).value)
+    if stage is not None:
+        where.append("d.stage = ?")
+        params.append(stage)
+    if sector is not None:
+        where.append("d.sector = ?")
+        params.append(sector)
+    if created_after is not None:
+        where.append(f"{key_created} >= ?")
+        params.append(_to_db_timestamp(created_after))
+    if created_before is not None:
+        where.append(f"{key_created} < ?")
+        params.append(_to_db_timestamp(created_before))
+    if cursor is not None:
+        where.append(f"({key_created}, {key_id}) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {key_created} DESC, {key_id} DESC LIMIT ?"
+    params.append(limit + 1)
+
+    async with connection() as db:
+        cur = await db.execute(sql, params)
+        rows = await cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [convert(row) for row in rows], next_cursor
 
 
 async def update_deal_status(
     deal_id: str, status: DealStatus, last_error: Optional[str] = None
 ) -> Optional[DealResponse]:
     """Update deal status."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connection() as db:
         now = datetime.utcnow().isoformat()
-        await db.execute(
+        row = await _write_returning(
+            db,
             """
             UPDATE deals SET status = ?, last_error = ?, updated_at = ?
             WHERE id = ?
             """,
             (status.value, last_error, now, deal_id),
+            deal_id,
         )
-        await db.commit()
-        return await get_deal_by_id(deal_id)
+        return _cache_written(deal_id, row)
 
 
 async def update_deal_extracted(
     deal_id: str, extracted: ExtractedDeal
 ) -> Optional[DealResponse]:
     """Update deal with extracted data."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connection() as db:
         now = datetime.utcnow().isoformat()
-        await db.execute(
+        await db.execute("DELETE FROM deal_tags WHERE deal_id = ?", (deal_id,))
+        await db.executemany(
+            """
+            INSERT OR IGNORE INTO deal_tags (tag, created_at, deal_id)
+            SELECT ?, created_at, id FROM deals WHERE id = ?
+            """,
+            [(tag.lower(), deal_id) for tag in extracted.tags],
+        )
+        row = await _write_returning(
+            db,
             """
             UPDATE deals SET
                 status = ?,
@@ -159,6 +435,6 @@ async def update_deal_extracted(
                 now,
                 deal_id,
             ),
+            deal_id,
         )
-        await db.commit()
-        return await get_deal_by_id(deal_id)
+        return _cache_written(deal_id, row)
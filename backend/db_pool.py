@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PoolClosedError(Exception):
+    """Raised when acquiring from a pool that has been closed."""
+
+
+@dataclass
+class _PooledConnection:
+    conn: aiosqlite.Connection
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived aiosqlite connections.
+
+    Connections are opened lazily up to `size`. A checkout waits at most
+    `timeout` seconds for a free connection, and connections that have been
+    idle longer than `health_check_interval` are pinged before being handed
+    out and replaced if the ping fails. `on_connect` runs once on every new
+    connection (e.g. to apply PRAGMAs).
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        size: int = 5,
+        timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        on_connect: Optional[Callable[[aiosqlite.Connection], Awaitable[None]]] = None,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.database_path = database_path
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+
+        # Idle connections; None wakes a waiter when a slot frees up
+        self._idle: asyncio.Queue[Optional[_PooledConnection]] = asyncio.Queue()
+        self._opened = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._create_lock = asyncio.Lock()
+
+        # Counters
+        self.checkouts = 0
+        self.timeouts = 0
+        self.replaced = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.database_path)
+        conn.row_factory = aiosqlite.Row
+        if self.on_connect is not None:
+            try:
+                await self.on_connect(conn)
+            except Exception:
+                await conn.close()
+                raise
+        return conn
+
+    async def _open_connection(self) -> Optional[_PooledConnection]:
+        """Open a new connection if the pool has not reached its size."""
+        async with self._create_lock:
+            if self._opened >= self.size:
+                return None
+            self._opened += 1
+        try:
+            return _PooledConnection(await self._connect())
+        except Exception:
+            self._opened -= 1
+            raise
+
+    async def _discard(self, pooled: _PooledConnection):
+        self._opened -= 1
+        # Let a waiting checkout open a replacement instead of timing out
+        if self._waiting and not self._closed:
+            self._idle.put_nowait(None)
+        try:
+            await pooled.conn.close()
+        except Exception:
+            logger.debug("Error closing discarded connection", exc_info=True)
+
+    async def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            await pooled.conn.execute("SELECT 1")
+            return True
+        except Exception:
+            logger.warning("Pooled connection failed health check, replacing it")
+            return False
+
+    async def _checkout(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed")
+
+            try:
+                pooled = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                pooled = await self._open_connection()
+                if pooled is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available within {self.timeout}s"
+                        )
+                    self._waiting += 1
+                    try:
+                        pooled = await asyncio.wait_for(self._idle.get(), remaining)
+                    except asyncio.TimeoutError:
+                        self.timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available within {self.timeout}s"
+                        ) from None
+                    finally:
+                        self._waiting -= 1
+
+            if pooled is None:
+                # A connection was discarded; retry so we can open its replacement
+                continue
+            if await self._is_healthy(pooled):
+                return pooled
+            self.replaced += 1
+            await self._discard(pooled)
+
+    async def _release(self, pooled: _PooledConnection):
+        if self._closed:
+            await self._discard(pooled)
+            return
+        try:
+            if pooled.conn.in_transaction:
+                await pooled.conn.rollback()
+        except Exception:
+            logger.warning("Failed to reset pooled connection, discarding it")
+            await self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        self._idle.put_nowait(pooled)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Check out a connection for the duration of the block."""
+        pooled = await self._checkout()
+        self.checkouts += 1
+        self._in_use += 1
+        try:
+            yield pooled.conn
+        finally:
+            self._in_use -= 1
+            await self._release(pooled)
+
+    async def open(self, min_size: int = 1):
+        """Eagerly open `min_size` connections so startup surfaces errors early."""
+        for _ in range(min(min_size, self.size)):
+            pooled = await self._open_connection()
+            if pooled is None:
+                break
+            self._idle.put_nowait(pooled)
+        logger.info(
+            "Database pool opened: size=%d, timeout=%.1fs", self.size, self.timeout
+        )
+
+    async def close(self):
+        """Close idle connections; in-use connections are closed on release."""
+        self._closed = True
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            if pooled is not None:
+                await self._discard(pooled)
+        logger.info("Database pool closed")
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "opened": self._opened,
+            "in_use": self._in_use,
+            "idle": self._idle.qsize(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "replaced": self.replaced,
+        }
@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from models import DealResponse
+
+
+class DealCache:
+    """Bounded LRU cache of DealResponse objects with a per-entry TTL.
+
+    All methods are synchronous, so they are atomic with respect to other
+    coroutines on the event loop. Read-through loads call `begin_load()`
+    before querying the database and `finish_load()` afterwards; a load is
+    only stored if no write touched that deal in between, so a slow read can
+    never overwrite a newer status written by `put()` or `invalidate()`.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[DealResponse, float]] = OrderedDict()
+
+        # Write sequence numbers used to reject stale read-through loads
+        self._write_seq = 0
+        self._last_write: dict[str, int] = {}
+        self._inflight: dict[int, int] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_loads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, deal_id: str) -> Optional[DealResponse]:
+        """Return a cached deal, or None on miss or expiry."""
+        entry = self._entries.get(deal_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        deal, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[deal_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(deal_id)
+        self.hits += 1
+        return deal
+
+    def _store(self, deal: DealResponse):
+        if not self.enabled:
+            return
+        self._entries[deal.id] = (deal, time.monotonic() + self.ttl)
+        self._entries.move_to_end(deal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _record_write(self, deal_id: str):
+        self._write_seq += 1
+        if self._inflight:
+            self._last_write[deal_id] = self._write_seq
+
+    def put(self, deal: DealResponse):
+        """Store the latest version of a deal after a write."""
+        self._record_write(deal.id)
+        self._store(deal)
+
+    def invalidate(self, deal_id: str):
+        """Drop a deal after a write whose result is unknown."""
+        self._record_write(deal_id)
+        if self._entries.pop(deal_id, None) is not None:
+            self.invalidations += 1
+
+    def begin_load(self) -> int:
+        """Register a read-through load; returns a token for finish_load()."""
+        token = self._write_seq
+        self._inflight[token] = self._inflight.get(token, 0) + 1
+        return token
+
+    def finish_load(self, token: int, deal: Optional[DealResponse]):
+        """Store a loaded deal unless a write raced with the load."""
+        remaining = self._inflight[token] - 1
+        if remaining:
+            self._inflight[token] = remaining
+        else:
+            del self._inflight[token]
+
+        if deal is not None:
+            if self._last_write.get(deal.id, 0) > token:
+                self.stale_loads += 1
+            else:
+                self._store(deal)
+
+        if not self._inflight:
+            self._last_write.clear()
+
+    def clear(self):
+        self._entries.clear()
+
+    def disable(self):
+        """Stop caching, e.g. when other processes write the same deals."""
+        self.max_size = 0
+        self.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_loads": self.stale_loads,
+        }
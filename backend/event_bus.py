@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Union
+
+from pydantic import BaseModel
+
+from database import deal_cache
+from event_log import DealEventLog
+from models import DealStatus
+
+logger = logging.getLogger(__name__)
+
+# "local" delivers events within this process; "sqlite" delivers them to every
+# process sharing the database (needed with `uvicorn --workers N`)
+EVENT_BUS = os.getenv("EVENT_BUS", "local")
+# Seconds between polls of the deal_events table by the sqlite bus
+EVENT_BUS_POLL_INTERVAL = float(os.getenv("EVENT_BUS_POLL_INTERVAL", "0.1"))
+# Events read per poll
+EVENT_BUS_BATCH_SIZE = 500
+
+LOCAL = "local"
+SQLITE = "sqlite"
+
+
+@dataclass
+class DealEvent:
+    """A deal event to deliver to WebSocket subscribers."""
+    deal_id: str
+    type: str
+    status: DealStatus
+    error: Optional[str] = None
+    seq: Optional[int] = None
+    # Set by the publishing process; a process receiving the event from
+    # another one reads the deal from the database instead
+    deal: Optional[BaseModel] = None
+    extracted: Optional[BaseModel] = None
+    # Published by another process
+    remote: bool = False
+
+
+Handler = Callable[[DealEvent], Awaitable[None]]
+
+
+class LocalEventBus:
+    """Delivers each event to this process's subscribers as it is published."""
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+        # Counters
+        self.published = 0
+
+    def subscribe(self, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, event: DealEvent):
+        self.published += 1
+        await self._handler(event)
+
+    async def run(self):
+        """Nothing to poll; returns immediately."""
+
+    def stats(self) -> dict:
+        return {"type": LOCAL, "published": self.published}
+
+
+class SQLiteEventBus:
+    """Delivers events to every process that shares the database.
+
+    Events are already in the deal_events table by the time they are
+    published, so publishing only remembers the event. Each process polls
+    the table and delivers new events in seq order, its own included, which
+    keeps delivery order the same in every process. Its own events are
+    delivered with the deal and result it published; for events from other
+    processes the deal is read from the database when needed.
+
+    Events that could not be logged (no seq) reach only this process.
+    """
+
+    def __init__(
+        self, event_log: DealEventLog, poll_interval: float = EVENT_BUS_POLL_INTERVAL
+    ):
+        self.event_log = event_log
+        self.poll_interval = poll_interval
+        self._handler: Optional[Handler] = None
+        # Published here but not yet polled, by seq
+        self._pending: dict[int, DealEvent] = {}
+        self._last_seq: Optional[int] = None
+
+        # Counters
+        self.published = 0
+        self.delivered = 0
+        self.remote = 0
+        self.errors = 0
+
+    def subscribe(self, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, event: DealEvent):
+        self.published += 1
+        if event.seq is None:
+            await self._handler(event)
+        elif self._last_seq is None or event.seq > self._last_seq:
+            self._pending[event.seq] = event
+        # Otherwise a poll already delivered it from the table
+
+    async def poll(self) -> int:
+        """Deliver events logged since the last poll; returns how many."""
+        if self._last_seq is None:
+            # Start from now, or from the first event published before that
+            latest = await self.event_log.latest_seq()
+            self._last_seq = min([latest, *(seq - 1 for seq in self._pending)])
+        rows = await self.event_log.after(self._last_seq, EVENT_BUS_BATCH_SIZE)
+        for row in rows:
+            self._last_seq = row["seq"]
+            event = self._pending.pop(row["seq"], None)
+            if event is None:
+                self.remote += 1
+                event = DealEvent(
+                    deal_id=row["deal_id"],
+                    type=row["type"],
+                    status=DealStatus(row["status"]),
+                    error=row["error"],
+                    seq=row["seq"],
+                    remote=True,
+                )
+            try:
+                await self._handler(event)
+                self.delivered += 1
+            except Exception:
+                self.errors += 1
+                logger.exception("[%s] Failed to deliver event %d", event.deal_id, row["seq"])
+        return len(rows)
+
+    async def run(self):
+        """Poll for new events until cancelled."""
+        while True:
+            try:
+                if await self.poll() == EVENT_BUS_BATCH_SIZE:
+                    continue
+            except Exception:
+                self.errors += 1
+                logger.exception("Failed to poll deal events")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "type": SQLITE,
+            "poll_interval_seconds": self.poll_interval,
+            "last_seq": self._last_seq,
+            "pending": len(self._pending),
+            "published": self.published,
+            "delivered": self.delivered,
+            "remote": self.remote,
+            "errors": self.errors,
+        }
+
+
+EventBus = Union[LocalEventBus, SQLiteEventBus]
+
+
+def create_event_bus(event_log: DealEventLog, kind: str = EVENT_BUS) -> EventBus:
+    """The event bus selected by EVENT_BUS.
+
+    The sqlite bus turns off the deal cache. Other processes write deals
+    too, and not every write is followed by an event, so a cached deal
+    could stay stale until its TTL.
+    """
+    if kind == LOCAL:
+        return LocalEventBus()
+    if kind == SQLITE:
+        deal_cache.disable()
+        return SQLiteEventBus(event_log)
+    raise ValueError(f"Unknown event bus: {kind!r}")
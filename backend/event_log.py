@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Seconds deal events are kept for replay to reconnecting clients
+DEAL_EVENT_RETENTION = float(os.getenv("DEAL_EVENT_RETENTION", "86400"))
+# Seconds between prune runs
+PRUNE_INTERVAL = 3600
+
+
+class DealEventLog:
+    """Append-only log of deal status events in the deal_events table.
+
+    Every event gets a `seq` that increases across all deals. A WebSocket
+    client that remembers the last seq it saw can ask for only what it
+    missed. Events older than `retention` seconds are pruned. Only status
+    events are logged; streamed partial fields are not, which keeps the log
+    compact. Write failures are logged and counted but never fail the
+    broadcast.
+    """
+
+    def __init__(self, retention: float = DEAL_EVENT_RETENTION):
+        self.retention = retention
+
+        # Counters
+        self.appended = 0
+        self.replayed = 0
+        self.pruned = 0
+        self.errors = 0
+
+    async def append(
+        self, deal_id: str, event: str, status: str, error: Optional[str] = None
+    ) -> Optional[int]:
+        """Record an event and return its seq, or None if the write failed."""
+        try:
+            async with database.connection() as db:
+                cursor = await db.execute(
+                    """
+                    INSERT INTO deal_events (deal_id, type, status, error, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (deal_id, event, status, error, datetime.utcnow().isoformat()),
+                )
+                await db.commit()
+                seq = cursor.lastrowid
+        except Exception as e:
+            self.errors += 1
+            logger.warning("[%s] Failed to log %s event: %s", deal_id, event, e)
+            return None
+        self.appended += 1
+        return seq
+
+    async def latest_seq(self, deal_id: Optional[str] = None) -> int:
+        """Seq of the newest event (for one deal, or overall); 0 if none."""
+        async with database.connection() as db:
+            if deal_id is None:
+                cursor = await db.execute("SELECT MAX(seq) FROM deal_events")
+            else:
+                cursor = await db.execute(
+                    "SELECT MAX(seq) FROM deal_events WHERE deal_id = ?", (deal_id,)
+                )
+            row = await cursor.fetchone()
+        return row[0] or 0
+
+    async def covers(self, last_seq: int) -> bool:
+        """Whether every event after `last_seq` is still in the log."""
+        async with database.connection() as db:
+            cursor = await db.execute("SELECT MIN(seq) FROM deal_events")
+            row = await cursor.fetchone()
+        return row[0] is None or row[0] <= last_seq + 1
+
+    async def since(self, last_seq: int, deal_id: Optional[str] = None) -> list[dict]:
+        """Events after `last_seq` in seq order, for one deal or all deals.
+
+        Rows for all deals include the deal's current summary columns.
+        """
+        async with database.connection() as db:
+            if deal_id is None:
+                cursor = await db.execute(
+                    """
+                    SELECT e.seq, e.deal_id, e.type, e.status, e.error,
+                           d.company_name, d.sector, d.stage, d.created_at
+                    FROM deal_events e JOIN deals d ON d.id = e.deal_id
+                    WHERE e.seq > ?
+                    ORDER BY e.seq
+                    """,
+                    (last_seq,),
+                )
+            else:
+                cursor = await db.execute(
+                    """
+                    SELECT seq, deal_id, type, status, error FROM deal_events
+                    WHERE deal_id = ? AND seq > ?
+                    ORDER BY seq
+                    """,
+                    (deal_id, last_seq),
+                )
+            rows = [dict(row) for row in await cursor.fetchall()]
+        self.replayed += len(rows)
+        return rows
+
+    async def after(self, last_seq: int, limit: int) -> list[dict]:
+        """Up to `limit` events after `last_seq` in seq order, for the event bus."""
+        async with database.connection() as db:
+            cursor = await db.execute(
+                """
+                SELECT seq, deal_id, type, status, error FROM deal_events
+                WHERE seq > ? ORDER BY seq LIMIT ?
+                """,
+                (last_seq, limit),
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def prune(self) -> int:
+        """Delete events older than the retention period."""
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.retention)).isoformat()
+        async with database.connection() as db:
+            cursor = await db.execute("DELETE FROM deal_events WHERE created_at < ?", (cutoff,))
+            await db.commit()
+        if cursor.rowcount:
+            self.pruned += cursor.rowcount
+            logger.info("Pruned %d deal event(s)", cursor.rowcount)
+        return cursor.rowcount
+
+    async def run_pruner(self, interval: float = PRUNE_INTERVAL):
+        """Prune expired events every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logger.exception("Failed to prune deal events")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "retention_seconds": self.retention,
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "pruned": self.pruned,
+            "errors": self.errors,
+        }
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from scheduler import percentile
+
+logger = logging.getLogger(__name__)
+
+# Hedge once a request has taken longer than this percentile of recent latency
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# Maximum hedges as a fraction of requests
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.05"))
+# Latency samples needed per key before hedging starts
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# Recent latencies kept per key
+LATENCY_WINDOW = 500
+
+T = TypeVar("T")
+# Called by a hedged call once its request has been sent
+OnSent = Callable[[], None]
+
+
+class Hedger:
+    """Send a backup request when the first one is slower than usual.
+
+    Latency is tracked per key (e.g. model). Once a request has run past the
+    `percentile` of recent latency, an identical request is started; the
+    first to succeed wins and the other is cancelled. Hedges are capped at
+    `budget` times the number of requests, so a general slowdown cannot
+    double the load.
+
+    `call` is passed an `on_sent` callback to invoke once its request is in
+    flight. Latency is measured from then, so time spent queued behind the
+    local rate and concurrency limiters neither triggers a hedge nor
+    inflates the learned percentile.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        budget: float = HEDGE_BUDGET,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies: dict[str, deque[float]] = {}
+
+        # Counters
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.over_budget = 0
+
+    def _record(self, key: str, latency: float):
+        self._latencies.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def threshold(self, key: str) -> Optional[float]:
+        """Seconds after which a request for `key` is hedged, or None if too few samples."""
+        samples = self._latencies.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return percentile(sorted(samples), self.percentile)
+
+    def _within_budget(self) -> bool:
+        return self.hedges_fired + 1 <= self.budget * self.requests
+
+    async def run(self, key: str, call: Callable[[OnSent], Awaitable[T]]) -> T:
+        """Await `call(on_sent)`, hedging it with a second call if it is slow."""
+        self.requests += 1
+        delay = self.threshold(key)
+        sent = asyncio.Event()
+        sent_at: Optional[float] = None
+
+        def on_sent():
+            nonlocal sent_at
+            if sent_at is None:
+                sent_at = time.monotonic()
+                sent.set()
+
+        primary = asyncio.ensure_future(call(on_sent))
+        sending = asyncio.ensure_future(sent.wait())
+        tasks = [primary]
+        try:
+            if delay is not None:
+                await asyncio.wait([primary, sending], return_when=asyncio.FIRST_COMPLETED)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self._within_budget():
+                        self.hedges_fired += 1
+                        logger.info("Hedging %s request after %.2fs", key, delay)
+                        tasks.append(asyncio.ensure_future(call(on_sent)))
+                    else:
+                        self.over_budget += 1
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary if both finished in the same step
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedges_won += 1
+                        # If the primary lost, it took at least this long
+                        if sent_at is not None:
+                            self._record(key, time.monotonic() - sent_at)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            sending.cancel()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "percentile": self.percentile,
+            "budget": self.budget,
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "over_budget": self.over_budget,
+            "hedge_rate": self.hedges_fired / self.requests if self.requests else 0.0,
+            "thresholds_ms": {
+                key: 1000 * threshold
+                for key in self._latencies
+                if (threshold := self.threshold(key)) is not None
+            },
+        }
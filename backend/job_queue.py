@@ -0,0 +1,486 @@
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+import aiosqlite
+
+import database
+from circuit_breaker import CircuitOpenError
+from models import DealStatus, JobLane
+from scheduler import LaneScheduler
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+# Finished jobs older than this many seconds are deleted by the reaper
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: int
+    deal_id: str
+    status: str
+    attempts: int
+    max_attempts: int
+    lease_owner: Optional[str]
+    lane: JobLane
+    available_at: datetime
+
+
+def _row_to_job(row: aiosqlite.Row) -> Job:
+    return Job(
+        id=row["id"],
+        deal_id=row["deal_id"],
+        status=row["status"],
+        attempts=row["attempts"],
+        max_attempts=row["max_attempts"],
+        lease_owner=row["lease_owner"],
+        lane=JobLane(row["lane"]),
+        available_at=datetime.fromisoformat(row["available_at"]),
+    )
+
+
+def _timestamp(offset: float = 0.0) -> str:
+    return (datetime.utcnow() + timedelta(seconds=offset)).isoformat()
+
+
+# Called with the deals marked failed (and the error) once the change is committed
+OnDealsFailed = Callable[[list[str], str], Awaitable[None]]
+
+
+async def _fail_deals(db: aiosqlite.Connection, deal_ids: list[str], error: str):
+    """Mark deals whose jobs ran out of attempts as failed.
+
+    The caller commits, then calls `_deals_failed`.
+    """
+    if not deal_ids:
+        return
+    now = _timestamp()
+    await db.executemany(
+        "UPDATE deals SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+        [(DealStatus.FAILED.value, error, now, deal_id) for deal_id in deal_ids],
+    )
+
+
+async def _deals_failed(
+    deal_ids: list[str], error: str, on_failed: Optional[OnDealsFailed]
+):
+    """Evict committed failures from the deal cache and report them."""
+    if not deal_ids:
+        return
+    # Only after the commit, so a concurrent read cannot cache the old row
+    for deal_id in deal_ids:
+        database.deal_cache.invalidate(deal_id)
+    if on_failed is not None:
+        try:
+            await on_failed(deal_ids, error)
+        except Exception:
+            logger.exception("Failed to report %d failed deal(s)", len(deal_ids))
+
+
+async def enqueue_job(
+    deal_id: str,
+    lane: JobLane = JobLane.INTERACTIVE,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    delay: float = 0.0,
+) -> bool:
+    """Queue extraction for a deal; returns False if it already has an active job."""
+    async with database.connection() as db:
+        queued = await insert_job(db, deal_id, lane, max_attempts, delay)
+        await db.commit()
+        return queued
+
+
+async def insert_job(
+    db: aiosqlite.Connection,
+    deal_id: str,
+    lane: JobLane = JobLane.INTERACTIVE,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    delay: float = 0.0,
+) -> bool:
+    """Like `enqueue_job`, but in the caller's transaction; the caller commits."""
+    now = _timestamp()
+    cursor = await db.execute(
+        """
+        INSERT OR IGNORE INTO jobs
+            (deal_id, status, lane, max_attempts, available_at, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (deal_id, QUEUED, JobLane(lane).value, max_attempts, _timestamp(delay), now, now),
+    )
+    return cursor.rowcount == 1
+
+
+async def lease_job(
+    owner: str, visibility_timeout: float, lane: Optional[JobLane] = None
+) -> Optional[Job]:
+    """Atomically lease the oldest ready job for `visibility_timeout` seconds.
+
+    With `lane`, only jobs from that lane are considered.
+    """
+    lane_filter = "AND lane = ?" if lane is not None else ""
+    lane_params = (JobLane(lane).value,) if lane is not None else ()
+    async with database.connection() as db:
+        now = _timestamp()
+        expires = _timestamp(visibility_timeout)
+        if database.SQLITE_SUPPORTS_RETURNING:
+            cursor = await db.execute(
+                """
+                UPDATE jobs
+                SET status = ?, lease_owner = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = ? AND available_at <= ? {lane_filter}
+                    ORDER BY available_at, id
+                    LIMIT 1
+                )
+                RETURNING *
+                """.format(lane_filter=lane_filter),
+                (LEASED, owner, expires, now, QUEUED, now, *lane_params),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
+        else:
+            cursor = await db.execute(
+                """
+                SELECT id FROM jobs WHERE status = ? AND available_at <= ? {lane_filter}
+                ORDER BY available_at, id LIMIT 1
+                """.format(lane_filter=lane_filter),
+                (QUEUED, now, *lane_params),
+            )
+            candidate = await cursor.fetchone()
+            row = None
+            if candidate:
+                cursor = await db.execute(
+                    """
+                    UPDATE jobs
+                    SET status = ?, lease_owner = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE id = ? AND status = ?
+                    """,
+                    (LEASED, owner, expires, now, candidate["id"], QUEUED),
+                )
+                if cursor.rowcount == 1:
+                    cursor = await db.execute(
+                        "SELECT * FROM jobs WHERE id = ?", (candidate["id"],)
+                    )
+                    row = await cursor.fetchone()
+        await db.commit()
+        return _row_to_job(row) if row else None
+
+
+async def extend_lease(job: Job, visibility_timeout: float) -> bool:
+    """Push out the lease of a running job; False if the lease was lost."""
+    async with database.connection() as db:
+        cursor = await db.execute(
+            """
+            UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+            WHERE id = ? AND status = ? AND lease_owner = ?
+            """,
+            (_timestamp(visibility_timeout), _timestamp(), job.id, LEASED, job.lease_owner),
+        )
+        await db.commit()
+        return cursor.rowcount == 1
+
+
+async def complete_job(job: Job):
+    """Mark a leased job as done."""
+    async with database.connection() as db:
+        await db.execute(
+            """
+            UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (DONE, _timestamp(), job.id, job.lease_owner),
+        )
+        await db.commit()
+
+
+async def fail_job(
+    job: Job,
+    error: str,
+    backoff: Optional[float] = None,
+    on_failed: Optional[OnDealsFailed] = None,
+):
+    """Requeue a failed job with backoff, or mark it failed when out of attempts.
+
+    A job out of attempts also fails its deal, which is passed to `on_failed`.
+    """
+    if backoff is None:
+        backoff = JOB_RETRY_BACKOFF
+    retry = job.attempts < job.max_attempts
+    async with database.connection() as db:
+        await db.execute(
+            """
+            UPDATE jobs SET status = ?, available_at = ?, last_error = ?,
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (
+                QUEUED if retry else FAILED,
+                _timestamp(backoff * job.attempts if retry else 0),
+                error,
+                _timestamp(),
+                job.id,
+                job.lease_owner,
+            ),
+        )
+        if not retry:
+            await _fail_deals(db, [job.deal_id], error)
+        await db.commit()
+    if not retry:
+        await _deals_failed([job.deal_id], error, on_failed)
+
+
+async def release_job(job: Job, delay: float = 0.0):
+    """Return a leased job to the queue without consuming an attempt."""
+    async with database.connection() as db:
+        await db.execute(
+            """
+            UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), available_at = ?,
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (QUEUED, _timestamp(delay), _timestamp(), job.id, job.lease_owner),
+        )
+        await db.commit()
+
+
+async def reclaim_expired_leases(on_failed: Optional[OnDealsFailed] = None) -> int:
+    """Requeue jobs whose lease expired (worker crashed or hung).
+
+    Jobs that have used all their attempts are marked failed, along with
+    their deals (passed to `on_failed`), instead of being retried again.
+    """
+    error = "Extraction abandoned: worker lease expired too many times"
+    async with database.connection() as db:
+        now = _timestamp()
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            """
+            SELECT id, deal_id FROM jobs
+            WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts
+            """,
+            (LEASED, now),
+        )
+        exhausted = await cursor.fetchall()
+        await db.executemany(
+            """
+            UPDATE jobs SET status = ?, last_error = 'Lease expired',
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ?
+            """,
+            [(FAILED, now, row["id"]) for row in exhausted],
+        )
+        failed_deals = [row["deal_id"] for row in exhausted]
+        await _fail_deals(db, failed_deals, error)
+        cursor = await db.execute(
+            """
+            UPDATE jobs SET status = ?, available_at = ?,
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE status = ? AND lease_expires_at < ?
+            """,
+            (QUEUED, now, now, LEASED, now),
+        )
+        reclaimed = cursor.rowcount
+        await db.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, _timestamp(-JOB_RETENTION)),
+        )
+        await db.commit()
+    await _deals_failed(failed_deals, error, on_failed)
+    if reclaimed:
+        logger.warning("Reclaimed %d job(s) with expired leases", reclaimed)
+    return reclaimed
+
+
+async def queue_depth() -> dict[str, int]:
+    """Number of jobs per status."""
+    async with database.connection() as db:
+        cursor = await db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def lane_depth() -> dict[str, int]:
+    """Number of queued jobs per lane."""
+    async with database.connection() as db:
+        cursor = await db.execute(
+            "SELECT lane, COUNT(*) FROM jobs WHERE status = ? GROUP BY lane", (QUEUED,)
+        )
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+class WorkerPool:
+    """Fixed number of async workers that lease and run extraction jobs.
+
+    The worker count is the cap on concurrent extractions in this process;
+    OpenAI calls are further limited by the AIMD concurrency limiter, so
+    the pool should have at least its maximum of workers. Each free worker
+    asks the LaneScheduler which lane to serve next, so interactive
+    submissions keep flowing during bulk imports.
+
+    A handler raising CircuitOpenError has its job released, without using
+    an attempt, until the circuit is due to let a probe through. Any other
+    exception is retried with backoff until the job runs out of attempts;
+    deals failed that way (or by expired leases) are passed to
+    `on_deals_failed` so clients can be told.
+
+    Leases are extended while a job runs, so the visibility timeout only has
+    to cover a heartbeat interval. A crashed process simply stops extending
+    its leases, and another worker picks the jobs up once they expire.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], Awaitable[None]],
+        workers: int = EXTRACTION_WORKERS,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        scheduler: Optional[LaneScheduler] = None,
+        on_deals_failed: Optional[OnDealsFailed] = None,
+    ):
+        self.handler = handler
+        self.on_deals_failed = on_deals_failed
+        self.scheduler = scheduler or LaneScheduler()
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.owner_prefix = uuid.uuid4().hex[:8]
+
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+
+        # Counters
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.parked = 0
+        self.reclaimed = 0
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued."""
+        self._wakeup.set()
+
+    async def start(self):
+        self._stopped.clear()
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.owner_prefix}-{i}"))
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+        logger.info("Started %d extraction worker(s)", self.workers)
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop leasing; give running jobs `timeout` seconds, then cancel them."""
+        self._stopped.set()
+        self._wakeup.set()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped extraction workers")
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _reaper(self):
+        while not self._stopped.is_set():
+            try:
+                reclaimed = await reclaim_expired_leases(self.on_deals_failed)
+                if reclaimed:
+                    self.reclaimed += reclaimed
+                    self._wakeup.set()
+            except Exception:
+                logger.exception("Failed to reclaim expired job leases")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.visibility_timeout / 2)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await extend_lease(job, self.visibility_timeout):
+                logger.warning("[%s] Lost lease on job %d", job.deal_id, job.id)
+                return
+
+    async def _run(self, job: Job):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await self.handler(job.deal_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _lease(self, owner: str) -> Optional[Job]:
+        """Lease from the lane the scheduler prefers, falling through to others."""
+        for lane in self.scheduler.next_lanes():
+            job = await lease_job(owner, self.visibility_timeout, lane)
+            if job is not None:
+                wait = (datetime.utcnow() - job.available_at).total_seconds()
+                self.scheduler.record_dequeue(job.lane, wait)
+                return job
+        return None
+
+    async def _worker(self, owner: str):
+        while not self._stopped.is_set():
+            try:
+                job = await self._lease(owner)
+            except Exception:
+                logger.exception("Failed to lease job")
+                job = None
+            if job is None:
+                await self._wait_for_work()
+                continue
+
+            self.busy += 1
+            try:
+                await self._run(job)
+                await complete_job(job)
+                self.completed += 1
+            except asyncio.CancelledError:
+                await asyncio.shield(release_job(job))
+                raise
+            except CircuitOpenError as e:
+                # The dependency is down; wait it out without using an attempt
+                self.parked += 1
+                await release_job(job, e.retry_after)
+            except Exception as e:
+                logger.exception("[%s] Job %d failed", job.deal_id, job.id)
+                self.failed += 1
+                await fail_job(job, str(e), on_failed=self.on_deals_failed)
+            finally:
+                self.busy -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "completed": self.completed,
+            "failed": self.failed,
+            "parked": self.parked,
+            "reclaimed": self.reclaimed,
+        }
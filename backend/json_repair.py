@@ -0,0 +1,195 @@
+import json
+import re
+from collections import Counter
+from typing import Any, Optional
+
+from pydantic import ValidationError
+
+from models import ExtractedDeal
+
+MAX_BRIEF_ITEMS = 15
+LIST_FIELDS = ("founders", "investment_brief", "tags")
+STRING_FIELDS = ("sector", "geography", "stage", "round_size")
+
+
+def _scan(text: str) -> tuple[list[str], bool]:
+    """Return the stack of open brackets and whether the text ends inside a string."""
+    stack = []
+    in_string = escape = False
+    for c in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+        elif c in "}]" and stack:
+            stack.pop()
+    return stack, in_string
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket, outside of strings."""
+    out = []
+    in_string = escape = False
+    for c in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "}]":
+            # Remove a pending comma (and the whitespace after it)
+            end = len(out)
+            while end and out[end - 1].isspace():
+                end -= 1
+            if end and out[end - 1] == ",":
+                del out[end - 1]
+        out.append(c)
+    return "".join(out)
+
+
+def _close_truncated(text: str) -> str:
+    """Close a completion that was cut off mid-object."""
+    stack, in_string = _scan(text)
+    if in_string:
+        text += '"'
+    text = text.rstrip()
+    # A dangling separator or a key with no value cannot be completed
+    text = re.sub(r',\s*$', "", text)
+    text = re.sub(r',?\s*"(?:[^"\\]|\\.)*"\s*:\s*$', "", text)
+    text = text.rstrip().rstrip(",")
+    return text + "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+
+def _load(text: str, fixes: list[str]) -> Optional[Any]:
+    """Parse JSON, applying syntax fixes until it loads."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    end = text.rfind("}")
+    if end > start and _scan(text[start:end + 1]) == ([], False):
+        trimmed = text[start:end + 1]
+    else:
+        trimmed = text[start:]
+    if trimmed.strip() != text.strip():
+        fixes.append("surrounding_text")
+        text = trimmed
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    stripped = _strip_trailing_commas(text)
+    if stripped != text:
+        fixes.append("trailing_commas")
+        text = stripped
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+
+    closed = _strip_trailing_commas(_close_truncated(text))
+    if closed != text:
+        fixes.append("truncated")
+        try:
+            return json.loads(closed)
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def _as_str(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(value)
+
+
+def _fix_fields(data: dict, fixes: list[str]):
+    """Coerce field types the LLM commonly gets wrong, in place."""
+    for key in [k for k, v in data.items() if v is None and k != "company_name"]:
+        del data[key]
+        fixes.append("null_optional_field")
+
+    metrics = data.get("metrics")
+    if isinstance(metrics, dict):
+        for key, value in list(metrics.items()):
+            if value is None:
+                del metrics[key]
+                fixes.append("metrics_types")
+            elif not isinstance(value, str):
+                metrics[key] = _as_str(value)
+                fixes.append("metrics_types")
+
+    for field in LIST_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            data[field] = [value]
+            fixes.append("scalar_list")
+        elif isinstance(value, list) and any(not isinstance(v, str) for v in value):
+            data[field] = [v if isinstance(v, str) else _as_str(v) for v in value if v is not None]
+            fixes.append("list_item_types")
+
+    for field in STRING_FIELDS:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            data[field] = _as_str(value) if not isinstance(value, list) else ", ".join(map(str, value))
+            fixes.append("string_types")
+
+    brief = data.get("investment_brief")
+    if isinstance(brief, list) and len(brief) > MAX_BRIEF_ITEMS:
+        data["investment_brief"] = brief[:MAX_BRIEF_ITEMS]
+        fixes.append("brief_too_long")
+
+
+def repair_locally(text: str) -> tuple[Optional[ExtractedDeal], list[str]]:
+    """Try deterministic fixes for a response that failed validation.
+
+    Returns the validated deal (or None if the response is beyond local
+    repair, e.g. company_name is missing) and the names of the fixes tried.
+    """
+    fixes: list[str] = []
+    data = _load(text, fixes)
+    if not isinstance(data, dict):
+        return None, fixes
+    _fix_fields(data, fixes)
+    try:
+        return ExtractedDeal(**data), sorted(set(fixes))
+    except ValidationError:
+        return None, sorted(set(fixes))
+
+
+class RepairStats:
+    """Counts how validation failures were resolved."""
+
+    def __init__(self):
+        self.failures = 0
+        self.local = 0
+        self.llm_requests = 0
+        self.llm = 0
+        self.unrepaired = 0
+        self.fixes: Counter[str] = Counter()
+
+    def stats(self) -> dict:
+        repaired = self.local + self.llm
+        return {
+            "validation_failures": self.failures,
+            "repaired_locally": self.local,
+            "llm_repair_requests": self.llm_requests,
+            "repaired_by_llm": self.llm,
+            "unrepaired": self.unrepaired,
+            "local_share": self.local / repaired if repaired else 0.0,
+            "fixes": dict(self.fixes),
+        }
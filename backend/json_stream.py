@@ -0,0 +1,168 @@
+import json
+from typing import Any, Optional
+
+WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """Incrementally scan a streamed JSON object and report completed values.
+
+    `feed()` takes the next chunk of text and returns the events it
+    completed, in order:
+
+      {"field": key, "value": value}                 a top-level field is complete
+      {"field": key, "index": n, "value": value}     item n of a top-level array is complete
+
+    Strings and containers are reported the moment they close; numbers and
+    literals when the following delimiter arrives. Only the top-level object
+    is tracked; nested values are reported whole. The scanner never
+    backtracks, so feeding a completion chunk by chunk costs O(total length).
+    Slices that fail to decode are skipped; the caller should still validate
+    the full text at the end.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        # Top-level object state: "key", "colon", "value", "primitive", "after"
+        self._mode = "key"
+        self._key: Optional[str] = None
+        self._key_start = 0
+        self._value_start = 0
+        # Items of a top-level array
+        self._in_array = False
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self.text += chunk
+        events: list[dict[str, Any]] = []
+        text = self.text
+        i = self._pos
+        while i < len(text) and not self._done:
+            c = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._mode == "key":
+                        self._key = _decode(text[self._key_start:i + 1])
+                        self._mode = "colon"
+                    elif self._depth == 1 and self._mode == "value":
+                        self._emit_field(events, text[self._value_start:i + 1])
+                    elif self._depth == 2 and self._in_array:
+                        self._emit_item(events, text[self._item_start:i + 1])
+                i += 1
+                continue
+
+            if self._depth == 0:
+                # Skip anything before the opening brace (e.g. a code fence)
+                if c == "{":
+                    self._depth = 1
+                    self._mode = "key"
+                i += 1
+                continue
+
+            if self._depth == 1:
+                self._scan_top_level(c, i, events)
+                i += 1
+                continue
+
+            # Inside a nested value of the current top-level field
+            if self._in_array and self._depth == 2 and self._item_start is None \
+                    and c not in WHITESPACE and c not in ",]":
+                self._item_start = i
+            if c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._in_array and self._depth == 2:
+                    self._emit_item(events, self._pending_item(i))
+                self._depth -= 1
+                if self._depth == 1:
+                    self._emit_field(events, text[self._value_start:i + 1])
+                elif self._depth == 2 and self._in_array:
+                    self._emit_item(events, text[self._item_start:i + 1])
+            elif c == "," and self._in_array and self._depth == 2:
+                self._emit_item(events, self._pending_item(i))
+            i += 1
+
+        self._pos = i
+        return events
+
+    def _scan_top_level(self, c: str, i: int, events: list):
+        if self._mode == "primitive":
+            if c in ",}":
+                self._emit_field(events, self.text[self._value_start:i])
+                self._mode = "after"
+            else:
+                return
+        if c in WHITESPACE:
+            return
+        if self._mode == "key":
+            if c == '"':
+                self._in_string = True
+                self._key_start = i
+            elif c == "}":
+                self._depth = 0
+                self._done = True
+        elif self._mode == "colon":
+            if c == ":":
+                self._mode = "value"
+        elif self._mode == "value":
+            self._value_start = i
+            if c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth = 2
+                self._in_array = c == "["
+                self._item_start = None
+                self._item_index = 0
+            else:
+                self._mode = "primitive"
+        elif self._mode == "after":
+            if c == ",":
+                self._mode = "key"
+            elif c == "}":
+                self._depth = 0
+                self._done = True
+
+    def _pending_item(self, end: int) -> str:
+        return self.text[self._item_start:end] if self._item_start is not None else ""
+
+    def _emit_field(self, events: list, raw: str):
+        self._mode = "after"
+        self._in_array = False
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        events.append({"field": self._key, "value": value})
+
+    def _emit_item(self, events: list, raw: str):
+        self._item_start = None
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        events.append({"field": self._key, "index": self._item_index, "value": value})
+        self._item_index += 1
+
+
+def _decode(raw: str) -> Optional[str]:
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
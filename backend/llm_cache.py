@@ -0,0 +1,144 @@
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional
+
+import database
+from models import ExtractedDeal
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_version(*prompts: str) -> str:
+    """Short, stable fingerprint of the prompt templates used for extraction."""
+    digest = hashlib.sha256()
+    for prompt in prompts:
+        digest.update(prompt.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class LLMCache:
+    """Persistent cache of validated extractions in the llm_cache table.
+
+    Entries are keyed by (content_hash, prompt_version, model), so editing a
+    prompt or switching models never serves stale output. When the stored
+    JSON exceeds `max_bytes`, least recently used entries are evicted.
+    Cache failures are logged and counted but never fail an extraction.
+    """
+
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024):
+        self.max_bytes = max_bytes
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    async def get(self, content_hash: str, version: str, model: str) -> Optional[ExtractedDeal]:
+        """Return the cached extraction, or None on miss or error."""
+        if not self.enabled:
+            return None
+        try:
+            async with database.connection() as db:
+                cursor = await db.execute(
+                    """
+                    SELECT extracted FROM llm_cache
+                    WHERE content_hash = ? AND prompt_version = ? AND model = ?
+                    """,
+                    (content_hash, version, model),
+                )
+                row = await cursor.fetchone()
+                if row is not None:
+                    await db.execute(
+                        """
+                        UPDATE llm_cache SET hits = hits + 1, last_used_at = ?
+                        WHERE content_hash = ? AND prompt_version = ? AND model = ?
+                        """,
+                        (datetime.utcnow().isoformat(), content_hash, version, model),
+                    )
+                await db.commit()
+            if row is None:
+                self.misses += 1
+                return None
+            extracted = ExtractedDeal.model_validate_json(row["extracted"])
+        except Exception as e:
+            self.errors += 1
+            logger.warning("LLM cache lookup failed: %s", e)
+            return None
+        self.hits += 1
+        return extracted
+
+    async def put(self, content_hash: str, version: str, model: str, extracted: ExtractedDeal):
+        """Store a validated extraction and evict down to `max_bytes`."""
+        if not self.enabled:
+            return
+        payload = extracted.model_dump_json()
+        now = datetime.utcnow().isoformat()
+        try:
+            async with database.connection() as db:
+                await db.execute(
+                    """
+                    INSERT INTO llm_cache (content_hash, prompt_version, model, extracted,
+                                           size_bytes, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(content_hash, prompt_version, model) DO UPDATE SET
+                        extracted = excluded.extracted,
+                        size_bytes = excluded.size_bytes,
+                        last_used_at = excluded.last_used_at
+                    """,
+                    (content_hash, version, model, payload, len(payload.encode()), now, now),
+                )
+                # Keep the most recently used entries that fit in max_bytes
+                cursor = await db.execute(
+                    """
+                    DELETE FROM llm_cache WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, SUM(size_bytes) OVER (
+                                ORDER BY last_used_at DESC, rowid DESC
+                            ) AS kept
+                            FROM llm_cache
+                        )
+                        WHERE kept > ?
+                    )
+                    """,
+                    (self.max_bytes,),
+                )
+                evicted = cursor.rowcount
+                await db.commit()
+        except Exception as e:
+            self.errors += 1
+            logger.warning("LLM cache write failed: %s", e)
+            return
+        self.writes += 1
+        if evicted > 0:
+            self.evictions += evicted
+            logger.info("LLM cache evicted %d entries", evicted)
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+        try:
+            async with database.connection() as db:
+                cursor = await db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_cache"
+                )
+                stats["entries"], stats["bytes"] = await cursor.fetchone()
+        except Exception as e:
+            logger.warning("LLM cache stats unavailable: %s", e)
+        return stats
@@ -1,11 +1,29 @@
+import asyncio
 import os
 import json
 import logging
-from openai import AsyncOpenAI
+import time
+from typing import Awaitable, Callable, Optional
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
 from pydantic import ValidationError
 
 from models import ExtractedDeal, DealStatus
 from database import update_deal_status, update_deal_extracted, get_deal_by_id
+import cascade
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from concurrency import LLM_CONCURRENCY_MAX, LLM_CONCURRENCY_MIN, AIMDLimiter
+from hedging import Hedger
+from json_repair import RepairStats, repair_locally
+from json_stream import IncrementalJSONParser
+from llm_cache import LLMCache, prompt_version
+from rate_limiter import OpenAIRateLimiter, estimate_tokens
+import structured_output
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,18 +31,78 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds before an OpenAI request times out; the timeout counts against the
+# circuit breaker and cuts the AIMD concurrency limit
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
 _client = None
 
 
+def create_client(**kwargs) -> AsyncOpenAI:
+    """OpenAI client with OPENAI_TIMEOUT and no SDK retries.
+
+    The job queue retries failed extractions; retries inside the SDK would
+    bypass the rate limiter and hide 429s from the concurrency limiter.
+    """
+    kwargs.setdefault("api_key", os.getenv("OPENAI_API_KEY"))
+    return AsyncOpenAI(max_retries=0, timeout=OPENAI_TIMEOUT, **kwargs)
+
+
 def get_client() -> AsyncOpenAI:
     """Lazy initialization of OpenAI client."""
     global _client
     if _client is None:
-        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        _client = create_client()
     return _client
 
 MAX_RETRIES = 2
 
+# Cheaper models first; later tiers run only when earlier ones fail
+MODEL_CASCADE = cascade.parse_cascade(cascade.EXTRACTION_MODEL_CASCADE)
+EXTRACTION_MODEL = MODEL_CASCADE[-1]
+# Total JSON bytes kept in the persistent extraction cache; 0 disables it
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Send a strict JSON schema (OpenAI structured outputs) instead of plain JSON mode
+EXTRACTION_STRUCTURED_OUTPUTS = os.getenv(
+    "EXTRACTION_STRUCTURED_OUTPUTS", "false"
+).lower() in ("1", "true", "yes")
+# Stream completions and push fields to WebSocket subscribers as they complete
+EXTRACTION_STREAMING = os.getenv("EXTRACTION_STREAMING", "false").lower() in ("1", "true", "yes")
+# Send a backup request when an extraction runs past the usual latency (non-streaming only)
+EXTRACTION_HEDGING = os.getenv("EXTRACTION_HEDGING", "false").lower() in ("1", "true", "yes")
+
+# Account limits for the shared limiter; corrected from response headers
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "30000"))
+# Seconds of budget the limiter lets through in one burst
+OPENAI_RATE_BURST_SECONDS = float(os.getenv("OPENAI_RATE_BURST_SECONDS", "10"))
+# Completion tokens reserved per call on top of the prompt estimate
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("EXPECTED_COMPLETION_TOKENS", "800"))
+
+# Server processes sharing the OpenAI account (uvicorn starts this many when
+# --workers is not given). The limiters are per process, so each one takes an
+# equal share of the account limits and of LLM_CONCURRENCY_MAX.
+SERVER_PROCESSES = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+
+rate_limiter = OpenAIRateLimiter(
+    OPENAI_RPM_LIMIT,
+    OPENAI_TPM_LIMIT,
+    OPENAI_RATE_BURST_SECONDS,
+    share=1 / SERVER_PROCESSES,
+)
+concurrency_limiter = AIMDLimiter(
+    max_limit=max(LLM_CONCURRENCY_MAX / SERVER_PROCESSES, LLM_CONCURRENCY_MIN),
+    overload_errors=(RateLimitError, APITimeoutError, asyncio.TimeoutError),
+)
+# Connection errors, timeouts and 5xx mean OpenAI is down; 429s and 4xx do not
+circuit_breaker = CircuitBreaker(
+    "openai",
+    failure_errors=(APIConnectionError, InternalServerError, asyncio.TimeoutError),
+)
+
+# Transient OpenAI errors; the job queue retries deals that hit them
+RETRYABLE_ERRORS = (APIConnectionError, InternalServerError, RateLimitError, asyncio.TimeoutError)
+
 EXTRACTION_PROMPT = """
 Extract deal information from the following text and return valid JSON matching this schema:
 
@@ -57,21 +135,170 @@ Your previous response had validation errors:
 Please fix and return valid JSON matching the schema. Return ONLY the corrected JSON.
 """
 
+# Changing either prompt invalidates every cached extraction
+PROMPT_VERSION = prompt_version(EXTRACTION_PROMPT, REPAIR_PROMPT)
+
+response_cache = LLMCache(max_bytes=LLM_CACHE_MAX_BYTES)
+repair_stats = RepairStats()
+hedger = Hedger()
+
 
-async def extract_deal_data(raw_text: str) -> str:
-    """Extract structured data from raw deal text using LLM."""
+async def create_chat_completion(
+    messages: list[dict], on_sent: Optional[Callable[[], None]] = None, **kwargs
+):
+    """Call the chat completions API through the shared rate and concurrency limiters.
+
+    Reserves one request plus the estimated prompt and completion tokens,
+    then corrects the limiter from the response headers and actual usage.
+    The call itself holds an adaptive concurrency slot; `on_sent` is called
+    once it has one. While the circuit breaker is open, CircuitOpenError is
+    raised without calling OpenAI.
+
+    A cancelled call (e.g. a losing hedge) gives back its completion tokens,
+    or its whole reservation if it was never sent.
+    """
+    async with circuit_breaker.guard():
+        reserved = _reserve_tokens(messages)
+        await rate_limiter.acquire(reserved)
+        sent = False
+        try:
+            async with concurrency_limiter.slot():
+                if on_sent is not None:
+                    on_sent()
+                sent = True
+                raw = await get_client().chat.completions.with_raw_response.create(
+                    messages=messages, **kwargs
+                )
+        except RateLimitError as e:
+            _on_rate_limited(e)
+            raise
+        except asyncio.CancelledError:
+            if sent:
+                rate_limiter.refund(EXPECTED_COMPLETION_TOKENS)
+            else:
+                rate_limiter.refund(reserved, request=True)
+            raise
+
+    rate_limiter.update_from_headers(raw.headers)
+    response = raw.parse()
+    if response.usage is not None:
+        rate_limiter.reconcile(reserved, response.usage.total_tokens)
+    return response
+
+
+async def stream_chat_completion(
+    messages: list[dict], on_delta: Callable[[str], Awaitable[None]], **kwargs
+) -> str:
+    """Stream a chat completion through the shared limiters.
+
+    `on_delta` is awaited with each chunk of content as it arrives; the
+    full completion text is returned.
+    """
+    parts = []
+    usage = None
+    async with circuit_breaker.guard():
+        reserved = _reserve_tokens(messages)
+        await rate_limiter.acquire(reserved)
+        try:
+            async with concurrency_limiter.slot():
+                raw = await get_client().chat.completions.with_raw_response.create(
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs,
+                )
+                rate_limiter.update_from_headers(raw.headers)
+                async for chunk in raw.parse():
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        await on_delta(parts[-1])
+        except RateLimitError as e:
+            _on_rate_limited(e)
+            raise
+
+    if usage is not None:
+        rate_limiter.reconcile(reserved, usage.total_tokens)
+    return "".join(parts)
+
+
+def _reserve_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages) + EXPECTED_COMPLETION_TOKENS
+
+
+def _response_format() -> dict:
+    if EXTRACTION_STRUCTURED_OUTPUTS:
+        return structured_output.response_format(ExtractedDeal)
+    return {"type": "json_object"}
+
+
+def _from_response(content: str) -> str:
+    if EXTRACTION_STRUCTURED_OUTPUTS:
+        return structured_output.from_structured(content, ExtractedDeal)
+    return content
+
+
+def _on_rate_limited(error: RateLimitError):
+    logger.warning("OpenAI rate limit hit: %s", error)
+    rate_limiter.on_rate_limited(error.response.headers)
+
+
+async def extract_deal_data(
+    raw_text: str,
+    on_field: Optional[Callable[[dict], Awaitable[None]]] = None,
+    model: str = EXTRACTION_MODEL,
+) -> str:
+    """Extract structured data from raw deal text using LLM.
+
+    With `on_field`, the completion is streamed and parsed incrementally;
+    `on_field` is awaited with each field or array item as soon as it is
+    complete (see IncrementalJSONParser). Otherwise, with EXTRACTION_HEDGING,
+    a slow request is hedged with a second one (see Hedger).
+    """
     logger.info("Starting LLM extraction, input length: %d chars", len(raw_text))
     prompt = EXTRACTION_PROMPT.format(raw_text=raw_text)
-
-    logger.debug("Sending request to GPT-4o")
-    response = await get_client().chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"},
+    request = dict(
+        model=model,
+        response_format=_response_format(),
         temperature=0.1,
     )
 
-    result = response.choices[0].message.content
+    logger.debug("Sending request to %s", model)
+    if on_field is None:
+        def call(on_sent=None):
+            return create_chat_completion(
+                [{"role": "user", "content": prompt}], on_sent=on_sent, **request
+            )
+
+        response = await (hedger.run(model, call) if EXTRACTION_HEDGING else call())
+        result = response.choices[0].message.content
+    else:
+        parser = IncrementalJSONParser()
+        start = time.monotonic()
+        first_field = None
+
+        async def on_delta(delta: str):
+            nonlocal first_field
+            for event in parser.feed(delta):
+                if EXTRACTION_STRUCTURED_OUTPUTS:
+                    event = structured_output.from_structured_event(event, ExtractedDeal)
+                    if event is None:
+                        continue
+                if first_field is None:
+                    first_field = time.monotonic() - start
+                await on_field(event)
+
+        result = await stream_chat_completion(
+            [{"role": "user", "content": prompt}], on_delta, **request
+        )
+        if first_field is not None:
+            logger.info(
+                "Streamed extraction: first field after %.2fs of %.2fs",
+                first_field, time.monotonic() - start,
+            )
+
+    result = _from_response(result)
     logger.info("LLM extraction complete, output length: %d chars", len(result))
     logger.debug("LLM response: %s", result[:500])
     return result
@@ -86,31 +313,80 @@ async def validate_and_parse(json_str: str) -> ExtractedDeal:
     return result
 
 
-async def repair_json(original_response: str, errors: str) -> str:
+async def repair_json(original_response: str, errors: str, model: str = EXTRACTION_MODEL) -> str:
     """Ask LLM to repair invalid JSON based on validation errors."""
     logger.warning("Attempting to repair JSON, errors: %s", errors)
     prompt = REPAIR_PROMPT.format(errors=errors)
 
-    response = await get_client().chat.completions.create(
-        model="gpt-4o",
-        messages=[
+    response = await create_chat_completion(
+        [
             {"role": "user", "content": f"Original response:\n{original_response}"},
             {"role": "user", "content": prompt},
         ],
-        response_format={"type": "json_object"},
+        model=model,
+        response_format=_response_format(),
         temperature=0.1,
     )
 
-    result = response.choices[0].message.content
+    result = _from_response(response.choices[0].message.content)
     logger.info("Repair complete, new response length: %d chars", len(result))
     return result
 
 
+async def validate_with_repair(
+    deal_id: str, json_response: str, model: str, llm_repair: bool = True
+) -> tuple[Optional[ExtractedDeal], Optional[str]]:
+    """Validate a response, fixing what we can locally before asking the LLM.
+
+    Returns the validated deal (or None) and the last validation error.
+    With `llm_repair=False` only local fixes are tried.
+    """
+    last_error = None
+    llm_repaired = False
+    for attempt in range(MAX_RETRIES):
+        logger.info("[%s] Validation attempt %d/%d", deal_id, attempt + 1, MAX_RETRIES)
+        try:
+            extracted = await validate_and_parse(json_response)
+            if llm_repaired:
+                repair_stats.llm += 1
+            return extracted, last_error
+        except (json.JSONDecodeError, ValidationError) as e:
+            last_error = str(e)
+            logger.warning("[%s] Validation failed: %s", deal_id, last_error)
+            repair_stats.failures += 1
+            extracted, fixes = repair_locally(json_response)
+            repair_stats.fixes.update(fixes)
+            if extracted is not None:
+                logger.info("[%s] Repaired locally: %s", deal_id, ", ".join(fixes))
+                repair_stats.local += 1
+                return extracted, last_error
+            if not llm_repair or attempt == MAX_RETRIES - 1:
+                break
+            # Try to repair
+            logger.info("[%s] Attempting repair...", deal_id)
+            repair_stats.llm_requests += 1
+            json_response = await repair_json(json_response, last_error, model=model)
+            llm_repaired = True
+    return None, last_error
+
+
 async def process_deal_extraction(deal_id: str, ws_manager=None):
     """
     Process deal extraction with retry logic.
 
+    Each model in MODEL_CASCADE is tried in turn until one produces a valid
+    result that passes the cascade quality checks; only the final tier gets
+    an LLM repair round trip. Every tier's outcome is recorded in
+    extraction_attempts.
+
     Status flow: pending → extracting → validating → completed/failed
+    (escalation returns to extracting)
+
+    If the OpenAI circuit breaker is open, the deal goes back to pending and
+    CircuitOpenError is re-raised so the worker can requeue the job.
+    Transient OpenAI errors (RETRYABLE_ERRORS) also return the deal to
+    pending and are re-raised, so the job queue retries them with backoff
+    and fails the deal once the job is out of attempts.
     """
     logger.info("=" * 50)
     logger.info("Starting deal extraction for deal_id: %s", deal_id)
@@ -129,44 +405,104 @@ async def process_deal_extraction(deal_id: str, ws_manager=None):
 
         logger.info("[%s] Retrieved deal, raw_text length: %d chars", deal_id, len(deal.raw_text))
 
-        # Extract data from LLM
-        json_response = await extract_deal_data(deal.raw_text)
-
-        # Update status to validating
-        logger.info("[%s] Status: VALIDATING", deal_id)
-        await update_deal_status(deal_id, DealStatus.VALIDATING)
-        if ws_manager:
-            await ws_manager.broadcast_status(deal_id, DealStatus.VALIDATING)
-
-        # Try to validate
-        last_error = None
-        for attempt in range(MAX_RETRIES):
-            logger.info("[%s] Validation attempt %d/%d", deal_id, attempt + 1, MAX_RETRIES)
-            try:
-                extracted = await validate_and_parse(json_response)
-
-                # Success - update deal with extracted data
-                logger.info("[%s] Status: COMPLETED - Successfully extracted data", deal_id)
-                await update_deal_extracted(deal_id, extracted)
+        for model in MODEL_CASCADE:
+            cached = await response_cache.get(deal.content_hash, PROMPT_VERSION, model)
+            if cached is not None:
+                logger.info("[%s] Status: COMPLETED - Served from LLM cache (%s)", deal_id, model)
+                await update_deal_extracted(deal_id, cached)
                 if ws_manager:
-                    await ws_manager.broadcast_status(deal_id, DealStatus.COMPLETED)
+                    await ws_manager.broadcast_status(deal_id, DealStatus.COMPLETED, extracted=cached)
                 logger.info("=" * 50)
                 return
 
-            except (json.JSONDecodeError, ValidationError) as e:
-                last_error = str(e)
-                logger.warning("[%s] Validation failed: %s", deal_id, last_error)
-                if attempt < MAX_RETRIES - 1:
-                    # Try to repair
-                    logger.info("[%s] Attempting repair...", deal_id)
-                    json_response = await repair_json(json_response, last_error)
+        on_field = None
+        if EXTRACTION_STREAMING and ws_manager:
+            async def on_field(event: dict):
+                await ws_manager.broadcast_partial(deal_id, event)
 
-        # All retries exhausted - mark as failed
+        last_error = None
+        fallback = None  # valid lower-tier result that failed quality checks
+        for tier, model in enumerate(MODEL_CASCADE):
+            final = tier == len(MODEL_CASCADE) - 1
+            if tier > 0:
+                # Escalating: back to extracting with the next model
+                await update_deal_status(deal_id, DealStatus.EXTRACTING)
+                if ws_manager:
+                    await ws_manager.broadcast_status(deal_id, DealStatus.EXTRACTING)
+            start = time.monotonic()
+
+            # Extract data from LLM
+            logger.info("[%s] Extracting with %s (tier %d)", deal_id, model, tier)
+            if on_field:
+                json_response = await extract_deal_data(deal.raw_text, on_field=on_field, model=model)
+            else:
+                json_response = await extract_deal_data(deal.raw_text, model=model)
+
+            # Update status to validating
+            logger.info("[%s] Status: VALIDATING", deal_id)
+            await update_deal_status(deal_id, DealStatus.VALIDATING)
+            if ws_manager:
+                await ws_manager.broadcast_status(deal_id, DealStatus.VALIDATING)
+
+            # Only the final tier pays for an LLM repair round trip
+            extracted, error = await validate_with_repair(
+                deal_id, json_response, model, llm_repair=final
+            )
+            issues = cascade.quality_issues(extracted) if extracted is not None else []
+            latency = time.monotonic() - start
+
+            if extracted is None or (issues and not final):
+                reason = "; ".join(issues) or error
+                last_error = error or last_error
+                outcome = cascade.FAILED if final else cascade.ESCALATED
+                logger.warning("[%s] %s %s: %s", deal_id, model, outcome, reason)
+                await cascade.record_attempt(deal_id, tier, model, outcome, latency, reason)
+                if extracted is not None:
+                    fallback = (model, extracted)
+                if not final or fallback is None:
+                    continue
+                # Better a lower tier's imperfect result than none
+                model, extracted = fallback
+                logger.info("[%s] Falling back to the %s result", deal_id, model)
+            else:
+                await cascade.record_attempt(
+                    deal_id, tier, model, cascade.ACCEPTED, latency, "; ".join(issues) or None
+                )
+
+            # Success - update deal with extracted data
+            logger.info("[%s] Status: COMPLETED - Successfully extracted data", deal_id)
+            await update_deal_extracted(deal_id, extracted)
+            await response_cache.put(deal.content_hash, PROMPT_VERSION, model, extracted)
+            if ws_manager:
+                await ws_manager.broadcast_status(deal_id, DealStatus.COMPLETED, extracted=extracted)
+            logger.info("=" * 50)
+            return
+
+        # Every tier failed - mark as failed
+        repair_stats.unrepaired += 1
         logger.error("[%s] Status: FAILED - All retries exhausted. Last error: %s", deal_id, last_error)
         await update_deal_status(deal_id, DealStatus.FAILED, last_error)
         if ws_manager:
             await ws_manager.broadcast_status(deal_id, DealStatus.FAILED, last_error)
 
+    except CircuitOpenError as e:
+        # OpenAI is down - park the deal instead of failing it
+        logger.warning("[%s] Status: PENDING - %s", deal_id, e)
+        await update_deal_status(deal_id, DealStatus.PENDING)
+        if ws_manager:
+            await ws_manager.broadcast_status(deal_id, DealStatus.PENDING)
+        logger.info("=" * 50)
+        raise
+
+    except RETRYABLE_ERRORS as e:
+        # Transient - let the job queue retry it
+        logger.warning("[%s] Status: PENDING - Retryable error: %s", deal_id, e)
+        await update_deal_status(deal_id, DealStatus.PENDING)
+        if ws_manager:
+            await ws_manager.broadcast_status(deal_id, DealStatus.PENDING)
+        logger.info("=" * 50)
+        raise
+
     except Exception as e:
         # Unexpected error - mark as failed
         logger.exception("[%s] Status: FAILED - Unexpected error: %s", deal_id, str(e))
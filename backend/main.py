@@ -1,22 +1,45 @@
+import asyncio
 import hashlib
+import math
 import uuid
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from datetime import datetime
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect, WebSocketException
+from starlette.status import WS_1008_POLICY_VIOLATION
 from fastapi.middleware.cors import CORSMiddleware
 
-from models import DealCreate, DealResponse, DealListResponse, DealStatus
+from models import DealCreate, DealResponse, DealListResponse, DealStatus, JobLane
 from database import (
     init_db,
-    create_deal,
-    get_deal_by_hash,
+    init_pool,
+    close_pool,
+    connection,
+    get_pool,
+    read_pragmas,
+    SQLITE_PRAGMAS,
+    deal_cache,
+    create_or_get_deal,
     get_deal_by_id,
     list_deals,
     update_deal_status,
 )
-from llm_service import process_deal_extraction
-from websocket import ws_manager
+from cascade import get_attempts, tier_stats
+from job_queue import EXTRACTION_WORKERS, WorkerPool, enqueue_job, lane_depth, queue_depth
+from llm_service import (
+    circuit_breaker,
+    concurrency_limiter,
+    hedger,
+    process_deal_extraction,
+    rate_limiter,
+    repair_stats,
+    response_cache,
+)
+from recovery import RecoveryReport, recover_stuck_deals
+from websocket import DealFilter, parse_fields, ws_manager
 
 MAX_INPUT_SIZE = 10 * 1024  # 10KB
+MAX_PAGE_SIZE = 100
 
 
 def compute_content_hash(text: str) -> str:
@@ -25,11 +48,58 @@ def compute_content_hash(text: str) -> str:
     return hashlib.sha256(normalized.encode()).hexdigest()
 
 
+async def run_extraction_job(deal_id: str):
+    """Job handler: run the extraction pipeline with WebSocket updates."""
+    await process_deal_extraction(deal_id, ws_manager)
+
+
+async def on_deals_failed(deal_ids: list[str], error: str):
+    """Tell waiting clients the queue gave up on their deal."""
+    for deal_id in deal_ids:
+        await ws_manager.broadcast_status(deal_id, DealStatus.FAILED, error)
+
+
+# At least as many workers as the AIMD controller may allow calls in flight,
+# otherwise the worker count caps the limit before LLM_CONCURRENCY_MAX does
+worker_pool = WorkerPool(
+    run_extraction_job,
+    workers=max(EXTRACTION_WORKERS, math.ceil(concurrency_limiter.max_limit)),
+    on_deals_failed=on_deals_failed,
+)
+recovery_report = RecoveryReport()
+
+
+async def on_recovered_batch(deal_ids: list[str]):
+    """Wake workers and tell waiting clients their deal is queued again."""
+    worker_pool.notify()
+    for deal_id in deal_ids:
+        await ws_manager.broadcast_status(deal_id, DealStatus.PENDING)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
+    """Initialize database, connection pool and extraction workers on startup.
+
+    Deals orphaned mid-pipeline by a previous process are re-enqueued in the
+    background so startup is not delayed.
+    """
     await init_db()
-    yield
+    await init_pool()
+    await worker_pool.start()
+    recovery = asyncio.create_task(
+        recover_stuck_deals(recovery_report, on_batch=on_recovered_batch)
+    )
+    pruner = asyncio.create_task(ws_manager.event_log.run_pruner())
+    event_bus = asyncio.create_task(ws_manager.bus.run())
+    try:
+        yield
+    finally:
+        recovery.cancel()
+        pruner.cancel()
+        event_bus.cancel()
+        await asyncio.gather(recovery, pruner, event_bus, return_exceptions=True)
+        await worker_pool.stop()
+        await close_pool()
 
 
 app = FastAPI(
@@ -50,15 +120,61 @@ app.add_middleware(
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint.
+
+    Always 200 while the API is up; an open OpenAI circuit only delays
+    extractions, it does not make the service unhealthy.
+    """
+    return {
+        "status": "healthy",
+        "openai_circuit": {
+            "state": circuit_breaker.state,
+            "retry_after_seconds": round(circuit_breaker.retry_after(), 1),
+        },
+    }
+
+
+@app.get("/api/diagnostics/db")
+async def db_diagnostics():
+    """Report the configured and active SQLite settings plus pool stats."""
+    async with connection() as db:
+        active = await read_pragmas(db)
+    return {
+        "configured_pragmas": SQLITE_PRAGMAS,
+        "active_pragmas": active,
+        "pool": get_pool().stats(),
+    }
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """In-process performance counters."""
+    return {
+        "deal_cache": deal_cache.stats(),
+        "jobs": {**worker_pool.stats(), "queue": await queue_depth()},
+        "recovery": recovery_report.as_dict(),
+        "lanes": worker_pool.scheduler.stats(await lane_depth()),
+        "openai_rate_limiter": rate_limiter.stats(),
+        "llm_concurrency": concurrency_limiter.stats(),
+        "llm_cache": await response_cache.stats(),
+        "json_repair": repair_stats.stats(),
+        "model_tiers": await tier_stats(),
+        "hedging": hedger.stats(),
+        "openai_circuit": circuit_breaker.stats(),
+        "websocket": ws_manager.stats(),
+        "deal_events": ws_manager.event_log.stats(),
+        "event_bus": ws_manager.bus.stats(),
+    }
 
 
 @app.post("/api/deals", response_model=DealResponse, status_code=201)
 async def create_deal_endpoint(
-    deal: DealCreate, background_tasks: BackgroundTasks
+    deal: DealCreate, lane: JobLane = JobLane.INTERACTIVE
 ) -> DealResponse:
-    """Submit new deal text for extraction."""
+    """Submit new deal text for extraction.
+
+    Imports should pass `lane=bulk` so they yield to interactive submissions.
+    """
     # Check input size limit
     if len(deal.raw_text.encode("utf-8")) > MAX_INPUT_SIZE:
         raise HTTPException(
@@ -69,29 +185,57 @@ async def create_deal_endpoint(
     # Compute hash for deduplication
     content_hash = compute_content_hash(deal.raw_text)
 
-    # Check for duplicate
-    existing = await get_deal_by_hash(content_hash)
-    if existing:
+    # Create new deal, or detect a duplicate in the same statement
+    deal_id = str(uuid.uuid4())
+    new_deal, existing_id = await create_or_get_deal(deal_id, content_hash, deal.raw_text)
+    if existing_id:
         raise HTTPException(
             status_code=409,
-            detail={"message": "Duplicate deal detected", "existing_id": existing.id},
+            detail={"message": "Duplicate deal detected", "existing_id": existing_id},
         )
 
-    # Create new deal
-    deal_id = str(uuid.uuid4())
-    new_deal = await create_deal(deal_id, content_hash, deal.raw_text)
-
-    # Queue extraction task with WebSocket manager for real-time updates
-    background_tasks.add_task(process_deal_extraction, deal_id, ws_manager)
+    # Queue extraction; a worker picks it up and pushes WebSocket updates
+    await enqueue_job(deal_id, lane=lane)
+    worker_pool.notify()
+    await ws_manager.broadcast_created(new_deal)
 
     return new_deal
 
 
 @app.get("/api/deals", response_model=DealListResponse)
-async def list_deals_endpoint() -> DealListResponse:
-    """List latest 10 deals."""
-    deals = await list_deals(limit=10)
-    return DealListResponse(deals=deals)
+async def list_deals_endpoint(
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[DealStatus] = None,
+    stage: Optional[str] = None,
+    sector: Optional[str] = None,
+    tag: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    full: bool = False,
+) -> DealListResponse:
+    """List deals newest first; pass `next_cursor` back as `cursor` for the next page.
+
+    Returns lightweight summaries unless `full=true` is passed. `last_seq`
+    lets a client open the firehose without missing changes made meanwhile.
+    """
+    # Read first, so an event logged while the list is read is replayed
+    last_seq = await ws_manager.event_log.latest_seq()
+    try:
+        deals, next_cursor = await list_deals(
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            stage=stage,
+            sector=sector,
+            tag=tag,
+            created_after=created_after,
+            created_before=created_before,
+            full=full,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DealListResponse(deals=deals, next_cursor=next_cursor, last_seq=last_seq)
 
 
 @app.get("/api/deals/{deal_id}", response_model=DealResponse)
@@ -103,10 +247,69 @@ async def get_deal_endpoint(deal_id: str) -> DealResponse:
     return deal
 
 
+@app.get("/api/deals/{deal_id}/attempts")
+async def get_deal_attempts_endpoint(deal_id: str) -> dict:
+    """Model cascade attempts for a deal, in order."""
+    deal = await get_deal_by_id(deal_id)
+    if not deal:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    return {"deal_id": deal_id, "attempts": await get_attempts(deal_id)}
+
+
+def _ws_fields(values: Optional[list[str]]) -> Optional[frozenset[str]]:
+    """Validate the `fields` query parameter, refusing the connection if invalid."""
+    try:
+        return parse_fields(values)
+    except ValueError as e:
+        raise WebSocketException(code=WS_1008_POLICY_VIOLATION, reason=str(e))
+
+
+@app.websocket("/ws/deals")
+async def deals_firehose_endpoint(
+    websocket: WebSocket,
+    event: Optional[list[str]] = Query(None),
+    status: Optional[list[DealStatus]] = Query(None),
+    sector: Optional[list[str]] = Query(None),
+    stage: Optional[list[str]] = Query(None),
+    last_seq: Optional[int] = None,
+    fields: Optional[list[str]] = Query(None),
+):
+    """Subscribe to created/status/completed events for all deals.
+
+    Each filter may be repeated; a deal matches if it has any of the given
+    values. With no filters every event is sent. With `last_seq`, logged
+    events after it are replayed first. `fields` adds those extracted
+    fields to completion events.
+    """
+    selected = _ws_fields(fields) or frozenset()
+    deal_filter = DealFilter(
+        events=frozenset(event or ()),
+        statuses=frozenset(s.value for s in status or ()),
+        sectors=frozenset(sector or ()),
+        stages=frozenset(stage or ()),
+    )
+    await ws_manager.connect_firehose(websocket, deal_filter, last_seq, selected)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        ws_manager.disconnect_firehose(websocket)
+
+
 @app.websocket("/ws/deals/{deal_id}")
-async def websocket_endpoint(websocket: WebSocket, deal_id: str):
-    """Subscribe to real-time status updates for a deal."""
-    await ws_manager.connect(deal_id, websocket)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    deal_id: str,
+    last_seq: Optional[int] = None,
+    fields: Optional[list[str]] = Query(None),
+):
+    """Subscribe to real-time status updates for a deal.
+
+    The current state is sent on connect; a reconnecting client passes the
+    last `seq` it saw to get only the events it missed. Completion events
+    carry the extracted deal, limited to `fields` if given.
+    """
+    await ws_manager.connect(deal_id, websocket, last_seq, _ws_fields(fields))
     try:
         # Keep connection open, listen for client messages (ping/pong)
         while True:
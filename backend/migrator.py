@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_FILE_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# A backfill migration starts with a directive such as
+#   -- backfill: table=deals batch_size=500
+# and contains a single statement that processes the rowid range
+# (:start, :end]. The runner walks the table in chunks, committing after each.
+BACKFILL_DIRECTIVE_RE = re.compile(r"^--\s*backfill:(?P<options>.*)$", re.MULTILINE)
+
+DEFAULT_BACKFILL_BATCH_SIZE = 1000
+
+
+class MigrationError(Exception):
+    """Raised when migrations are malformed or fail to apply."""
+
+
+@dataclass
+class Backfill:
+    table: str
+    batch_size: int
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+    backfill: Optional[Backfill] = None
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split a SQL script into complete statements (trigger bodies included)."""
+    statements = []
+    buffer = ""
+    for char in sql:
+        buffer += char
+        if char == ";" and sqlite3.complete_statement(buffer):
+            statement = buffer.strip()
+            if _strip_comments(statement):
+                statements.append(statement)
+            buffer = ""
+    if _strip_comments(buffer):
+        raise MigrationError(f"Incomplete SQL statement: {buffer.strip()[:80]}")
+    return statements
+
+
+def _strip_comments(sql: str) -> str:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return "\n".join(lines).strip().rstrip(";").strip()
+
+
+def _parse_backfill(sql: str, name: str) -> Optional[Backfill]:
+    match = BACKFILL_DIRECTIVE_RE.search(sql)
+    if not match:
+        return None
+    options = dict(
+        item.split("=", 1) for item in match.group("options").split() if "=" in item
+    )
+    table = options.get("table")
+    if not table or not re.fullmatch(r"\w+", table):
+        raise MigrationError(f"Backfill migration {name} must name a table")
+    return Backfill(
+        table=table,
+        batch_size=int(options.get("batch_size", DEFAULT_BACKFILL_BATCH_SIZE)),
+    )
+
+
+def discover_migrations(path: str) -> list[Migration]:
+    """Load numbered NNN_name.sql files from `path`, ordered by version."""
+    if not os.path.isdir(path):
+        return []
+
+    migrations = {}
+    for filename in os.listdir(path):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(path, filename)) as f:
+            sql = f.read()
+        migrations[version] = Migration(
+            version=version,
+            name=match.group(2),
+            sql=sql,
+            backfill=_parse_backfill(sql, filename),
+        )
+    return [migrations[v] for v in sorted(migrations)]
+
+
+async def _table_exists(db: aiosqlite.Connection, table: str) -> bool:
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    )
+    return await cursor.fetchone() is not None
+
+
+async def applied_versions(db: aiosqlite.Connection) -> set[int]:
+    """Versions recorded in schema_version (empty for a fresh database)."""
+    if not await _table_exists(db, "schema_version"):
+        return set()
+    cursor = await db.execute("SELECT version FROM schema_version")
+    return {row[0] for row in await cursor.fetchall()}
+
+
+async def _ensure_bookkeeping(db: aiosqlite.Connection):
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS backfill_progress (
+            version INTEGER PRIMARY KEY,
+            last_rowid INTEGER NOT NULL
+        )
+        """
+    )
+    await db.commit()
+
+
+async def _record(db: aiosqlite.Connection, migration: Migration):
+    await db.execute(
+        "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+        (migration.version, migration.name, datetime.utcnow().isoformat()),
+    )
+
+
+async def _begin(db: aiosqlite.Connection, migration: Migration) -> bool:
+    """Take the write lock; False (and no transaction) if `migration` is already applied.
+
+    Another process may have applied it since we last looked, so check
+    again while holding the lock.
+    """
+    await db.execute("BEGIN IMMEDIATE")
+    if migration.version in await applied_versions(db):
+        await db.rollback()
+        return False
+    return True
+
+
+async def _apply_schema(db: aiosqlite.Connection, migration: Migration) -> bool:
+    """Apply every statement of a migration in one transaction.
+
+    Returns False if another process applied it first.
+    """
+    if not await _begin(db, migration):
+        return False
+    try:
+        for statement in split_statements(migration.sql):
+            await db.execute(statement)
+        await _record(db, migration)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise MigrationError(
+            f"Migration {migration.version}_{migration.name} failed: {e}"
+        ) from e
+    return True
+
+
+async def _apply_backfill(
+    db: aiosqlite.Connection, migration: Migration, pause: float
+) -> bool:
+    """Run a backfill statement over rowid chunks, committing after each.
+
+    Progress is stored in backfill_progress so an interrupted backfill
+    resumes where it stopped instead of starting over. Each chunk reads the
+    progress under the write lock, so processes running the same backfill
+    share the chunks instead of repeating them. Returns False if another
+    process recorded the migration first.
+    """
+    statements = split_statements(migration.sql)
+    if len(statements) != 1:
+        raise MigrationError(
+            f"Backfill migration {migration.version}_{migration.name} "
+            "must contain exactly one statement"
+        )
+    statement = statements[0]
+    backfill = migration.backfill
+
+    cursor = await db.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {backfill.table}")
+    max_rowid = (await cursor.fetchone())[0]
+
+    chunks = 0
+    while True:
+        if not await _begin(db, migration):
+            return False
+        cursor = await db.execute(
+            "SELECT last_rowid FROM backfill_progress WHERE version = ?",
+            (migration.version,),
+        )
+        row = await cursor.fetchone()
+        last_rowid = row[0] if row else 0
+        if last_rowid >= max_rowid:
+            break
+        end = last_rowid + backfill.batch_size
+        try:
+            await db.execute(statement, {"start": last_rowid, "end": end})
+            await db.execute(
+                "INSERT OR REPLACE INTO backfill_progress (version, last_rowid) VALUES (?, ?)",
+                (migration.version, end),
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise MigrationError(
+                f"Backfill {migration.version}_{migration.name} failed at rowid {last_rowid}: {e}"
+            ) from e
+        chunks += 1
+        # Yield between chunks so other connections can take the write lock
+        await asyncio.sleep(pause)
+
+    # Still holding the write lock taken for the last progress check
+    try:
+        await _record(db, migration)
+        await db.execute(
+            "DELETE FROM backfill_progress WHERE version = ?", (migration.version,)
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    logger.info(
+        "Backfill %d_%s complete: %d chunk(s) of %d rows",
+        migration.version, migration.name, chunks, backfill.batch_size,
+    )
+    return True
+
+
+async def run_migrations(
+    db: aiosqlite.Connection, path: str, backfill_pause: float = 0.0
+) -> list[int]:
+    """Apply unapplied migrations in version order; returns the versions applied.
+
+    A fully migrated database only reads schema_version and executes no DDL.
+    Safe to run from several processes at once: each migration is applied
+    under the write lock, and one that another process applied meanwhile is
+    skipped (and not included in the result).
+    """
+    migrations = discover_migrations(path)
+    applied_already = await applied_versions(db)
+    pending = [m for m in migrations if m.version not in applied_already]
+    if not pending:
+        logger.info("Database schema is up to date (%d migrations)", len(applied_already))
+        return []
+
+    await _ensure_bookkeeping(db)
+    applied = []
+    for migration in pending:
+        logger.info("Applying migration %d_%s", migration.version, migration.name)
+        if migration.backfill:
+            done = await _apply_backfill(db, migration, backfill_pause)
+        else:
+            done = await _apply_schema(db, migration)
+        if done:
+            applied.append(migration.version)
+    return applied
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 from enum import Enum
 
@@ -12,6 +12,12 @@ class DealStatus(str, Enum):
     FAILED = "failed"
 
 
+class JobLane(str, Enum):
+    """Priority lane for extraction jobs."""
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+
 class ExtractedDeal(BaseModel):
     """Schema for LLM-extracted deal information."""
     company_name: str = Field(..., min_length=1)
@@ -57,9 +63,23 @@ class DealResponse(BaseModel):
     updated_at: datetime
 
 
+class DealSummary(BaseModel):
+    """Lightweight projection of a deal for list views."""
+    id: str
+    status: DealStatus
+    company_name: Optional[str] = None
+    sector: Optional[str] = None
+    stage: Optional[str] = None
+    created_at: datetime
+
+
 class DealListResponse(BaseModel):
     """Response model for listing deals."""
-    deals: list[DealResponse]
+    deals: list[Union[DealResponse, DealSummary]]
+    next_cursor: Optional[str] = None
+    # Newest deal event before the list was read; pass it as `last_seq` to
+    # the firehose to get every change made since
+    last_seq: Optional[int] = None
 
 
 class WebSocketMessage(BaseModel):
@@ -69,3 +89,5 @@ class WebSocketMessage(BaseModel):
     status: DealStatus
     data: Optional[dict] = None
     error: Optional[str] = None
+    # Position in the deal event log; None for events that are not logged
+    seq: Optional[int] = None
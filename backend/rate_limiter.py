@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough prompt-size heuristic: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used to reserve TPM capacity before a call."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def parse_reset_duration(value: str) -> Optional[float]:
+    """Parse OpenAI reset headers such as "1s", "6m0s" or "20ms" into seconds."""
+    matches = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value or "")
+    if not matches:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in matches)
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled continuously."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.refill_per_second
+        )
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def limit_to(self, remaining: float):
+        """Lower the level to what the server reports as remaining."""
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+
+    def resize(self, capacity: float, refill_per_second: float):
+        self._refill()
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = min(self.tokens, capacity)
+
+
+class OpenAIRateLimiter:
+    """Shared request (RPM) and token (TPM) buckets for OpenAI calls.
+
+    Callers reserve one request plus their estimated tokens before each
+    call; waiters are served in FIFO order. After a call the reservation is
+    reconciled with actual usage, and the buckets follow the account limits
+    and remaining budget reported in the x-ratelimit-* response headers.
+
+    When several processes share the account, each takes `share` of the
+    limits and of the reported remaining budget.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        burst_seconds: float = 60,
+        share: float = 1.0,
+    ):
+        # OpenAI smooths its limits over windows shorter than a minute, so the
+        # buckets hold `burst_seconds` worth of budget rather than a full minute.
+        self.burst_seconds = burst_seconds
+        self.share = share
+        self.requests = self._bucket(requests_per_minute)
+        self.tokens = self._bucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+        # Counters
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.rate_limited = 0
+
+    def _bucket(self, account_per_minute: float) -> TokenBucket:
+        per_minute = account_per_minute * self.share
+        return TokenBucket(max(per_minute * self.burst_seconds / 60, 1), per_minute / 60)
+
+    async def acquire(self, tokens: int):
+        """Wait until one request and `tokens` tokens can be reserved."""
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                delay = max(
+                    self._blocked_until - time.monotonic(),
+                    self.requests.time_until(1),
+                    self.tokens.time_until(tokens),
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+        self.acquired += 1
+        self.waited_seconds += time.monotonic() - start
+
+    def reconcile(self, reserved: int, used: int):
+        """Return over-reserved tokens, or charge the extra if usage was higher."""
+        if used < reserved:
+            self.tokens.refund(reserved - used)
+        elif used > reserved:
+            self.tokens.consume(used - reserved)
+
+    def refund(self, tokens: int, request: bool = False):
+        """Return the reservation of a call that was cancelled.
+
+        Pass `request` if the call was never sent.
+        """
+        self.tokens.refund(tokens)
+        if request:
+            self.requests.refund(1)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Adopt the account limits and remaining budget reported by OpenAI."""
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if limit:
+                limit = float(limit) * self.share
+                if not math.isclose(limit, bucket.refill_per_second * 60):
+                    logger.info(
+                        "OpenAI %s limit is %s/min, adjusting limiter to %s/min",
+                        kind, headers[f"x-ratelimit-limit-{kind}"], limit,
+                    )
+                    bucket.resize(max(limit * self.burst_seconds / 60, 1), limit / 60)
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is not None:
+                bucket.limit_to(float(remaining) * self.share)
+
+    def block_for(self, seconds: float):
+        """Pause all callers for `seconds` (e.g. after a 429 with retry-after)."""
+        self.rate_limited += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def on_rate_limited(self, headers: Mapping[str, str]):
+        """Handle a 429: drain the buckets and honour retry-after."""
+        self.update_from_headers(headers)
+        retry_after = None
+        if headers.get("retry-after-ms"):
+            retry_after = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            retry_after = parse_reset_duration(headers["retry-after"])
+        if retry_after is None:
+            retry_after = max(
+                parse_reset_duration(headers.get("x-ratelimit-reset-requests", "")) or 0,
+                parse_reset_duration(headers.get("x-ratelimit-reset-tokens", "")) or 0,
+                1.0,
+            )
+        self.block_for(retry_after)
+
+    def stats(self) -> dict:
+        self.requests._refill()
+        self.tokens._refill()
+        return {
+            "share": self.share,
+            "requests_per_minute": self.requests.refill_per_second * 60,
+            "tokens_per_minute": self.tokens.refill_per_second * 60,
+            "available_requests": round(self.requests.tokens, 2),
+            "available_tokens": round(self.tokens.tokens, 2),
+            "acquired": self.acquired,
+            "waited_seconds": round(self.waited_seconds, 3),
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+import aiosqlite
+
+import database
+from job_queue import LEASED, QUEUED, insert_job
+from models import DealStatus, JobLane
+
+logger = logging.getLogger(__name__)
+
+# Deals in a non-terminal state that have not been touched for this many
+# seconds and have no active job are considered orphaned.
+RECOVERY_STALE_AFTER = float(os.getenv("RECOVERY_STALE_AFTER", "60"))
+RECOVERY_BATCH_SIZE = int(os.getenv("RECOVERY_BATCH_SIZE", "50"))
+RECOVERY_BATCH_INTERVAL = float(os.getenv("RECOVERY_BATCH_INTERVAL", "5"))
+
+NON_TERMINAL_STATUSES = (DealStatus.PENDING, DealStatus.EXTRACTING, DealStatus.VALIDATING)
+
+
+@dataclass
+class RecoveryReport:
+    recovered: int = 0
+    batches: int = 0
+    running: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "recovered": self.recovered,
+            "batches": self.batches,
+            "running": self.running,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+async def claim_stuck_deals(older_than: float, limit: int) -> list[str]:
+    """Reset up to `limit` stuck deals to pending and queue a bulk job for each.
+
+    The deals are selected and re-enqueued under the database write lock, so
+    when several server processes sweep at once each deal is claimed by one
+    of them; the others no longer see it as stuck.
+    """
+    async with database.connection() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        deal_ids = await _select_stuck(db, older_than, limit)
+        now = datetime.utcnow().isoformat()
+        await db.executemany(
+            "UPDATE deals SET status = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+            [(DealStatus.PENDING.value, now, deal_id) for deal_id in deal_ids],
+        )
+        for deal_id in deal_ids:
+            await insert_job(db, deal_id, lane=JobLane.BULK)
+        await db.commit()
+    # Only after the commit, so a concurrent read cannot cache the old row
+    for deal_id in deal_ids:
+        database.deal_cache.invalidate(deal_id)
+    return deal_ids
+
+
+async def _select_stuck(db: aiosqlite.Connection, older_than: float, limit: int) -> list[str]:
+    """Deals stuck mid-pipeline with no queued or running job."""
+    cutoff = (datetime.utcnow() - timedelta(seconds=older_than)).isoformat()
+    statuses = [s.value for s in NON_TERMINAL_STATUSES]
+    cursor = await db.execute(
+        f"""
+        SELECT id FROM deals
+        WHERE status IN ({", ".join("?" * len(statuses))})
+          AND updated_at < ?
+          AND NOT EXISTS (
+              SELECT 1 FROM jobs
+              WHERE jobs.deal_id = deals.id AND jobs.status IN (?, ?)
+          )
+        ORDER BY updated_at
+        LIMIT ?
+        """,
+        (*statuses, cutoff, QUEUED, LEASED, limit),
+    )
+    return [row["id"] for row in await cursor.fetchall()]
+
+
+async def recover_stuck_deals(
+    report: RecoveryReport,
+    older_than: float = RECOVERY_STALE_AFTER,
+    batch_size: int = RECOVERY_BATCH_SIZE,
+    batch_interval: float = RECOVERY_BATCH_INTERVAL,
+    on_batch: Optional[Callable[[list[str]], Awaitable[None]]] = None,
+    resweep: bool = True,
+) -> RecoveryReport:
+    """Reset orphaned deals to pending and re-enqueue them in paced batches.
+
+    Recovered deals go to the bulk lane so they do not delay new submissions.
+
+    Batches are `batch_interval` seconds apart so that a restart after an
+    incident does not dump thousands of extractions on the workers at once.
+    `on_batch` is awaited with the deal ids of each batch (e.g. to wake the
+    worker pool and notify subscribers).
+
+    Several server processes may sweep at the same time; each batch is
+    claimed under the database write lock (see `claim_stuck_deals`), so
+    every deal is recovered, and reported to `on_batch`, only once.
+
+    A deal the previous process touched less than `older_than` seconds
+    before the restart is not stale yet at startup. With `resweep`, the
+    sweep runs again once `older_than` seconds have passed, which picks up
+    those deals.
+    """
+    report.running = True
+    report.started_at = datetime.utcnow()
+    loop = asyncio.get_running_loop()
+    resweep_at = loop.time() + older_than
+    try:
+        await _sweep(report, older_than, batch_size, batch_interval, on_batch)
+        if resweep:
+            await asyncio.sleep(max(0.0, resweep_at - loop.time()))
+            await _sweep(report, older_than, batch_size, batch_interval, on_batch)
+    except Exception:
+        logger.exception("Recovery sweep failed after %d deal(s)", report.recovered)
+        raise
+    finally:
+        report.running = False
+        report.finished_at = datetime.utcnow()
+
+    logger.info(
+        "Recovery sweep finished: %d deal(s) re-enqueued in %d batch(es)",
+        report.recovered, report.batches,
+    )
+    return report
+
+
+async def _sweep(
+    report: RecoveryReport,
+    older_than: float,
+    batch_size: int,
+    batch_interval: float,
+    on_batch: Optional[Callable[[list[str]], Awaitable[None]]],
+):
+    while True:
+        deal_ids = await claim_stuck_deals(older_than, batch_size)
+        if not deal_ids:
+            return
+
+        report.recovered += len(deal_ids)
+        report.batches += 1
+        logger.info(
+            "Recovery batch %d: re-enqueued %d stuck deal(s)", report.batches, len(deal_ids)
+        )
+        if on_batch:
+            await on_batch(deal_ids)
+        if len(deal_ids) < batch_size:
+            return
+        await asyncio.sleep(batch_interval)
@@ -0,0 +1,92 @@
+import os
+from collections import deque
+from typing import Optional
+
+from models import JobLane
+
+
+def parse_lane_weights(spec: str) -> dict[JobLane, int]:
+    """Parse "interactive=4,bulk=1" into lane weights."""
+    weights = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        weight = int(value)
+        if weight < 1:
+            raise ValueError(f"Lane weight must be at least 1: {item!r}")
+        weights[JobLane(name.strip())] = weight
+    for lane in JobLane:
+        weights.setdefault(lane, 1)
+    return weights
+
+
+LANE_WEIGHTS = parse_lane_weights(os.getenv("JOB_LANE_WEIGHTS", "interactive=4,bulk=1"))
+
+# Number of recent dequeues per lane used for wait-time percentiles
+WAIT_SAMPLE_SIZE = 500
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LaneScheduler:
+    """Weighted fair choice between job lanes.
+
+    Uses smooth weighted round-robin: with weights interactive=4, bulk=1 a
+    busy system takes four interactive jobs for every bulk job, and bulk
+    work is never starved. Each call to `next_lanes()` returns every lane,
+    preferred lane first, so idle capacity falls through to other lanes.
+    The round-robin only moves on when `record_dequeue()` reports a job
+    from the preferred lane; polls that lease nothing, or lease from a
+    fallback lane, leave the ratio untouched.
+    """
+
+    def __init__(self, weights: Optional[dict[JobLane, int]] = None):
+        self.weights = dict(weights or LANE_WEIGHTS)
+        self._current = {lane: 0 for lane in self.weights}
+        self._waits = {lane: deque(maxlen=WAIT_SAMPLE_SIZE) for lane in self.weights}
+        self.dequeued = {lane: 0 for lane in self.weights}
+
+    def _preferred(self) -> JobLane:
+        return max(self.weights, key=lambda lane: self._current[lane] + self.weights[lane])
+
+    def next_lanes(self) -> list[JobLane]:
+        chosen = self._preferred()
+        others = sorted(
+            (lane for lane in self.weights if lane != chosen),
+            key=lambda lane: -self.weights[lane],
+        )
+        return [chosen, *others]
+
+    def record_dequeue(self, lane: JobLane, wait_seconds: float):
+        """Record that a job left `lane` after waiting `wait_seconds`."""
+        if lane == self._preferred():
+            total = sum(self.weights.values())
+            for other, weight in self.weights.items():
+                self._current[other] += weight
+            self._current[lane] -= total
+        self.dequeued[lane] += 1
+        self._waits[lane].append(max(wait_seconds, 0.0))
+
+    def stats(self, queued: Optional[dict[str, int]] = None) -> dict:
+        queued = queued or {}
+        lanes = {}
+        for lane, weight in self.weights.items():
+            waits = sorted(self._waits[lane])
+            lanes[lane.value] = {
+                "weight": weight,
+                "queued": queued.get(lane.value, 0),
+                "dequeued": self.dequeued[lane],
+                "wait_ms": {
+                    "avg": 1000 * sum(waits) / len(waits) if waits else 0.0,
+                    "p50": 1000 * percentile(waits, 50),
+                    "p95": 1000 * percentile(waits, 95),
+                    "max": 1000 * waits[-1] if waits else 0.0,
+                },
+            }
+        return lanes
@@ -0,0 +1,92 @@
+import json
+from typing import Any, Optional, get_args, get_origin
+
+from pydantic import BaseModel
+
+from models import ExtractedDeal
+
+SCHEMA_NAME = "extracted_deal"
+
+
+def _field_schema(annotation: Any) -> dict:
+    if annotation is str:
+        return {"type": "string"}
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is list:
+        return {"type": "array", "items": _field_schema(args[0])}
+    if origin is dict and args == (str, str):
+        # Strict mode requires fixed object keys, so maps become key/value pairs
+        return {
+            "type": "array",
+            "description": "Key/value pairs",
+            "items": {
+                "type": "object",
+                "properties": {"key": {"type": "string"}, "value": {"type": "string"}},
+                "required": ["key", "value"],
+                "additionalProperties": False,
+            },
+        }
+    raise TypeError(f"No strict JSON schema mapping for {annotation!r}")
+
+
+def strict_json_schema(model: type[BaseModel] = ExtractedDeal) -> dict:
+    """Build an OpenAI strict-mode JSON schema from a pydantic model.
+
+    Strict mode needs every property listed as required and
+    additionalProperties disabled, and does not allow free-form maps, so
+    dict[str, str] fields are sent as lists of {"key", "value"} objects.
+    Length limits (e.g. the 15-bullet brief) are left to pydantic
+    validation and local repair.
+    """
+    properties = {
+        name: _field_schema(field.annotation) for name, field in model.model_fields.items()
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def response_format(model: type[BaseModel] = ExtractedDeal) -> dict:
+    """The `response_format` argument for a schema-enforced completion."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": SCHEMA_NAME, "strict": True, "schema": strict_json_schema(model)},
+    }
+
+
+def from_structured(content: str, model: type[BaseModel] = ExtractedDeal) -> str:
+    """Convert a structured-output completion back to the model's JSON shape.
+
+    Content that does not parse is returned unchanged for the normal
+    validation and repair path.
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return content
+    if not isinstance(data, dict):
+        return content
+    for name, field in model.model_fields.items():
+        value = data.get(name)
+        if get_origin(field.annotation) is dict and isinstance(value, list):
+            data[name] = {
+                item["key"]: item["value"]
+                for item in value
+                if isinstance(item, dict) and "key" in item and "value" in item
+            }
+    return json.dumps(data)
+
+
+def from_structured_event(event: dict, model: type[BaseModel] = ExtractedDeal) -> Optional[dict]:
+    """Convert a streamed field event; key/value pair items of map fields are dropped."""
+    field = model.model_fields.get(event.get("field"))
+    if field is None or get_origin(field.annotation) is not dict:
+        return event
+    if "index" in event or not isinstance(event["value"], list):
+        return None
+    return {"field": event["field"], "value": json.loads(
+        from_structured(json.dumps({event["field"]: event["value"]}), model)
+    )[event["field"]]}
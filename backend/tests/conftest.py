@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+import database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    """Fresh migrated database with an open connection pool."""
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "deals.db"))
+    monkeypatch.setattr(database, "MIGRATIONS_PATH", MIGRATIONS_DIR)
+    database.deal_cache.clear()
+    await database.init_db()
+    pool = await database.init_pool()
+    yield pool
+    await database.close_pool()
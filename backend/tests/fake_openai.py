@@ -0,0 +1,130 @@
+"""A minimal fake of the OpenAI chat completions API that enforces rate limits."""
+import asyncio
+import json
+import time
+from typing import Optional
+
+from rate_limiter import TokenBucket, estimate_tokens
+
+
+class FakeOpenAI:
+    """ASGI app serving POST /v1/chat/completions with RPM/TPM enforcement.
+
+    Over-limit requests get a 429 with retry-after and x-ratelimit-* headers,
+    like the real API; accepted requests report usage and remaining budget.
+    Requests with "stream": true get server-sent events carrying the
+    completion in `chunk_size`-character deltas, `chunk_delay` seconds apart.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 burst_seconds: float = 60, completion: Optional[dict] = None,
+                 completion_tokens: int = 50, chunk_size: int = 8,
+                 chunk_delay: float = 0.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(requests_per_minute * burst_seconds / 60, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute * burst_seconds / 60, tokens_per_minute / 60)
+        self.completion = completion or {"company_name": "Acme"}
+        self.completion_tokens = completion_tokens
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.served = 0
+        self.rejected = 0
+        self.last_request: Optional[dict] = None
+
+    def _headers(self) -> list[tuple[bytes, bytes]]:
+        headers = {
+            "content-type": "application/json",
+            "x-ratelimit-limit-requests": str(int(self.requests_per_minute)),
+            "x-ratelimit-limit-tokens": str(int(self.tokens_per_minute)),
+            "x-ratelimit-remaining-requests": str(max(int(self.requests.tokens), 0)),
+            "x-ratelimit-remaining-tokens": str(max(int(self.tokens.tokens), 0)),
+        }
+        return [(k.encode(), v.encode()) for k, v in headers.items()]
+
+    async def __call__(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        request = json.loads(body)
+        self.last_request = request
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in request["messages"])
+        total = prompt_tokens + self.completion_tokens
+
+        wait = max(self.requests.time_until(1), self.tokens.time_until(total))
+        if wait > 0:
+            self.rejected += 1
+            status = 429
+            headers = self._headers() + [(b"retry-after-ms", str(int(wait * 1000) + 1).encode())]
+            payload = {"error": {"message": "Rate limit reached", "type": "requests",
+                                 "code": "rate_limit_exceeded"}}
+        elif request.get("stream"):
+            self.served += 1
+            self.requests.consume(1)
+            self.tokens.consume(total)
+            await self._stream(send, request, prompt_tokens, total)
+            return
+        else:
+            self.served += 1
+            self.requests.consume(1)
+            self.tokens.consume(total)
+            status = 200
+            headers = self._headers()
+            payload = {
+                "id": f"chatcmpl-{self.served}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps(self.completion)},
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": self.completion_tokens,
+                    "total_tokens": total,
+                },
+            }
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+    async def _stream(self, send, request: dict, prompt_tokens: int, total: int):
+        headers = [(k, v) for k, v in self._headers() if k != b"content-type"]
+        headers.append((b"content-type", b"text/event-stream"))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+
+        def event(choices: list, usage: Optional[dict] = None) -> dict:
+            return {
+                "id": f"chatcmpl-{self.served}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": choices,
+                "usage": usage,
+            }
+
+        content = json.dumps(self.completion)
+        events = [
+            event([{"index": 0, "delta": {"role": "assistant", "content": content[i:i + self.chunk_size]},
+                    "finish_reason": None}])
+            for i in range(0, len(content), self.chunk_size)
+        ]
+        events.append(event([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if request.get("stream_options", {}).get("include_usage"):
+            events.append(event([], {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": total,
+            }))
+
+        for payload in events:
+            body = f"data: {json.dumps(payload)}\n\n".encode()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import pytest
+
+import database
+import main
+from job_queue import queue_depth
+
+
+@pytest.fixture
+async def client(db):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+class TestCreateDealDedupe:
+    """Tests for atomic duplicate detection on POST /api/deals."""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_returns_409_with_existing_id(self, client):
+        first = await client.post("/api/deals", json={"raw_text": "Acme raises $5M"})
+        second = await client.post("/api/deals", json={"raw_text": "  ACME raises   $5M "})
+
+        assert first.status_code == 201
+        assert second.status_code == 409
+        assert second.json()["detail"]["existing_id"] == first.json()["id"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_submissions(self, client):
+        responses = await asyncio.gather(*(
+            client.post("/api/deals", json={"raw_text": "Same pitch email"})
+            for _ in range(300)
+        ))
+
+        created = [r for r in responses if r.status_code == 201]
+        duplicates = [r for r in responses if r.status_code == 409]
+        assert len(created) == 1
+        assert len(duplicates) == 299
+        created_id = created[0].json()["id"]
+        assert {r.json()["detail"]["existing_id"] for r in duplicates} == {created_id}
+        assert await queue_depth() == {"queued": 1}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("returning", [True, False])
+    async def test_create_or_get_deal(self, db, monkeypatch, returning):
+        monkeypatch.setattr(database, "SQLITE_SUPPORTS_RETURNING", returning)
+
+        new_deal, existing_id = await database.create_or_get_deal("a", "hash", "text")
+        assert new_deal.id == "a"
+        assert existing_id is None
+
+        new_deal, existing_id = await database.create_or_get_deal("b", "hash", "text")
+        assert new_deal is None
+        assert existing_id == "a"
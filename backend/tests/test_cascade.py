@@ -0,0 +1,142 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+import database
+import llm_service
+import main
+from cascade import get_attempts, parse_cascade, quality_issues, tier_stats
+from llm_cache import LLMCache
+from models import DealStatus, ExtractedDeal
+
+GOOD = json.dumps({"company_name": "Acme", "investment_brief": ["Strong team", "Large TAM"]})
+PLACEHOLDER = json.dumps({"company_name": "Unknown", "investment_brief": ["Something"]})
+INVALID = json.dumps({"investment_brief": ["No company"]})
+
+
+def by_model(**responses):
+    async def extract(raw_text, on_field=None, model=None):
+        return responses[model.replace("-", "_")]
+    return AsyncMock(side_effect=extract)
+
+
+@pytest.fixture
+async def deal(db, monkeypatch):
+    monkeypatch.setattr(llm_service, "MODEL_CASCADE", ["small-model", "large-model"])
+    monkeypatch.setattr(llm_service, "response_cache", LLMCache())
+    await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+    return "deal-1"
+
+
+class TestQualityChecks:
+    def test_parse_cascade(self):
+        assert parse_cascade(" gpt-4o-mini , gpt-4o ") == ["gpt-4o-mini", "gpt-4o"]
+        with pytest.raises(ValueError):
+            parse_cascade(" , ")
+
+    def test_placeholder_company_and_short_brief(self):
+        ok = ExtractedDeal(company_name="Acme", investment_brief=["a", "b"])
+        assert quality_issues(ok) == []
+        assert quality_issues(ok, min_brief_items=3) == ["2 brief bullet(s)"]
+        placeholder = ExtractedDeal(company_name=" N/A ", investment_brief=["a"])
+        assert quality_issues(placeholder) == ["placeholder company_name"]
+        blank = ExtractedDeal(company_name="Acme", investment_brief=["  "])
+        assert quality_issues(blank) == ["0 brief bullet(s)"]
+
+
+class TestModelCascade:
+    """process_deal_extraction tries cheaper models first."""
+
+    @pytest.mark.asyncio
+    async def test_cheap_model_result_is_kept(self, deal):
+        extract = by_model(small_model=GOOD, large_model=GOOD)
+        with patch("llm_service.extract_deal_data", extract):
+            await llm_service.process_deal_extraction(deal)
+
+        assert [c.kwargs["model"] for c in extract.await_args_list] == ["small-model"]
+        assert (await database.get_deal_by_id(deal)).status == DealStatus.COMPLETED
+        attempts = await get_attempts(deal)
+        assert [(a["model"], a["outcome"]) for a in attempts] == [("small-model", "accepted")]
+
+    @pytest.mark.asyncio
+    async def test_validation_failure_escalates_without_llm_repair(self, deal):
+        extract = by_model(small_model=INVALID, large_model=GOOD)
+        repair = AsyncMock(return_value=GOOD)
+        with patch("llm_service.extract_deal_data", extract), \
+             patch("llm_service.repair_json", repair):
+            await llm_service.process_deal_extraction(deal)
+
+        repair.assert_not_called()
+        assert [c.kwargs["model"] for c in extract.await_args_list] == ["small-model", "large-model"]
+        attempts = await get_attempts(deal)
+        assert [(a["tier"], a["outcome"]) for a in attempts] == [(0, "escalated"), (1, "accepted")]
+        assert "company_name" in attempts[0]["reason"]
+        assert (await database.get_deal_by_id(deal)).company_name == "Acme"
+
+    @pytest.mark.asyncio
+    async def test_quality_check_escalates(self, deal):
+        extract = by_model(small_model=PLACEHOLDER, large_model=GOOD)
+        with patch("llm_service.extract_deal_data", extract):
+            await llm_service.process_deal_extraction(deal)
+
+        attempts = await get_attempts(deal)
+        assert attempts[0]["reason"] == "placeholder company_name"
+        assert (await database.get_deal_by_id(deal)).company_name == "Acme"
+
+    @pytest.mark.asyncio
+    async def test_final_tier_gets_llm_repair(self, deal):
+        extract = by_model(small_model=INVALID, large_model=INVALID)
+        repair = AsyncMock(return_value=GOOD)
+        with patch("llm_service.extract_deal_data", extract), \
+             patch("llm_service.repair_json", repair):
+            await llm_service.process_deal_extraction(deal)
+
+        repair.assert_awaited_once()
+        assert repair.await_args.kwargs["model"] == "large-model"
+        assert (await database.get_deal_by_id(deal)).status == DealStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_lower_tier_when_final_tier_fails(self, deal):
+        extract = by_model(small_model=PLACEHOLDER, large_model=INVALID)
+        with patch("llm_service.extract_deal_data", extract), \
+             patch("llm_service.repair_json", AsyncMock(return_value=INVALID)):
+            await llm_service.process_deal_extraction(deal)
+
+        stored = await database.get_deal_by_id(deal)
+        assert stored.status == DealStatus.COMPLETED
+        assert stored.company_name == "Unknown"
+        outcomes = [a["outcome"] for a in await get_attempts(deal)]
+        assert outcomes == ["escalated", "failed"]
+
+    @pytest.mark.asyncio
+    async def test_all_tiers_failing_marks_deal_failed(self, deal):
+        extract = by_model(small_model=INVALID, large_model=INVALID)
+        with patch("llm_service.extract_deal_data", extract), \
+             patch("llm_service.repair_json", AsyncMock(return_value=INVALID)):
+            await llm_service.process_deal_extraction(deal)
+
+        stored = await database.get_deal_by_id(deal)
+        assert stored.status == DealStatus.FAILED
+        assert "company_name" in stored.last_error
+
+    @pytest.mark.asyncio
+    async def test_tier_stats_and_endpoints(self, deal):
+        extract = by_model(small_model=INVALID, large_model=GOOD)
+        with patch("llm_service.extract_deal_data", extract):
+            await llm_service.process_deal_extraction(deal)
+
+        stats = {row["model"]: row for row in await tier_stats()}
+        assert stats["small-model"]["success_rate"] == 0.0
+        assert stats["small-model"]["escalated"] == 1
+        assert stats["large-model"]["success_rate"] == 1.0
+        assert stats["large-model"]["avg_latency_ms"] >= 0
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/api/deals/{deal}/attempts")
+            assert [a["model"] for a in response.json()["attempts"]] == ["small-model", "large-model"]
+            assert (await client.get("/api/deals/missing/attempts")).status_code == 404
+            metrics = (await client.get("/api/metrics")).json()
+            assert len(metrics["model_tiers"]) == 2
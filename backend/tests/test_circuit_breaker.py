@@ -0,0 +1,233 @@
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+import pytest
+from openai import APITimeoutError
+
+import database
+import llm_service
+import main
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from concurrency import AIMDLimiter
+from job_queue import WorkerPool, enqueue_job, lease_job, queue_depth
+from models import DealStatus
+from rate_limiter import OpenAIRateLimiter
+
+
+class Down(Exception):
+    pass
+
+
+async def call(breaker: CircuitBreaker, error: Optional[Exception] = None):
+    async with breaker.guard():
+        if error is not None:
+            raise error
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    return CircuitBreaker("test", failure_errors=(Down,), **kwargs)
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_consecutive_failures(self):
+        breaker = make_breaker(failure_threshold=3, reset_timeout=30)
+        for _ in range(2):
+            with pytest.raises(Down):
+                await call(breaker, Down())
+        assert breaker.state == CLOSED
+
+        # The tripping call is reported as an open circuit too
+        with pytest.raises(CircuitOpenError) as excinfo:
+            await call(breaker, Down())
+        assert breaker.state == OPEN
+        assert 29 < excinfo.value.retry_after <= 30
+
+        with pytest.raises(CircuitOpenError):
+            await call(breaker)
+        assert breaker.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_success_resets_failure_count(self):
+        breaker = make_breaker(failure_threshold=2)
+        with pytest.raises(Down):
+            await call(breaker, Down())
+        await call(breaker)
+        with pytest.raises(Down):
+            await call(breaker, Down())
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_other_errors_do_not_count(self):
+        breaker = make_breaker(failure_threshold=1)
+        with pytest.raises(ValueError):
+            await call(breaker, ValueError("bad request"))
+        assert breaker.state == CLOSED
+        assert breaker.consecutive_failures == 0
+
+    @pytest.mark.asyncio
+    async def test_half_open_lets_one_probe_through(self):
+        breaker = make_breaker(failure_threshold=1, reset_timeout=0.05)
+        with pytest.raises(CircuitOpenError):
+            await call(breaker, Down())
+        await asyncio.sleep(0.06)
+
+        probe_started = asyncio.Event()
+        finish_probe = asyncio.Event()
+
+        async def probe():
+            async with breaker.guard():
+                probe_started.set()
+                await finish_probe.wait()
+
+        task = asyncio.create_task(probe())
+        await probe_started.wait()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await call(breaker)
+
+        finish_probe.set()
+        await task
+        assert breaker.state == CLOSED
+        await call(breaker)
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_reopens(self):
+        breaker = make_breaker(failure_threshold=1, reset_timeout=0.05)
+        with pytest.raises(CircuitOpenError):
+            await call(breaker, Down())
+        await asyncio.sleep(0.06)
+        with pytest.raises(CircuitOpenError):
+            await call(breaker, Down())
+        assert breaker.state == OPEN
+        assert breaker.stats()["opened"] == 2
+
+
+@pytest.fixture
+def openai_down(monkeypatch):
+    """Point llm_service at an OpenAI that answers every request with a 503."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503, json={"error": {"message": "Service unavailable"}})
+
+    client = llm_service.create_client(
+        api_key="test",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=60,
+                             failure_errors=llm_service.circuit_breaker.failure_errors)
+    monkeypatch.setattr(llm_service, "get_client", lambda: client)
+    monkeypatch.setattr(llm_service, "circuit_breaker", breaker)
+    monkeypatch.setattr(main, "circuit_breaker", breaker)
+    monkeypatch.setattr(llm_service, "rate_limiter", OpenAIRateLimiter(6000, 1_000_000))
+    monkeypatch.setattr(llm_service, "concurrency_limiter", AIMDLimiter(initial=8))
+    monkeypatch.setattr(llm_service, "MODEL_CASCADE", ["gpt-4o"])
+    return requests
+
+
+@pytest.mark.asyncio
+async def test_openai_timeout_trips_breaker_and_cuts_concurrency(monkeypatch):
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client = llm_service.create_client(
+        api_key="test",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=60,
+                             failure_errors=llm_service.circuit_breaker.failure_errors)
+    limiter = AIMDLimiter(initial=8, overload_errors=llm_service.concurrency_limiter.overload_errors)
+    monkeypatch.setattr(llm_service, "get_client", lambda: client)
+    monkeypatch.setattr(llm_service, "circuit_breaker", breaker)
+    monkeypatch.setattr(llm_service, "rate_limiter", OpenAIRateLimiter(6000, 1_000_000))
+    monkeypatch.setattr(llm_service, "concurrency_limiter", limiter)
+    monkeypatch.setattr(llm_service, "MODEL_CASCADE", ["gpt-4o"])
+
+    # The timeout is the failure that opens the circuit
+    with pytest.raises(CircuitOpenError) as raised:
+        await llm_service.extract_deal_data("Acme raises a seed round")
+    assert isinstance(raised.value.__cause__, APITimeoutError)
+
+    assert timeouts == [llm_service.OPENAI_TIMEOUT]
+    assert breaker.state == OPEN
+    assert limiter.stats()["limit"] == 4
+
+
+class TestExtractionWhileOpenAIDown:
+    @pytest.mark.asyncio
+    async def test_deals_are_parked_and_later_calls_fail_fast(self, db, openai_down):
+        for i in range(4):
+            await database.create_deal(f"deal-{i}", f"hash-{i}", "Acme raises a seed round")
+
+        # The first deal's error goes back to the job queue for a retry;
+        # the second trips the breaker
+        with pytest.raises(llm_service.RETRYABLE_ERRORS):
+            await llm_service.process_deal_extraction("deal-0")
+        assert (await database.get_deal_by_id("deal-0")).status == DealStatus.PENDING
+        with pytest.raises(CircuitOpenError):
+            await llm_service.process_deal_extraction("deal-1")
+
+        start = time.monotonic()
+        for deal_id in ("deal-2", "deal-3"):
+            with pytest.raises(CircuitOpenError):
+                await llm_service.process_deal_extraction(deal_id)
+        assert time.monotonic() - start < 1
+
+        assert len(openai_down) == 2
+        for deal_id in ("deal-1", "deal-2", "deal-3"):
+            deal = await database.get_deal_by_id(deal_id)
+            assert deal.status == DealStatus.PENDING
+            assert deal.last_error is None
+
+    @pytest.mark.asyncio
+    async def test_worker_releases_parked_job_without_using_an_attempt(self, db):
+        calls = []
+
+        async def handler(deal_id):
+            calls.append(deal_id)
+            raise CircuitOpenError("openai", retry_after=60)
+
+        pool = WorkerPool(handler, workers=1, poll_interval=0.01)
+        await enqueue_job("deal-1")
+        await pool.start()
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+        assert calls == ["deal-1"]
+        assert pool.stats()["parked"] == 1
+        assert await queue_depth() == {"queued": 1}
+        # Not available again until the circuit is due to half-open
+        assert await lease_job("other", 60) is None
+        async with database.connection() as conn:
+            cursor = await conn.execute("SELECT attempts FROM jobs WHERE deal_id = 'deal-1'")
+            assert (await cursor.fetchone())[0] == 0
+
+    @pytest.mark.asyncio
+    async def test_health_reports_circuit_state(self, db, openai_down):
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        with pytest.raises(llm_service.RETRYABLE_ERRORS):
+            await llm_service.process_deal_extraction("deal-1")
+        with pytest.raises(CircuitOpenError):
+            await llm_service.process_deal_extraction("deal-1")
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/health")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "healthy"
+        assert body["openai_circuit"]["state"] == OPEN
+        assert body["openai_circuit"]["retry_after_seconds"] > 0
@@ -0,0 +1,170 @@
+import asyncio
+import random
+
+import pytest
+
+from concurrency import AIMDLimiter
+
+
+class Overloaded(Exception):
+    pass
+
+
+class SimulatedBackend:
+    """An LLM stand-in whose latency rises once more than `capacity` calls overlap.
+
+    Beyond `reject_above` concurrent calls it fails with Overloaded (a 429).
+    """
+
+    def __init__(self, capacity: int, reject_above: int, base_latency: float = 0.01,
+                 jitter: float = 0.3):
+        self.capacity = capacity
+        self.reject_above = reject_above
+        self.base_latency = base_latency
+        self.jitter = jitter
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+
+    async def call(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if self.in_flight > self.reject_above:
+                self.rejected += 1
+                raise Overloaded()
+            queueing = max(1.0, self.in_flight / self.capacity) ** 2
+            noise = 1 + random.uniform(-self.jitter, self.jitter)
+            await asyncio.sleep(self.base_latency * queueing * noise)
+        finally:
+            self.in_flight -= 1
+
+
+async def drive(limiter: AIMDLimiter, backend: SimulatedBackend, callers: int, calls: int):
+    async def caller():
+        for _ in range(calls):
+            try:
+                async with limiter.slot():
+                    await backend.call()
+            except Overloaded:
+                pass
+
+    await asyncio.gather(*(caller() for _ in range(callers)))
+
+
+async def test_slot_blocks_at_limit():
+    limiter = AIMDLimiter(initial=2, min_limit=1, max_limit=10)
+    release = asyncio.Event()
+    entered = 0
+
+    async def hold():
+        nonlocal entered
+        async with limiter.slot():
+            entered += 1
+            await release.wait()
+
+    tasks = [asyncio.create_task(hold()) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert entered == 2
+    assert limiter.stats()["in_flight"] == 2
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert entered == 3
+    assert limiter.stats()["in_flight"] == 0
+
+
+async def test_grows_additively_while_healthy():
+    limiter = AIMDLimiter(initial=2, min_limit=1, max_limit=8, latency_target=1.0)
+    backend = SimulatedBackend(capacity=100, reject_above=100, base_latency=0.001)
+
+    await drive(limiter, backend, callers=20, calls=20)
+
+    stats = limiter.stats(recent=None)
+    assert stats["limit"] == 8
+    assert stats["decreases"] == 0
+    steps = [d["to"] - d["from"] for d in stats["recent_decisions"]]
+    assert steps and all(step == 1 for step in steps)
+
+
+async def test_overload_cuts_limit_once_per_episode():
+    limiter = AIMDLimiter(initial=8, min_limit=1, max_limit=16,
+                          overload_errors=(Overloaded,))
+
+    async def failing():
+        async with limiter.slot():
+            await asyncio.sleep(0.01)
+            raise Overloaded()
+
+    # Eight overlapping failures are one congestion event
+    await asyncio.gather(*(failing() for _ in range(8)), return_exceptions=True)
+    stats = limiter.stats()
+    assert stats["limit"] == 4
+    assert stats["decreases"] == 1
+    assert stats["recent_decisions"][-1]["reason"] == "Overloaded"
+
+
+async def test_slow_calls_cut_limit():
+    limiter = AIMDLimiter(initial=6, min_limit=2, max_limit=16, latency_target=0.01)
+
+    async with limiter.slot():
+        await asyncio.sleep(0.02)
+    assert limiter.stats()["limit"] == 3
+    assert limiter.stats()["recent_decisions"][-1]["reason"].startswith("latency")
+
+    for _ in range(3):
+        async with limiter.slot():
+            await asyncio.sleep(0.02)
+    assert limiter.stats()["limit"] == 2  # never below min_limit
+
+
+async def test_other_errors_do_not_change_limit():
+    limiter = AIMDLimiter(initial=4, overload_errors=(Overloaded,))
+    with pytest.raises(ValueError):
+        async with limiter.slot():
+            raise ValueError("bad json")
+    assert limiter.stats()["limit"] == 4
+    assert limiter.stats()["in_flight"] == 0
+
+
+async def test_converges_below_backend_breaking_point():
+    random.seed(7)
+    # Latency crosses the 30 ms target at ~12 concurrent calls; 429s above 16
+    backend = SimulatedBackend(capacity=8, reject_above=16, base_latency=0.01)
+    limiter = AIMDLimiter(initial=2, min_limit=1, max_limit=64, latency_target=0.03,
+                          overload_errors=(Overloaded,))
+
+    await drive(limiter, backend, callers=40, calls=15)
+
+    stats = limiter.stats(recent=None)
+    assert stats["increases"] > 0
+    assert stats["decreases"] > 0
+    assert 2 <= stats["limit"] <= 16
+    assert backend.peak <= 16
+    assert backend.rejected == 0
+
+
+async def test_openai_429_shrinks_llm_concurrency(monkeypatch):
+    import httpx
+    from openai import RateLimitError
+
+    import llm_service
+    from rate_limiter import OpenAIRateLimiter
+    from tests.fake_openai import FakeOpenAI
+
+    app = FakeOpenAI(requests_per_minute=60, tokens_per_minute=60000)
+    app.requests.tokens = 0
+    client = llm_service.create_client(
+        api_key="test",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+    limiter = AIMDLimiter(initial=8, overload_errors=(RateLimitError,))
+    monkeypatch.setattr(llm_service, "get_client", lambda: client)
+    monkeypatch.setattr(llm_service, "rate_limiter", OpenAIRateLimiter(1e9, 1e12))
+    monkeypatch.setattr(llm_service, "concurrency_limiter", limiter)
+
+    with pytest.raises(RateLimitError):
+        await llm_service.extract_deal_data("Acme raises a seed round")
+    assert limiter.stats()["limit"] == 4
+    assert limiter.stats()["recent_decisions"][-1]["reason"] == "RateLimitError"
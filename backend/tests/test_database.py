@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import database
+import main
+from models import DealResponse, DealStatus, DealSummary, ExtractedDeal
+
+
+class TestPragmaProfile:
+    """Tests for the SQLite PRAGMA profile applied to pooled connections."""
+
+    @pytest.mark.asyncio
+    async def test_pooled_connections_use_wal(self, db):
+        async with database.connection() as conn:
+            active = await database.read_pragmas(conn)
+        assert active["journal_mode"].lower() == "wal"
+        assert active["busy_timeout"] == int(database.SQLITE_PRAGMAS["busy_timeout"])
+        assert active["temp_store"] == 2  # MEMORY
+
+    @pytest.mark.asyncio
+    async def test_invalid_pragma_value_rejected(self, db, monkeypatch):
+        monkeypatch.setitem(database.SQLITE_PRAGMAS, "synchronous", "OFF; DROP TABLE deals")
+        async with database.connection() as conn:
+            with pytest.raises(ValueError):
+                await database.apply_pragmas(conn)
+
+    @pytest.mark.asyncio
+    async def test_diagnostics_endpoint_reports_active_settings(self, db):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/diagnostics/db")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["active_pragmas"]["journal_mode"].lower() == "wal"
+        assert body["configured_pragmas"] == database.SQLITE_PRAGMAS
+        assert body["pool"]["size"] == database.DB_POOL_SIZE
+
+
+class TestWriteReturning:
+    """Tests for single round-trip writes."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("returning", [True, False])
+    async def test_writes_return_updated_row(self, db, monkeypatch, returning):
+        monkeypatch.setattr(database, "SQLITE_SUPPORTS_RETURNING", returning)
+        checkouts = db.checkouts
+
+        created = await database.create_deal("deal-1", "hash-1", "Deal text")
+        updated = await database.update_deal_status(
+            "deal-1", DealStatus.FAILED, "boom"
+        )
+        completed = await database.update_deal_extracted(
+            "deal-1",
+            ExtractedDeal(company_name="Acme", investment_brief=["Strong team"]),
+        )
+
+        assert created.status == DealStatus.PENDING
+        assert updated.status == DealStatus.FAILED
+        assert updated.last_error == "boom"
+        assert completed.status == DealStatus.COMPLETED
+        assert completed.company_name == "Acme"
+        assert completed.raw_text == "Deal text"
+        # One pooled checkout per write, no follow-up read
+        assert db.checkouts - checkouts == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("returning", [True, False])
+    async def test_update_missing_deal_returns_none(self, db, monkeypatch, returning):
+        monkeypatch.setattr(database, "SQLITE_SUPPORTS_RETURNING", returning)
+        assert await database.update_deal_status("missing", DealStatus.FAILED) is None
+
+
+async def seed_deals(count: int, status: DealStatus = DealStatus.PENDING) -> list[str]:
+    """Insert deals with distinct, increasing created_at timestamps."""
+    ids = []
+    async with database.connection() as conn:
+        for i in range(count):
+            deal_id = f"deal-{i:04d}"
+            created = (datetime(2024, 1, 1) + timedelta(minutes=i)).isoformat()
+            await conn.execute(
+                """
+                INSERT INTO deals (id, content_hash, raw_text, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (deal_id, f"hash-{i}", "text", status.value, created, created),
+            )
+            ids.append(deal_id)
+        await conn.commit()
+    return ids
+
+
+class TestKeysetPagination:
+    """Tests for cursor-based deal listing and filters."""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_all_deals_newest_first(self, db):
+        ids = await seed_deals(25)
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await database.list_deals(limit=10, cursor=cursor)
+            seen.extend(d.id for d in page)
+            if cursor is None:
+                break
+
+        assert seen == list(reversed(ids))
+
+    @pytest.mark.asyncio
+    async def test_filters(self, db):
+        ids = await seed_deals(6)
+        await database.update_deal_status(ids[1], DealStatus.FAILED, "boom")
+        await database.update_deal_extracted(
+            ids[2],
+            ExtractedDeal(
+                company_name="Acme",
+                sector="Fintech",
+                investment_brief=["Good"],
+                tags=["Fintech", "Seed"],
+            ),
+        )
+
+        failed, _ = await database.list_deals(status=DealStatus.FAILED)
+        assert [d.id for d in failed] == [ids[1]]
+
+        tagged, _ = await database.list_deals(tag="fintech")
+        assert [d.id for d in tagged] == [ids[2]]
+
+        by_sector, _ = await database.list_deals(sector="Fintech", tag="seed")
+        assert [d.id for d in by_sector] == [ids[2]]
+
+        window, _ = await database.list_deals(
+            created_after=datetime(2024, 1, 1, 0, 2),
+            created_before=datetime(2024, 1, 1, 0, 4),
+        )
+        assert [d.id for d in window] == [ids[3], ids[2]]
+
+    @pytest.mark.asyncio
+    async def test_retagging_replaces_tag_rows(self, db):
+        ids = await seed_deals(1)
+        for tags in (["old"], ["new"]):
+            await database.update_deal_extracted(
+                ids[0],
+                ExtractedDeal(company_name="Acme", investment_brief=["Good"], tags=tags),
+            )
+
+        assert (await database.list_deals(tag="old"))[0] == []
+        assert [d.id for d in (await database.list_deals(tag="new"))[0]] == ids
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, db):
+        with pytest.raises(ValueError):
+            await database.list_deals(cursor="not-a-cursor")
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/deals", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_list_endpoint_returns_next_cursor(self, db):
+        await seed_deals(3)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/api/deals", params={"limit": 2})).json()
+            second = (await client.get(
+                "/api/deals", params={"limit": 2, "cursor": first["next_cursor"]}
+            )).json()
+
+        assert len(first["deals"]) == 2
+        assert [d["id"] for d in second["deals"]] == ["deal-0000"]
+        assert second["next_cursor"] is None
+
+
+class TestSummaryProjection:
+    """Tests for the lightweight list projection."""
+
+    @pytest.mark.asyncio
+    async def test_list_returns_summaries_by_default(self, db):
+        await seed_deals(2)
+        deals, _ = await database.list_deals()
+        assert all(isinstance(d, DealSummary) for d in deals)
+
+        full, _ = await database.list_deals(full=True)
+        assert all(isinstance(d, DealResponse) for d in full)
+
+    @pytest.mark.asyncio
+    async def test_list_endpoint_full_flag(self, db):
+        await seed_deals(1)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            summary = (await client.get("/api/deals")).json()["deals"][0]
+            full = (await client.get("/api/deals", params={"full": "true"})).json()["deals"][0]
+
+        assert set(summary) == {"id", "status", "company_name", "sector", "stage", "created_at"}
+        assert full["raw_text"] == "text"
+        assert full["content_hash"] == "hash-0"
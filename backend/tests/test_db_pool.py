@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+import database
+from db_pool import ConnectionPool, PoolTimeoutError
+from models import DealStatus
+
+
+class TestConnectionPool:
+    """Tests for the pooled aiosqlite connections."""
+
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+        await pool.open()
+        try:
+            async with pool.acquire() as first:
+                pass
+            async with pool.acquire() as second:
+                pass
+            assert first is second
+            assert pool.stats()["opened"] == 1
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_checkout_times_out_when_exhausted(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.05)
+        await pool.open()
+        try:
+            async with pool.acquire():
+                with pytest.raises(PoolTimeoutError):
+                    async with pool.acquire():
+                        pass
+            assert pool.stats()["timeouts"] == 1
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_waiter_gets_released_connection(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=1)
+        await pool.open()
+
+        async def hold():
+            async with pool.acquire():
+                await asyncio.sleep(0.05)
+
+        async def wait():
+            async with pool.acquire() as conn:
+                cursor = await conn.execute("SELECT 1")
+                return (await cursor.fetchone())[0]
+
+        try:
+            _, result = await asyncio.gather(hold(), wait())
+            assert result == 1
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_waiter_opens_replacement_for_discarded_connection(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.5)
+        await pool.open()
+
+        async def hold_and_break():
+            async with pool.acquire() as conn:
+                await asyncio.sleep(0.05)
+                # Released broken, so the pool discards it
+                await conn.close()
+
+        async def wait():
+            async with pool.acquire() as conn:
+                cursor = await conn.execute("SELECT 1")
+                return (await cursor.fetchone())[0]
+
+        try:
+            _, result = await asyncio.gather(hold_and_break(), wait())
+            assert result == 1
+            assert pool.stats()["opened"] == 1
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_connection_is_replaced(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, health_check_interval=0)
+        await pool.open()
+        try:
+            async with pool.acquire() as conn:
+                broken = conn
+            await broken.close()
+
+            async with pool.acquire() as conn:
+                assert conn is not broken
+                cursor = await conn.execute("SELECT 1")
+                assert (await cursor.fetchone())[0] == 1
+            assert pool.stats()["replaced"] == 1
+        finally:
+            await pool.close()
+
+
+class TestDatabaseWithPool:
+    """Tests for database functions sharing the pool."""
+
+    @pytest.mark.asyncio
+    async def test_create_and_update_with_single_connection(self, db, monkeypatch):
+        await database.close_pool()
+        monkeypatch.setattr(database, "DB_POOL_SIZE", 1)
+        await database.init_pool()
+
+        deal = await database.create_deal("deal-1", "hash-1", "Some deal text")
+        assert deal.status == DealStatus.PENDING
+
+        updated = await database.update_deal_status("deal-1", DealStatus.EXTRACTING)
+        assert updated.status == DealStatus.EXTRACTING
+        assert database.get_pool().stats()["opened"] == 1
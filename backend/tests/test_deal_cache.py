@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+import database
+from deal_cache import DealCache
+from models import DealResponse, DealStatus
+
+
+def make_deal(deal_id: str, status: DealStatus = DealStatus.PENDING) -> DealResponse:
+    now = datetime(2024, 1, 1)
+    return DealResponse(
+        id=deal_id, content_hash=f"hash-{deal_id}", raw_text="text",
+        status=status, created_at=now, updated_at=now,
+    )
+
+
+class TestDealCache:
+    """Tests for the bounded LRU/TTL deal cache."""
+
+    def test_lru_eviction_and_counters(self):
+        cache = DealCache(max_size=2, ttl=60)
+        cache.put(make_deal("a"))
+        cache.put(make_deal("b"))
+        assert cache.get("a") is not None  # a is now most recent
+        cache.put(make_deal("c"))  # evicts b
+
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = DealCache(max_size=10, ttl=10)
+        with patch("deal_cache.time.monotonic", return_value=100.0):
+            cache.put(make_deal("a"))
+        with patch("deal_cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_load_racing_a_write_is_discarded(self):
+        cache = DealCache()
+        token = cache.begin_load()
+        cache.put(make_deal("a", DealStatus.EXTRACTING))
+        cache.finish_load(token, make_deal("a", DealStatus.PENDING))
+
+        assert cache.get("a").status == DealStatus.EXTRACTING
+        assert cache.stats()["stale_loads"] == 1
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = DealCache(max_size=0)
+        cache.put(make_deal("a"))
+        assert cache.get("a") is None
+
+
+class TestReadThrough:
+    """Tests for get_deal_by_id with the cache in front of the database."""
+
+    @pytest.mark.asyncio
+    async def test_reads_are_cached_and_writes_refresh(self, db):
+        await database.create_deal("deal-1", "hash-1", "text")
+        database.deal_cache.clear()
+
+        checkouts = db.checkouts
+        first = await database.get_deal_by_id("deal-1")
+        second = await database.get_deal_by_id("deal-1")
+        assert first is second
+        assert db.checkouts - checkouts == 1
+
+        await database.update_deal_status("deal-1", DealStatus.EXTRACTING)
+        assert (await database.get_deal_by_id("deal-1")).status == DealStatus.EXTRACTING
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_never_serve_stale_status(self, db):
+        await database.create_deal("deal-1", "hash-1", "text")
+        statuses = [DealStatus.EXTRACTING, DealStatus.VALIDATING, DealStatus.FAILED]
+
+        async def writer():
+            for status in statuses:
+                database.deal_cache.clear()
+                await database.update_deal_status("deal-1", status)
+                await asyncio.sleep(0)
+
+        async def reader():
+            for _ in range(20):
+                await database.get_deal_by_id("deal-1")
+                await asyncio.sleep(0)
+
+        await asyncio.gather(writer(), *(reader() for _ in range(5)))
+        assert (await database.get_deal_by_id("deal-1")).status == DealStatus.FAILED
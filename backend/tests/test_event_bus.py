@@ -0,0 +1,122 @@
+import pytest
+
+import database
+from event_bus import DealEvent, LocalEventBus, SQLiteEventBus, create_event_bus
+from event_log import DealEventLog
+from models import DealStatus, ExtractedDeal
+from tests.test_websocket import FakeWebSocket, subscribe
+from websocket import WebSocketManager
+
+EXTRACTED = ExtractedDeal(company_name="Acme", sector="Fintech", investment_brief=["Strong team"])
+
+
+def sqlite_manager() -> WebSocketManager:
+    log = DealEventLog()
+    return WebSocketManager(event_log=log, bus=SQLiteEventBus(log))
+
+
+@pytest.fixture
+async def processes(db):
+    """Two managers sharing one database, as two server processes would."""
+    await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+    managers = sqlite_manager(), sqlite_manager()
+    for manager in managers:
+        await manager.bus.poll()
+    return managers
+
+
+class TestEventBus:
+    def test_create_event_bus(self, monkeypatch):
+        monkeypatch.setattr(database.deal_cache, "max_size", database.deal_cache.max_size)
+        log = DealEventLog()
+        assert isinstance(create_event_bus(log, "local"), LocalEventBus)
+        assert database.deal_cache.enabled
+        assert isinstance(create_event_bus(log, "sqlite"), SQLiteEventBus)
+        assert not database.deal_cache.enabled
+        with pytest.raises(ValueError):
+            create_event_bus(log, "redis")
+
+    @pytest.mark.asyncio
+    async def test_events_reach_subscribers_in_other_process(self, processes):
+        a, b = processes
+        here = await subscribe(a, "deal-1")
+        there = await subscribe(b, "deal-1")
+
+        await database.update_deal_status("deal-1", DealStatus.EXTRACTING)
+        await a.broadcast_status("deal-1", DealStatus.EXTRACTING)
+        await database.update_deal_extracted("deal-1", EXTRACTED)
+        await a.broadcast_status("deal-1", DealStatus.COMPLETED, extracted=EXTRACTED)
+        await b.flush()
+        assert [m["type"] for m in there.sent] == ["snapshot"]
+
+        for manager in processes:
+            assert await manager.bus.poll() == 2
+            await manager.flush()
+        for socket in (here, there):
+            assert [m["status"] for m in socket.sent] == ["pending", "extracting", "completed"]
+            assert socket.sent[-1]["data"]["investment_brief"] == ["Strong team"]
+        assert a.bus.stats()["remote"] == 0
+        assert b.bus.stats()["remote"] == 2
+
+    @pytest.mark.asyncio
+    async def test_deal_written_by_other_process_is_not_served_stale(self, db, monkeypatch):
+        monkeypatch.setattr(database.deal_cache, "max_size", database.deal_cache.max_size)
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        create_event_bus(DealEventLog(), "sqlite")
+        await database.get_deal_by_id("deal-1")
+
+        # Another process fails the deal without publishing an event
+        async with database.connection() as conn:
+            await conn.execute("UPDATE deals SET status = 'failed' WHERE id = 'deal-1'")
+            await conn.commit()
+        assert (await database.get_deal_by_id("deal-1")).status == DealStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_interleaved_publishers_delivered_in_seq_order(self, processes):
+        a, b = processes
+        socket = FakeWebSocket()
+        await b.connect_firehose(socket)
+        for manager, status in zip(
+            (a, b, a, b), (DealStatus.EXTRACTING, DealStatus.VALIDATING,
+                           DealStatus.EXTRACTING, DealStatus.COMPLETED)
+        ):
+            await manager.broadcast_status("deal-1", status)
+
+        await b.bus.poll()
+        await b.flush()
+        seqs = [m["seq"] for m in socket.sent]
+        assert len(seqs) == 4
+        assert seqs == sorted(seqs)
+
+    @pytest.mark.asyncio
+    async def test_catch_up_and_poll_do_not_duplicate(self, processes):
+        a, _ = processes
+        await a.broadcast_status("deal-1", DealStatus.EXTRACTING)
+        socket = await subscribe(a, "deal-1", last_seq=0)
+        await a.bus.poll()
+        await a.flush()
+        assert [m["status"] for m in socket.sent] == ["extracting"]
+
+    @pytest.mark.asyncio
+    async def test_unlogged_event_delivered_locally(self):
+        bus = SQLiteEventBus(DealEventLog())
+        received = []
+
+        async def handler(event):
+            received.append(event)
+
+        bus.subscribe(handler)
+        event = DealEvent(deal_id="deal-1", type="status_update", status=DealStatus.FAILED)
+        await bus.publish(event)
+        assert received == [event]
+
+    @pytest.mark.asyncio
+    async def test_event_polled_before_publish_is_not_kept(self, processes):
+        a, _ = processes
+        seq = await a.event_log.append("deal-1", "status_update", DealStatus.EXTRACTING.value)
+        assert await a.bus.poll() == 1
+
+        await a.bus.publish(
+            DealEvent(deal_id="deal-1", type="status_update", status=DealStatus.EXTRACTING, seq=seq)
+        )
+        assert a.bus.stats()["pending"] == 0
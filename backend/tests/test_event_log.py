@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from event_log import DealEventLog
+
+
+class TestDealEventLog:
+    @pytest.mark.asyncio
+    async def test_seq_orders_events_across_deals(self, db):
+        log = DealEventLog()
+        for deal_id in ("deal-1", "deal-2"):
+            await database.create_deal(deal_id, f"hash-{deal_id}", "text")
+        seqs = [
+            await log.append("deal-1", "deal_created", "pending"),
+            await log.append("deal-2", "deal_created", "pending"),
+            await log.append("deal-1", "status_update", "failed", "boom"),
+        ]
+        assert seqs == sorted(seqs)
+
+        assert [r["seq"] for r in await log.since(0, "deal-1")] == [seqs[0], seqs[2]]
+        everything = await log.since(seqs[0])
+        assert [r["deal_id"] for r in everything] == ["deal-2", "deal-1"]
+        assert everything[1]["error"] == "boom"
+        assert await log.latest_seq("deal-2") == seqs[1]
+        assert await log.latest_seq() == seqs[2]
+
+    @pytest.mark.asyncio
+    async def test_prune_and_covers(self, db):
+        log = DealEventLog(retention=60)
+        first = await log.append("deal-1", "deal_created", "pending")
+        await log.append("deal-1", "status_update", "extracting")
+        old = (datetime.utcnow() - timedelta(seconds=120)).isoformat()
+        async with database.connection() as conn:
+            await conn.execute("UPDATE deal_events SET created_at = ? WHERE seq = ?", (old, first))
+            await conn.commit()
+
+        assert await log.covers(0)
+        assert await log.prune() == 1
+        assert not await log.covers(0)
+        assert await log.covers(first)
+
+    @pytest.mark.asyncio
+    async def test_append_failure_is_not_fatal(self):
+        log = DealEventLog()
+        # No connection pool is open
+        assert await log.append("deal-1", "deal_created", "pending") is None
+        assert log.stats()["errors"] == 1
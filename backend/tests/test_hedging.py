@@ -0,0 +1,223 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import llm_service
+from concurrency import AIMDLimiter
+from hedging import Hedger
+from rate_limiter import OpenAIRateLimiter
+from scheduler import percentile
+
+
+class TailBackend:
+    """A call that is usually fast but occasionally stalls."""
+
+    def __init__(self, fast: float = 0.005, slow: float = 0.2, slow_rate: float = 0.03):
+        self.fast = fast
+        self.slow = slow
+        self.slow_rate = slow_rate
+        self.started = 0
+        self.cancelled = 0
+
+    async def call(self, on_sent):
+        self.started += 1
+        on_sent()
+        latency = self.slow if random.random() < self.slow_rate else self.fast
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return latency
+
+
+async def timed(hedger: Hedger, backend: TailBackend, n: int) -> list[float]:
+    latencies = []
+    for _ in range(n):
+        start = time.monotonic()
+        await hedger.run("model", backend.call)
+        latencies.append(time.monotonic() - start)
+    return latencies
+
+
+async def test_hedging_cuts_tail_latency_within_budget():
+    random.seed(7)
+    baseline = await timed(Hedger(budget=0), TailBackend(), 300)
+
+    random.seed(7)
+    hedger = Hedger(percentile=90, budget=0.05, min_samples=20)
+    backend = TailBackend()
+    hedged = await timed(hedger, backend, 300)
+
+    stats = hedger.stats()
+    assert 0 < stats["hedges_fired"] <= 0.05 * stats["requests"]
+    assert stats["hedges_won"] > 0
+    # Each hedged request leaves one loser, which is cancelled
+    await asyncio.sleep(0)
+    assert backend.cancelled == stats["hedges_fired"]
+    assert percentile(sorted(hedged), 99) < percentile(sorted(baseline), 99)
+
+
+async def test_no_hedging_before_min_samples():
+    hedger = Hedger(percentile=50, budget=1.0, min_samples=5)
+    backend = TailBackend(slow_rate=0)
+    await timed(hedger, backend, 4)
+    assert hedger.threshold("model") is None
+    assert backend.started == 4
+    assert hedger.stats()["hedges_fired"] == 0
+
+
+async def test_losing_request_is_cancelled():
+    hedger = Hedger(percentile=50, budget=1.0, min_samples=1)
+    hedger._record("model", 0.01)
+    calls = []
+
+    async def call(on_sent):
+        on_sent()
+        index = len(calls)
+        calls.append(asyncio.current_task())
+        await asyncio.sleep(1.0 if index == 0 else 0.01)
+        return index
+
+    assert await hedger.run("model", call) == 1
+    await asyncio.sleep(0)
+    assert calls[0].cancelled()
+    assert hedger.stats()["hedges_won"] == 1
+
+
+async def test_failed_primary_falls_back_to_hedge():
+    hedger = Hedger(percentile=50, budget=1.0, min_samples=1)
+    hedger._record("model", 0.01)
+    calls = 0
+
+    async def call(on_sent):
+        nonlocal calls
+        on_sent()
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("primary failed")
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    assert await hedger.run("model", call) == "hedge"
+
+
+async def test_error_raised_when_all_calls_fail():
+    hedger = Hedger(percentile=50, budget=1.0, min_samples=1)
+    hedger._record("model", 0.01)
+
+    async def call(on_sent):
+        on_sent()
+        await asyncio.sleep(0.02)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError, match="down"):
+        await hedger.run("model", call)
+
+
+async def test_over_budget_requests_are_not_hedged():
+    hedger = Hedger(percentile=50, budget=0.0, min_samples=1)
+    hedger._record("model", 0.001)
+    backend = TailBackend(fast=0.02, slow_rate=0)
+    await hedger.run("model", backend.call)
+    assert backend.started == 1
+    assert hedger.stats()["over_budget"] == 1
+
+
+async def test_extraction_uses_hedger_when_enabled(monkeypatch):
+    hedger = Hedger(percentile=50, budget=1.0, min_samples=1)
+    hedger._record("test-model", 0.01)
+    monkeypatch.setattr(llm_service, "hedger", hedger)
+    monkeypatch.setattr(llm_service, "EXTRACTION_HEDGING", True)
+    calls = 0
+
+    async def create(messages, on_sent=None, **kwargs):
+        nonlocal calls
+        on_sent()
+        calls += 1
+        await asyncio.sleep(1.0 if calls == 1 else 0.01)
+        content = '{"company_name": "Hedged"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(llm_service, "create_chat_completion", create)
+    result = await llm_service.extract_deal_data("text", model="test-model")
+    assert "Hedged" in result
+    assert calls == 2
+    assert hedger.stats()["hedges_won"] == 1
+
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "test-model",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": '{"company_name": "Acme"}'},
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+}
+
+
+@pytest.fixture
+def limited_openai(monkeypatch):
+    """OpenAI answering in 10ms behind a single concurrency slot, with hedging on."""
+    sent = []
+
+    async def handler(request):
+        sent.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=COMPLETION)
+
+    client = llm_service.create_client(
+        api_key="test",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    hedger = Hedger(percentile=50, budget=1.0, min_samples=1)
+    hedger._record("test-model", 0.05)
+    monkeypatch.setattr(llm_service, "get_client", lambda: client)
+    monkeypatch.setattr(llm_service, "hedger", hedger)
+    monkeypatch.setattr(llm_service, "EXTRACTION_HEDGING", True)
+    monkeypatch.setattr(llm_service, "rate_limiter", OpenAIRateLimiter(6000, 10**6))
+    monkeypatch.setattr(llm_service, "concurrency_limiter", AIMDLimiter(initial=1, max_limit=1))
+    return sent, hedger
+
+
+async def test_requests_queued_behind_limiters_are_not_hedged(limited_openai):
+    sent, hedger = limited_openai
+
+    # Ten calls through one slot: the last waits ~90ms locally, well past the
+    # 50ms threshold, but each is only 10ms in flight
+    await asyncio.gather(*(
+        llm_service.extract_deal_data("Acme raises a seed round", model="test-model")
+        for _ in range(10)
+    ))
+
+    assert len(sent) == 10
+    assert hedger.stats()["hedges_fired"] == 0
+    assert hedger.threshold("test-model") < 0.05
+
+
+async def test_cancelled_call_returns_its_reservation(limited_openai):
+    limiter = llm_service.rate_limiter
+    available = limiter.tokens.tokens
+    messages = [{"role": "user", "content": "Acme raises a seed round"}]
+
+    async with llm_service.concurrency_limiter.slot():
+        queued = asyncio.ensure_future(
+            llm_service.create_chat_completion(messages, model="test-model")
+        )
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    assert limiter.tokens.tokens == pytest.approx(available, abs=1)
+    assert limiter.requests.tokens == pytest.approx(limiter.requests.capacity, abs=0.1)
@@ -0,0 +1,189 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import database
+import job_queue
+import llm_service
+from models import DealStatus
+from job_queue import (
+    WorkerPool,
+    complete_job,
+    enqueue_job,
+    fail_job,
+    lease_job,
+    queue_depth,
+    reclaim_expired_leases,
+)
+
+
+class TestJobQueue:
+    """Tests for leasing jobs from the SQLite-backed queue."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("returning", [True, False])
+    async def test_lease_and_complete(self, db, monkeypatch, returning):
+        monkeypatch.setattr(database, "SQLITE_SUPPORTS_RETURNING", returning)
+        assert await enqueue_job("deal-1")
+        assert not await enqueue_job("deal-1")  # already active
+
+        job = await lease_job("worker-a", visibility_timeout=60)
+        assert job.deal_id == "deal-1"
+        assert job.attempts == 1
+        assert await lease_job("worker-b", visibility_timeout=60) is None
+
+        await complete_job(job)
+        assert await queue_depth() == {"done": 1}
+        assert await enqueue_job("deal-1")  # can be queued again once done
+
+    @pytest.mark.asyncio
+    async def test_concurrent_leases_never_share_a_job(self, db):
+        for i in range(20):
+            await enqueue_job(f"deal-{i}")
+
+        jobs = await asyncio.gather(*(lease_job(f"w{i}", 60) for i in range(30)))
+        leased = [j.deal_id for j in jobs if j]
+        assert len(leased) == 20
+        assert len(set(leased)) == 20
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed(self, db):
+        await database.create_deal("deal-1", "hash-1", "text")
+        await enqueue_job("deal-1", max_attempts=2)
+        await lease_job("crashed-worker", visibility_timeout=-1)
+
+        assert await reclaim_expired_leases() == 1
+        job = await lease_job("worker-b", visibility_timeout=-1)
+        assert job.attempts == 2
+
+        # Out of attempts: the next expiry marks the job and its deal failed
+        reported = []
+
+        async def on_failed(deal_ids, error):
+            # Committed by now, so a read sees (and caches) the new row
+            for deal_id in deal_ids:
+                reported.append(await database.get_deal_by_id(deal_id))
+
+        assert await reclaim_expired_leases(on_failed) == 0
+        assert await queue_depth() == {"failed": 1}
+        assert [d.status for d in reported] == [DealStatus.FAILED]
+        deal = await database.get_deal_by_id("deal-1")
+        assert deal.status == DealStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_failed_job_retries_with_backoff(self, db):
+        await database.create_deal("deal-1", "hash-1", "text")
+        await enqueue_job("deal-1", max_attempts=2)
+        reported = []
+
+        async def on_failed(deal_ids, error):
+            reported.append((deal_ids, error))
+
+        job = await lease_job("w", 60)
+        await fail_job(job, "boom", backoff=0, on_failed=on_failed)
+        assert reported == []
+        job = await lease_job("w", 60)
+        assert job.attempts == 2
+        await fail_job(job, "boom", backoff=0, on_failed=on_failed)
+        assert await queue_depth() == {"failed": 1}
+        assert reported == [(["deal-1"], "boom")]
+        assert (await database.get_deal_by_id("deal-1")).last_error == "boom"
+
+
+class TestWorkerPool:
+    """Tests for the async worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_workers_process_queue_with_bounded_concurrency(self, db):
+        running = 0
+        peak = 0
+        processed = []
+
+        async def handler(deal_id):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            processed.append(deal_id)
+            running -= 1
+
+        pool = WorkerPool(handler, workers=3, poll_interval=0.01)
+        for i in range(12):
+            await enqueue_job(f"deal-{i}")
+        await pool.start()
+        pool.notify()
+        for _ in range(200):
+            if len(processed) == 12:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+        assert sorted(processed) == sorted(f"deal-{i}" for i in range(12))
+        assert peak <= 3
+        assert await queue_depth() == {"done": 12}
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_running_job(self, db):
+        started = asyncio.Event()
+
+        async def handler(deal_id):
+            started.set()
+            await asyncio.sleep(60)
+
+        pool = WorkerPool(handler, workers=1, poll_interval=0.01)
+        await enqueue_job("deal-1")
+        await pool.start()
+        await asyncio.wait_for(started.wait(), 1)
+        await pool.stop(timeout=0.05)
+
+        job = await lease_job("next-process", 60)
+        assert job.deal_id == "deal-1"
+        assert job.attempts == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_error_requeues_job(self, db):
+        calls = []
+
+        async def handler(deal_id):
+            calls.append(deal_id)
+            if len(calls) == 1:
+                raise RuntimeError("crash")
+
+        with patch.object(job_queue, "JOB_RETRY_BACKOFF", 0):
+            pool = WorkerPool(handler, workers=1, poll_interval=0.01)
+            await enqueue_job("deal-1")
+            await pool.start()
+            for _ in range(200):
+                if len(calls) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await pool.stop()
+
+        assert calls == ["deal-1", "deal-1"]
+        assert await queue_depth() == {"done": 1}
+
+    @pytest.mark.asyncio
+    async def test_transient_extraction_error_retried_until_out_of_attempts(self, db):
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        extract = AsyncMock(side_effect=asyncio.TimeoutError())
+        reported = []
+
+        async def on_deals_failed(deal_ids, error):
+            reported.append(deal_ids)
+
+        with patch.object(job_queue, "JOB_RETRY_BACKOFF", 0), \
+             patch("llm_service.extract_deal_data", extract):
+            pool = WorkerPool(llm_service.process_deal_extraction, workers=1,
+                              poll_interval=0.01, on_deals_failed=on_deals_failed)
+            await enqueue_job("deal-1", max_attempts=2)
+            await pool.start()
+            for _ in range(200):
+                if reported:
+                    break
+                await asyncio.sleep(0.01)
+            await pool.stop()
+
+        assert extract.await_count == 2
+        assert reported == [["deal-1"]]
+        assert (await database.get_deal_by_id("deal-1")).status == DealStatus.FAILED
@@ -0,0 +1,130 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import llm_service
+from json_repair import RepairStats, repair_locally
+from models import DealStatus
+
+VALID = {"company_name": "Acme", "investment_brief": ["Strong team", "Large TAM"]}
+
+
+class TestRepairLocally:
+    """Tests for deterministic, in-process JSON repair."""
+
+    def test_trailing_commas(self):
+        text = '{"company_name": "Acme", "investment_brief": ["One", "Two",], "tags": [],}'
+        deal, fixes = repair_locally(text)
+        assert deal.investment_brief == ["One", "Two"]
+        assert fixes == ["trailing_commas"]
+
+    def test_commas_inside_strings_are_kept(self):
+        text = '{"company_name": "Acme, Inc.,]", "investment_brief": ["One",]}'
+        deal, _ = repair_locally(text)
+        assert deal.company_name == "Acme, Inc.,]"
+
+    @pytest.mark.parametrize("cut", [
+        '{"company_name": "Acme", "investment_brief": ["One", "Tw',
+        '{"company_name": "Acme", "investment_brief": ["One", "Two"], "tags": ["fin',
+        '{"company_name": "Acme", "investment_brief": ["One", "Two"], "stage": ',
+        '{"company_name": "Acme", "investment_brief": ["One", "Two"],',
+        '{"company_name": "Acme", "investment_brief": ["One", "Two"], "metrics": {"ARR": "$1M"',
+    ])
+    def test_truncated_completion_is_closed(self, cut):
+        deal, fixes = repair_locally(cut)
+        assert deal is not None
+        assert deal.company_name == "Acme"
+        assert deal.investment_brief[0] == "One"
+        assert "truncated" in fixes
+
+    def test_metric_values_are_coerced_to_strings(self):
+        text = json.dumps({**VALID, "metrics": {"ARR": 2000000, "growth": 1.5,
+                                                "profitable": False, "churn": None}})
+        deal, fixes = repair_locally(text)
+        assert deal.metrics == {"ARR": "2000000", "growth": "1.5", "profitable": "false"}
+        assert fixes == ["metrics_types"]
+
+    def test_long_brief_is_truncated(self):
+        text = json.dumps({**VALID, "investment_brief": [f"Point {i}" for i in range(20)]})
+        deal, fixes = repair_locally(text)
+        assert len(deal.investment_brief) == 15
+        assert deal.investment_brief[-1] == "Point 14"
+        assert fixes == ["brief_too_long"]
+
+    def test_null_and_scalar_optional_fields(self):
+        text = json.dumps({**VALID, "sector": None, "founders": "Jane Doe", "round_size": 5})
+        deal, fixes = repair_locally(text)
+        assert deal.sector == ""
+        assert deal.founders == ["Jane Doe"]
+        assert deal.round_size == "5"
+        assert fixes == ["null_optional_field", "scalar_list", "string_types"]
+
+    def test_surrounding_text_is_dropped(self):
+        deal, fixes = repair_locally(f"```json\n{json.dumps(VALID)}\n```")
+        assert deal.company_name == "Acme"
+        assert fixes == ["surrounding_text"]
+
+    @pytest.mark.parametrize("text", [
+        "{ always invalid }",
+        "no json at all",
+        json.dumps({"investment_brief": ["One"]}),      # missing company_name
+        json.dumps({"company_name": "Acme", "investment_brief": []}),
+    ])
+    def test_unfixable_responses(self, text):
+        deal, _ = repair_locally(text)
+        assert deal is None
+
+
+class TestPipelineRepair:
+    """process_deal_extraction only falls back to the LLM for unfixable errors."""
+
+    async def run(self, extract_response, repair_response=None):
+        mock_deal = MagicMock()
+        mock_deal.raw_text = "Test deal text"
+        mock_repair = AsyncMock(return_value=repair_response)
+        with patch("llm_service.get_deal_by_id", AsyncMock(return_value=mock_deal)), \
+             patch("llm_service.update_deal_status", AsyncMock()) as mock_status, \
+             patch("llm_service.update_deal_extracted", AsyncMock()) as mock_update, \
+             patch("llm_service.extract_deal_data", AsyncMock(return_value=extract_response)), \
+             patch("llm_service.repair_json", mock_repair):
+            await llm_service.process_deal_extraction("test-id")
+        return mock_repair, mock_status, mock_update
+
+    @pytest.mark.asyncio
+    async def test_local_fix_skips_llm_repair(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "repair_stats", RepairStats())
+        mock_repair, _, mock_update = await self.run(
+            '{"company_name": "Acme", "investment_brief": ["One",], "metrics": {"ARR": 5}}'
+        )
+
+        mock_repair.assert_not_called()
+        extracted = mock_update.call_args[0][1]
+        assert extracted.metrics == {"ARR": "5"}
+        stats = llm_service.repair_stats.stats()
+        assert stats["repaired_locally"] == 1
+        assert stats["local_share"] == 1.0
+        assert stats["fixes"] == {"trailing_commas": 1, "metrics_types": 1}
+
+    @pytest.mark.asyncio
+    async def test_unfixable_error_goes_to_llm(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "repair_stats", RepairStats())
+        mock_repair, _, mock_update = await self.run(
+            json.dumps({"investment_brief": ["One"]}), json.dumps(VALID)
+        )
+
+        mock_repair.assert_called_once()
+        mock_update.assert_called_once()
+        stats = llm_service.repair_stats.stats()
+        assert stats["llm_repair_requests"] == 1
+        assert stats["repaired_by_llm"] == 1
+        assert stats["local_share"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_still_fails_when_nothing_works(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "repair_stats", RepairStats())
+        _, mock_status, mock_update = await self.run("{ always invalid }", "{ always invalid }")
+
+        mock_update.assert_not_called()
+        assert mock_status.call_args_list[-1][0][1] == DealStatus.FAILED
+        assert llm_service.repair_stats.stats()["unrepaired"] == 1
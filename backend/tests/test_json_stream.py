@@ -0,0 +1,156 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+import llm_service
+from concurrency import AIMDLimiter
+from json_stream import IncrementalJSONParser
+from models import DealStatus
+from rate_limiter import OpenAIRateLimiter
+from tests.fake_openai import FakeOpenAI
+from websocket import WebSocketManager
+
+DEAL = {
+    "company_name": 'Acme "Rockets", Inc.',
+    "founders": ["Jane Doe", "John Smith, PhD"],
+    "sector": "Space",
+    "metrics": {"ARR": "$2M", "ratios": [1, {"x": "]"}]},
+    "investment_brief": ["Strong team", "Large TAM [est.]", "Escaped \"quotes\" and \\\\ slashes"],
+    "tags": [],
+    "round_size": None,
+}
+
+
+def feed_all(text: str, chunk_size: int) -> list[dict]:
+    parser = IncrementalJSONParser()
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[i:i + chunk_size]))
+    return events
+
+
+class TestIncrementalJSONParser:
+    """Tests for field-by-field parsing of streamed JSON."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5, 64, 10_000])
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_fields_match_full_parse(self, chunk_size, indent):
+        events = feed_all(json.dumps(DEAL, indent=indent), chunk_size)
+
+        fields = [(e["field"], e["value"]) for e in events if "index" not in e]
+        assert fields == list(DEAL.items())
+
+    def test_array_items_are_reported_before_the_array(self):
+        events = feed_all(json.dumps(DEAL), 3)
+
+        brief = [e for e in events if e["field"] == "investment_brief"]
+        assert [e.get("index") for e in brief] == [0, 1, 2, None]
+        assert [e["value"] for e in brief[:3]] == DEAL["investment_brief"]
+        founders = [e["value"] for e in events if e["field"] == "founders" and "index" in e]
+        assert founders == DEAL["founders"]
+
+    def test_field_is_reported_as_soon_as_it_closes(self):
+        parser = IncrementalJSONParser()
+        assert parser.feed('{"company_name": "Ac') == []
+        assert parser.feed('me", "investment_brief": ["One"') == [
+            {"field": "company_name", "value": "Acme"},
+            {"field": "investment_brief", "index": 0, "value": "One"},
+        ]
+        assert parser.feed(', "Tw') == []
+        assert parser.feed('o"]}') == [
+            {"field": "investment_brief", "index": 1, "value": "Two"},
+            {"field": "investment_brief", "value": ["One", "Two"]},
+        ]
+
+    def test_primitives_and_leading_noise(self):
+        events = feed_all('```json\n{"a": 1.5, "b": true, "c": null}', 1)
+        assert events == [
+            {"field": "a", "value": 1.5},
+            {"field": "b", "value": True},
+            {"field": "c", "value": None},
+        ]
+
+    def test_invalid_json_emits_nothing_for_bad_values(self):
+        events = feed_all('{"a": nope, "b": "ok"}', 4)
+        assert events == [{"field": "b", "value": "ok"}]
+
+
+class TestStreamingExtraction:
+    """Streaming extraction against the fake OpenAI server."""
+
+    @pytest.fixture
+    def fake_openai(self, monkeypatch):
+        completion = {
+            "company_name": "Acme",
+            "sector": "Fintech",
+            "investment_brief": ["Point 1", "Point 2"],
+        }
+        app = FakeOpenAI(requests_per_minute=6000, tokens_per_minute=10**6,
+                         completion=completion, chunk_size=5)
+        client = llm_service.create_client(
+            api_key="test",
+            base_url="http://fake/v1",
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+        )
+        limiter = OpenAIRateLimiter(6000, 10**6)
+        monkeypatch.setattr(llm_service, "get_client", lambda: client)
+        monkeypatch.setattr(llm_service, "rate_limiter", limiter)
+        monkeypatch.setattr(llm_service, "concurrency_limiter", AIMDLimiter(initial=8))
+        return completion, limiter
+
+    @pytest.mark.asyncio
+    async def test_streamed_fields_arrive_before_completion(self, fake_openai):
+        completion, limiter = fake_openai
+        events = []
+
+        result = await llm_service.extract_deal_data("deal text", on_field=AsyncMock(
+            side_effect=events.append
+        ))
+
+        assert json.loads(result) == completion
+        assert events[0] == {"field": "company_name", "value": "Acme"}
+        assert {"field": "investment_brief", "index": 1, "value": "Point 2"} in events
+        # Usage from the final stream chunk reconciles the reservation
+        assert limiter.stats()["acquired"] == 1
+        assert limiter.tokens.tokens > limiter.tokens.capacity - 1000
+
+    @pytest.mark.asyncio
+    async def test_pipeline_broadcasts_partial_fields(self, fake_openai, monkeypatch):
+        monkeypatch.setattr(llm_service, "EXTRACTION_STREAMING", True)
+        mock_deal = MagicMock()
+        mock_deal.raw_text = "deal text"
+        ws = MagicMock()
+        ws.broadcast_status = AsyncMock()
+        ws.broadcast_partial = AsyncMock()
+
+        with patch("llm_service.get_deal_by_id", AsyncMock(return_value=mock_deal)), \
+             patch("llm_service.update_deal_status", AsyncMock()), \
+             patch("llm_service.update_deal_extracted", AsyncMock()) as mock_update:
+            await llm_service.process_deal_extraction("deal-1", ws_manager=ws)
+
+        mock_update.assert_called_once()
+        partials = [call.args[1] for call in ws.broadcast_partial.await_args_list]
+        assert partials[0] == {"field": "company_name", "value": "Acme"}
+        assert {"field": "sector", "value": "Fintech"} in partials
+        extracted = mock_update.call_args.args[1]
+        ws.broadcast_status.assert_any_await("deal-1", DealStatus.COMPLETED, extracted=extracted)
+
+
+class TestPartialBroadcast:
+    @pytest.mark.asyncio
+    async def test_partial_field_message(self):
+        manager = WebSocketManager()
+        socket = MagicMock()
+        socket.accept = AsyncMock()
+        socket.send_text = AsyncMock()
+        await manager.connect("deal-1", socket)
+
+        await manager.broadcast_partial("deal-1", {"field": "sector", "value": "Fintech"})
+        await manager.flush()
+
+        message = json.loads(socket.send_text.await_args.args[0])
+        assert message["type"] == "partial_field"
+        assert message["status"] == "extracting"
+        assert message["data"] == {"field": "sector", "value": "Fintech"}
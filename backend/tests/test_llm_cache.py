@@ -0,0 +1,107 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import database
+import llm_service
+from llm_cache import LLMCache, prompt_version
+from models import DealStatus, ExtractedDeal
+
+
+def make_deal(name: str, bullets: int = 2) -> ExtractedDeal:
+    return ExtractedDeal(
+        company_name=name,
+        investment_brief=[f"Point {i}" for i in range(bullets)],
+    )
+
+
+class TestLLMCache:
+    """Tests for the persistent extraction cache."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_is_keyed_by_prompt_and_model(self, db):
+        cache = LLMCache()
+        await cache.put("hash-1", "v1", "gpt-4o", make_deal("Acme"))
+
+        hit = await cache.get("hash-1", "v1", "gpt-4o")
+        assert hit == make_deal("Acme")
+        assert await cache.get("hash-1", "v2", "gpt-4o") is None
+        assert await cache.get("hash-1", "v1", "gpt-4o-mini") is None
+        assert await cache.get("hash-2", "v1", "gpt-4o") is None
+
+        stats = await cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+        assert stats["hit_rate"] == 0.25
+        assert stats["entries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_beyond_max_bytes(self, db):
+        entry_size = len(make_deal("Deal 0").model_dump_json())
+        cache = LLMCache(max_bytes=entry_size * 2)
+
+        await cache.put("hash-0", "v1", "m", make_deal("Deal 0"))
+        await cache.put("hash-1", "v1", "m", make_deal("Deal 1"))
+        assert await cache.get("hash-0", "v1", "m") is not None  # now most recent
+        await cache.put("hash-2", "v1", "m", make_deal("Deal 2"))
+
+        assert await cache.get("hash-1", "v1", "m") is None
+        assert await cache.get("hash-0", "v1", "m") is not None
+        assert await cache.get("hash-2", "v1", "m") is not None
+        stats = await cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= entry_size * 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_stores_nothing(self, db):
+        cache = LLMCache(max_bytes=0)
+        await cache.put("hash-1", "v1", "m", make_deal("Acme"))
+        assert await cache.get("hash-1", "v1", "m") is None
+        assert (await cache.stats())["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_fatal(self):
+        cache = LLMCache()
+        # No pool is open, so every database call fails
+        assert await cache.get("hash-1", "v1", "m") is None
+        await cache.put("hash-1", "v1", "m", make_deal("Acme"))
+        assert cache.errors == 2
+
+    def test_prompt_version_tracks_prompt_text(self):
+        assert prompt_version("a", "b") == prompt_version("a", "b")
+        assert prompt_version("a", "b") != prompt_version("a", "c")
+        assert prompt_version("ab", "") != prompt_version("a", "b")
+
+
+class TestCachedExtraction:
+    """process_deal_extraction consults the cache before calling the LLM."""
+
+    @pytest.mark.asyncio
+    async def test_reextraction_is_served_from_cache(self, db, monkeypatch):
+        monkeypatch.setattr(llm_service, "response_cache", LLMCache())
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        response = json.dumps({"company_name": "Acme", "investment_brief": ["Point 1"]})
+
+        with patch("llm_service.extract_deal_data", AsyncMock(return_value=response)) as mock:
+            await llm_service.process_deal_extraction("deal-1")
+            await database.update_deal_status("deal-1", DealStatus.PENDING)
+            await llm_service.process_deal_extraction("deal-1")
+
+        assert mock.await_count == 1
+        deal = await database.get_deal_by_id("deal-1")
+        assert deal.status == DealStatus.COMPLETED
+        assert deal.company_name == "Acme"
+        assert llm_service.response_cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_extractions_are_not_cached(self, db, monkeypatch):
+        monkeypatch.setattr(llm_service, "response_cache", LLMCache())
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+
+        with patch("llm_service.extract_deal_data", AsyncMock(return_value="{ bad }")), \
+             patch("llm_service.repair_json", AsyncMock(return_value="{ bad }")):
+            await llm_service.process_deal_extraction("deal-1")
+
+        assert (await database.get_deal_by_id("deal-1")).status == DealStatus.FAILED
+        assert (await llm_service.response_cache.stats())["entries"] == 0
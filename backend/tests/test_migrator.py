@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import aiosqlite
+import pytest
+
+from migrator import MigrationError, discover_migrations, run_migrations, split_statements
+from tests.conftest import MIGRATIONS_DIR
+
+
+def write(path, name, sql):
+    (path / name).write_text(sql)
+
+
+@pytest.fixture
+async def conn(tmp_path):
+    async with aiosqlite.connect(str(tmp_path / "migrate.db")) as db:
+        yield db
+
+
+async def tables(db) -> set[str]:
+    cursor = await db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in await cursor.fetchall()}
+
+
+class TestMigrationRunner:
+    """Tests for the versioned migration runner."""
+
+    @pytest.mark.asyncio
+    async def test_applies_each_migration_once_in_order(self, tmp_path, conn):
+        migrations = tmp_path / "migrations"
+        migrations.mkdir()
+        write(migrations, "002_second.sql", "ALTER TABLE a ADD COLUMN b TEXT;")
+        write(migrations, "001_first.sql", "CREATE TABLE a (id INTEGER);")
+        write(migrations, "README.md", "not a migration")
+
+        assert await run_migrations(conn, str(migrations)) == [1, 2]
+        assert await run_migrations(conn, str(migrations)) == []
+
+        write(migrations, "003_third.sql", "CREATE TABLE c (id INTEGER);")
+        assert await run_migrations(conn, str(migrations)) == [3]
+
+    @pytest.mark.asyncio
+    async def test_migrated_database_runs_no_ddl(self, tmp_path, conn):
+        await run_migrations(conn, MIGRATIONS_DIR)
+
+        statements = []
+        await conn.set_trace_callback(statements.append)
+        assert await run_migrations(conn, MIGRATIONS_DIR) == []
+        await conn.set_trace_callback(None)
+
+        assert statements
+        assert all(s.lstrip().upper().startswith("SELECT") for s in statements)
+
+    @pytest.mark.asyncio
+    async def test_failed_migration_rolls_back(self, tmp_path, conn):
+        migrations = tmp_path / "migrations"
+        migrations.mkdir()
+        write(migrations, "001_bad.sql", "CREATE TABLE a (id INTEGER);\nNOT VALID SQL;")
+
+        with pytest.raises(MigrationError):
+            await run_migrations(conn, str(migrations))
+        assert "a" not in await tables(conn)
+
+        write(migrations, "001_bad.sql", "CREATE TABLE a (id INTEGER);")
+        assert await run_migrations(conn, str(migrations)) == [1]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_runners_apply_each_migration_once(self, tmp_path):
+        """Several processes starting at once on a fresh database."""
+        path = str(tmp_path / "shared.db")
+
+        async def migrate() -> list[int]:
+            async with aiosqlite.connect(path) as db:
+                await db.execute("PRAGMA journal_mode = WAL")
+                await db.execute("PRAGMA busy_timeout = 5000")
+                return await run_migrations(db, MIGRATIONS_DIR)
+
+        results = await asyncio.gather(*(migrate() for _ in range(4)))
+
+        applied = sorted(v for versions in results for v in versions)
+        assert applied == [m.version for m in discover_migrations(MIGRATIONS_DIR)]
+        async with aiosqlite.connect(path) as db:
+            cursor = await db.execute("SELECT COUNT(*) FROM schema_version")
+            assert (await cursor.fetchone())[0] == len(applied)
+
+    def test_duplicate_versions_rejected(self, tmp_path):
+        write(tmp_path, "001_a.sql", "SELECT 1;")
+        write(tmp_path, "001_b.sql", "SELECT 1;")
+        with pytest.raises(MigrationError):
+            discover_migrations(str(tmp_path))
+
+    def test_split_statements_keeps_trigger_bodies(self):
+        sql = """
+        -- comment
+        CREATE TABLE a (id INTEGER);
+        CREATE TRIGGER t AFTER INSERT ON a BEGIN
+            UPDATE a SET id = id;
+        END;
+        """
+        statements = split_statements(sql)
+        assert len(statements) == 2
+        assert statements[1].endswith("END;")
+
+
+class TestBackfill:
+    """Tests for chunked backfill migrations."""
+
+    @pytest.mark.asyncio
+    async def test_deal_tags_backfill_runs_in_chunks(self, tmp_path, conn):
+        migrations = tmp_path / "migrations"
+        migrations.mkdir()
+        for migration in discover_migrations(MIGRATIONS_DIR):
+            if migration.version <= 2:
+                write(migrations, f"{migration.version:03d}_{migration.name}.sql", migration.sql)
+        await run_migrations(conn, str(migrations))
+
+        rows = [
+            (f"deal-{i}", f"hash-{i}", "text", json.dumps(["Fintech", "AI"]), f"2024-01-01T00:{i:02d}")
+            for i in range(25)
+        ]
+        await conn.executemany(
+            "INSERT INTO deals (id, content_hash, raw_text, tags, created_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        await conn.commit()
+
+        with open(f"{MIGRATIONS_DIR}/003_backfill_deal_tags.sql") as f:
+            sql = f.read().replace("batch_size=1000", "batch_size=10")
+        write(migrations, "003_backfill_deal_tags.sql", sql)
+
+        statements = []
+        await conn.set_trace_callback(statements.append)
+        assert await run_migrations(conn, str(migrations)) == [3]
+        await conn.set_trace_callback(None)
+
+        inserts = [s for s in statements if "INSERT OR IGNORE INTO deal_tags" in s]
+        assert len(inserts) == 3
+        cursor = await conn.execute("SELECT COUNT(*) FROM deal_tags WHERE tag = 'fintech'")
+        assert (await cursor.fetchone())[0] == 25
+
+    @pytest.mark.asyncio
+    async def test_backfill_resumes_from_progress(self, tmp_path, conn):
+        migrations = tmp_path / "migrations"
+        migrations.mkdir()
+        write(migrations, "001_items.sql", "CREATE TABLE items (n INTEGER, done INTEGER DEFAULT 0);")
+        await run_migrations(conn, str(migrations))
+        await conn.executemany("INSERT INTO items (n) VALUES (?)", [(i,) for i in range(10)])
+        await conn.execute("INSERT INTO backfill_progress (version, last_rowid) VALUES (2, 5)")
+        await conn.commit()
+
+        write(
+            migrations,
+            "002_mark_done.sql",
+            "-- backfill: table=items batch_size=2\n"
+            "UPDATE items SET done = 1 WHERE rowid > :start AND rowid <= :end;",
+        )
+        assert await run_migrations(conn, str(migrations)) == [2]
+
+        cursor = await conn.execute("SELECT n FROM items WHERE done = 1 ORDER BY n")
+        assert [row[0] for row in await cursor.fetchall()] == [5, 6, 7, 8, 9]
+        cursor = await conn.execute("SELECT COUNT(*) FROM backfill_progress")
+        assert (await cursor.fetchone())[0] == 0
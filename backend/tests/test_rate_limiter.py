@@ -0,0 +1,168 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, RateLimitError
+
+import llm_service
+from concurrency import AIMDLimiter
+from rate_limiter import OpenAIRateLimiter, TokenBucket, parse_reset_duration
+from tests.fake_openai import FakeOpenAI
+
+
+def fake_client(app) -> AsyncOpenAI:
+    """A client with the production settings, talking to `app`."""
+    return llm_service.create_client(
+        api_key="test",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    def install(app, limiter):
+        monkeypatch.setattr(llm_service, "get_client", lambda: fake_client(app))
+        monkeypatch.setattr(llm_service, "rate_limiter", limiter)
+        monkeypatch.setattr(llm_service, "concurrency_limiter", AIMDLimiter(initial=64, max_limit=64))
+        monkeypatch.setattr(llm_service, "EXPECTED_COMPLETION_TOKENS", 50)
+    return install
+
+
+async def burst(calls: int) -> int:
+    """Fire `calls` concurrent extractions; return how many hit a 429."""
+    results = await asyncio.gather(
+        *(llm_service.extract_deal_data("Acme raises a seed round") for _ in range(calls)),
+        return_exceptions=True,
+    )
+    return sum(isinstance(r, RateLimitError) for r in results)
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("1s") == 1
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert parse_reset_duration("2.5") == 2.5
+    assert parse_reset_duration("") is None
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(capacity=10, refill_per_second=5)
+    assert bucket.time_until(10) == 0
+    bucket.consume(10)
+    assert bucket.time_until(5) == pytest.approx(1, abs=0.05)
+
+    bucket.refund(4)
+    assert bucket.time_until(4) == pytest.approx(0, abs=0.01)
+
+
+def test_limiter_follows_headers():
+    limiter = OpenAIRateLimiter(requests_per_minute=500, tokens_per_minute=30000)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-limit-tokens": "1200",
+        "x-ratelimit-remaining-requests": "3",
+        "x-ratelimit-remaining-tokens": "100",
+    })
+    stats = limiter.stats()
+    assert stats["requests_per_minute"] == 60
+    assert stats["tokens_per_minute"] == 1200
+    assert stats["available_requests"] == pytest.approx(3, abs=0.1)
+    assert stats["available_tokens"] == pytest.approx(100, abs=1)
+
+
+def test_limiter_takes_its_share_of_account_limits():
+    limiter = OpenAIRateLimiter(requests_per_minute=500, tokens_per_minute=30000, share=0.25)
+    assert limiter.stats()["requests_per_minute"] == pytest.approx(125)
+    assert limiter.stats()["tokens_per_minute"] == pytest.approx(7500)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "4",
+    })
+    stats = limiter.stats()
+    assert stats["requests_per_minute"] == pytest.approx(15)
+    assert stats["available_requests"] == pytest.approx(1, abs=0.1)
+
+
+def test_limiter_reconciles_usage():
+    limiter = OpenAIRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.tokens.consume(500)
+    limiter.reconcile(reserved=500, used=200)
+    assert limiter.tokens.tokens == pytest.approx(400, abs=1)
+
+
+async def test_acquire_waits_out_retry_after():
+    limiter = OpenAIRateLimiter(requests_per_minute=6000, tokens_per_minute=60000)
+    limiter.on_rate_limited({"retry-after-ms": "200"})
+    start = asyncio.get_running_loop().time()
+    await limiter.acquire(10)
+    assert asyncio.get_running_loop().time() - start >= 0.19
+    assert limiter.stats()["rate_limited"] == 1
+
+
+async def test_burst_without_limiter_gets_429s(fake_openai):
+    # 600 RPM with a half-second window: bursts of more than 5 are rejected
+    app = FakeOpenAI(requests_per_minute=600, tokens_per_minute=600000, burst_seconds=0.5)
+    fake_openai(app, OpenAIRateLimiter(requests_per_minute=1e9, tokens_per_minute=1e12))
+
+    assert await burst(20) > 0
+    assert app.rejected > 0
+
+
+async def test_burst_with_limiter_has_no_429s(fake_openai):
+    # 600 RPM = 10 requests/s; 20 calls need ~1.5 s once the burst of 5 is spent
+    app = FakeOpenAI(requests_per_minute=600, tokens_per_minute=600000, burst_seconds=0.5)
+    limiter = OpenAIRateLimiter(requests_per_minute=600, tokens_per_minute=600000,
+                                burst_seconds=0.5)
+    fake_openai(app, limiter)
+
+    assert await burst(20) == 0
+    assert app.served == 20
+    assert limiter.stats()["acquired"] == 20
+
+
+async def test_limiter_learns_limits_from_server(fake_openai):
+    # Configured far too high; the first response corrects it
+    app = FakeOpenAI(requests_per_minute=600, tokens_per_minute=60000)
+    limiter = OpenAIRateLimiter(requests_per_minute=100000, tokens_per_minute=10**7)
+    fake_openai(app, limiter)
+
+    await llm_service.extract_deal_data("Acme raises a seed round")
+    stats = limiter.stats()
+    assert stats["requests_per_minute"] == 600
+    assert stats["tokens_per_minute"] == 60000
+
+
+async def test_429_blocks_limiter(fake_openai):
+    app = FakeOpenAI(requests_per_minute=60, tokens_per_minute=60000)
+    app.requests.tokens = 0
+    limiter = OpenAIRateLimiter(requests_per_minute=60, tokens_per_minute=60000)
+    fake_openai(app, limiter)
+
+    with pytest.raises(RateLimitError):
+        await llm_service.extract_deal_data("Acme raises a seed round")
+    # The SDK does not retry behind the limiter's back
+    assert app.rejected == 1
+    assert limiter.stats()["rate_limited"] == 1
+    assert limiter._blocked_until > 0
+
+
+def test_client_does_not_retry_and_times_out(monkeypatch):
+    monkeypatch.setattr(llm_service, "_client", None)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    client = llm_service.get_client()
+    assert client.max_retries == 0
+    assert client.timeout == llm_service.OPENAI_TIMEOUT
+
+
+async def test_token_budget_paces_large_prompts(fake_openai, monkeypatch):
+    # ~1000-token calls against 120k TPM with a one-second window: two per second
+    app = FakeOpenAI(requests_per_minute=6000, tokens_per_minute=120000, burst_seconds=1,
+                     completion_tokens=900)
+    limiter = OpenAIRateLimiter(requests_per_minute=6000, tokens_per_minute=120000,
+                                burst_seconds=1)
+    fake_openai(app, limiter)
+    monkeypatch.setattr(llm_service, "EXPECTED_COMPLETION_TOKENS", 900)
+
+    assert await burst(4) == 0
+    assert limiter.stats()["waited_seconds"] > 0
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from job_queue import enqueue_job, lease_job, queue_depth
+from models import DealStatus
+from recovery import RecoveryReport, recover_stuck_deals
+
+
+async def insert_deal(deal_id: str, status: DealStatus, age: float):
+    updated = (datetime.utcnow() - timedelta(seconds=age)).isoformat()
+    async with database.connection() as conn:
+        await conn.execute(
+            """
+            INSERT INTO deals (id, content_hash, raw_text, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (deal_id, f"hash-{deal_id}", "text", status.value, updated, updated),
+        )
+        await conn.commit()
+
+
+class TestRecoverySweep:
+    """Tests for re-enqueueing deals orphaned mid-pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_only_stale_orphans_are_recovered(self, db):
+        await insert_deal("stuck-extracting", DealStatus.EXTRACTING, age=600)
+        await insert_deal("stuck-pending", DealStatus.PENDING, age=600)
+        await insert_deal("recent", DealStatus.EXTRACTING, age=1)
+        await insert_deal("done", DealStatus.COMPLETED, age=600)
+        await insert_deal("has-job", DealStatus.VALIDATING, age=600)
+        await enqueue_job("has-job")
+        await lease_job("live-worker", 60)
+
+        report = await recover_stuck_deals(RecoveryReport(), older_than=60, resweep=False)
+
+        assert report.recovered == 2
+        assert not report.running
+        assert (await database.get_deal_by_id("stuck-extracting")).status == DealStatus.PENDING
+        assert (await database.get_deal_by_id("recent")).status == DealStatus.EXTRACTING
+        assert await queue_depth() == {"queued": 2, "leased": 1}
+
+    @pytest.mark.asyncio
+    async def test_batches_are_paced(self, db):
+        for i in range(7):
+            await insert_deal(f"deal-{i}", DealStatus.EXTRACTING, age=600)
+        batches = []
+
+        async def on_batch(deal_ids):
+            batches.append((asyncio.get_running_loop().time(), len(deal_ids)))
+
+        report = await recover_stuck_deals(
+            RecoveryReport(), older_than=60, batch_size=3, batch_interval=0.05,
+            on_batch=on_batch, resweep=False,
+        )
+
+        assert report.recovered == 7
+        assert [size for _, size in batches] == [3, 3, 1]
+        gaps = [b[0] - a[0] for a, b in zip(batches, batches[1:])]
+        assert all(gap >= 0.04 for gap in gaps)
+
+    @pytest.mark.asyncio
+    async def test_deal_orphaned_just_before_restart_is_recovered_later(self, db):
+        await insert_deal("old", DealStatus.EXTRACTING, age=600)
+        await insert_deal("just-orphaned", DealStatus.EXTRACTING, age=0.05)
+        batches = []
+
+        async def on_batch(deal_ids):
+            batches.append(deal_ids)
+
+        report = await recover_stuck_deals(RecoveryReport(), older_than=0.2, on_batch=on_batch)
+
+        assert batches == [["old"], ["just-orphaned"]]
+        assert report.recovered == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_sweeps_recover_each_deal_once(self, db):
+        for i in range(20):
+            await insert_deal(f"deal-{i}", DealStatus.EXTRACTING, age=600)
+        batches = []
+
+        async def on_batch(deal_ids):
+            batches.extend(deal_ids)
+
+        reports = await asyncio.gather(*(
+            recover_stuck_deals(
+                RecoveryReport(), older_than=60, batch_size=3, batch_interval=0,
+                on_batch=on_batch, resweep=False,
+            )
+            for _ in range(3)
+        ))
+
+        assert sum(report.recovered for report in reports) == 20
+        assert sorted(batches) == sorted(f"deal-{i}" for i in range(20))
+        assert await queue_depth() == {"queued": 20}
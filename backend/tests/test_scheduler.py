@@ -0,0 +1,88 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from job_queue import WorkerPool, enqueue_job
+from models import JobLane
+from scheduler import LaneScheduler, parse_lane_weights
+
+
+class TestLaneScheduler:
+    """Tests for weighted fair lane selection."""
+
+    def test_weighted_round_robin_ratio(self):
+        scheduler = LaneScheduler({JobLane.INTERACTIVE: 4, JobLane.BULK: 1})
+        picks = Counter()
+        for _ in range(100):
+            lane = scheduler.next_lanes()[0]
+            scheduler.record_dequeue(lane, 0)
+            picks[lane] += 1
+        assert picks[JobLane.INTERACTIVE] == 80
+        assert picks[JobLane.BULK] == 20
+
+    def test_only_leases_from_preferred_lane_advance_the_ratio(self):
+        scheduler = LaneScheduler({JobLane.INTERACTIVE: 4, JobLane.BULK: 1})
+        picks = Counter()
+        for i in range(100):
+            # Idle polls and fallback leases in between
+            for _ in range(3):
+                scheduler.next_lanes()
+            fallback = scheduler.next_lanes()[1]
+            scheduler.record_dequeue(fallback, 0)
+            lane = scheduler.next_lanes()[0]
+            scheduler.record_dequeue(lane, 0)
+            picks[lane] += 1
+        assert picks[JobLane.INTERACTIVE] == 80
+        assert picks[JobLane.BULK] == 20
+
+    def test_every_lane_offered_as_fallback(self):
+        scheduler = LaneScheduler({JobLane.INTERACTIVE: 4, JobLane.BULK: 1})
+        assert set(scheduler.next_lanes()) == set(JobLane)
+
+    def test_parse_lane_weights(self):
+        assert parse_lane_weights("bulk=2") == {JobLane.BULK: 2, JobLane.INTERACTIVE: 1}
+        with pytest.raises(ValueError):
+            parse_lane_weights("bulk=0")
+
+    def test_wait_time_stats(self):
+        scheduler = LaneScheduler()
+        for wait in (0.1, 0.2, 0.3):
+            scheduler.record_dequeue(JobLane.BULK, wait)
+        stats = scheduler.stats({"bulk": 5})["bulk"]
+        assert stats["queued"] == 5
+        assert stats["dequeued"] == 3
+        assert stats["wait_ms"]["p50"] == pytest.approx(200)
+        assert stats["wait_ms"]["max"] == pytest.approx(300)
+
+
+class TestPriorityLanes:
+    """Tests for lane-aware leasing in the worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_jobs_overtake_bulk_backlog(self, db):
+        for i in range(20):
+            await enqueue_job(f"bulk-{i}", lane=JobLane.BULK)
+        for i in range(4):
+            await enqueue_job(f"interactive-{i}", lane=JobLane.INTERACTIVE)
+
+        order = []
+
+        async def handler(deal_id):
+            order.append(deal_id)
+
+        scheduler = LaneScheduler({JobLane.INTERACTIVE: 4, JobLane.BULK: 1})
+        pool = WorkerPool(handler, workers=1, poll_interval=0.01, scheduler=scheduler)
+        await pool.start()
+        for _ in range(300):
+            if len(order) == 24:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+        # All interactive work is done within the first five dequeues
+        assert {d for d in order[:5] if d.startswith("interactive")} == {
+            f"interactive-{i}" for i in range(4)
+        }
+        assert len(order) == 24
+        assert scheduler.dequeued[JobLane.BULK] == 20
@@ -0,0 +1,113 @@
+import json
+
+import httpx
+import pytest
+
+import llm_service
+from concurrency import AIMDLimiter
+from models import ExtractedDeal
+from rate_limiter import OpenAIRateLimiter
+from structured_output import (
+    from_structured,
+    from_structured_event,
+    response_format,
+    strict_json_schema,
+)
+from tests.fake_openai import FakeOpenAI
+
+
+def walk_objects(schema: dict):
+    if schema.get("type") == "object":
+        yield schema
+        for prop in schema["properties"].values():
+            yield from walk_objects(prop)
+    elif schema.get("type") == "array":
+        yield from walk_objects(schema["items"])
+
+
+class TestStrictSchema:
+    """Tests for the strict JSON schema generated from ExtractedDeal."""
+
+    def test_covers_every_model_field(self):
+        schema = strict_json_schema()
+        assert list(schema["properties"]) == list(ExtractedDeal.model_fields)
+
+    def test_every_object_is_closed_and_fully_required(self):
+        for obj in walk_objects(strict_json_schema()):
+            assert obj["additionalProperties"] is False
+            assert sorted(obj["required"]) == sorted(obj["properties"])
+
+    def test_metrics_are_key_value_pairs(self):
+        metrics = strict_json_schema()["properties"]["metrics"]
+        assert metrics["type"] == "array"
+        assert list(metrics["items"]["properties"]) == ["key", "value"]
+
+    def test_response_format(self):
+        fmt = response_format()
+        assert fmt["type"] == "json_schema"
+        assert fmt["json_schema"]["strict"] is True
+
+
+class TestConversion:
+    def test_round_trip_validates(self):
+        content = json.dumps({
+            "company_name": "Acme",
+            "founders": [],
+            "sector": "Fintech",
+            "geography": "",
+            "stage": "Seed",
+            "round_size": "$2M",
+            "metrics": [{"key": "ARR", "value": "$1M"}, {"key": "growth", "value": "3x"}],
+            "investment_brief": ["Strong team"],
+            "tags": ["fintech"],
+        })
+        deal = ExtractedDeal(**json.loads(from_structured(content)))
+        assert deal.metrics == {"ARR": "$1M", "growth": "3x"}
+
+    def test_invalid_content_is_left_for_repair(self):
+        assert from_structured("{ not json") == "{ not json"
+
+    def test_stream_events(self):
+        assert from_structured_event({"field": "sector", "value": "AI"}) == {
+            "field": "sector", "value": "AI"
+        }
+        assert from_structured_event(
+            {"field": "metrics", "index": 0, "value": {"key": "ARR", "value": "1"}}
+        ) is None
+        assert from_structured_event(
+            {"field": "metrics", "value": [{"key": "ARR", "value": "1"}]}
+        ) == {"field": "metrics", "value": {"ARR": "1"}}
+
+
+class TestStructuredExtraction:
+    @pytest.fixture
+    def fake_openai(self, monkeypatch):
+        app = FakeOpenAI(6000, 10**6, completion={
+            "company_name": "Acme",
+            "metrics": [{"key": "ARR", "value": "$1M"}],
+            "investment_brief": ["Strong team"],
+        })
+        client = llm_service.create_client(
+            api_key="test",
+            base_url="http://fake/v1",
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+        )
+        monkeypatch.setattr(llm_service, "get_client", lambda: client)
+        monkeypatch.setattr(llm_service, "rate_limiter", OpenAIRateLimiter(6000, 10**6))
+        monkeypatch.setattr(llm_service, "concurrency_limiter", AIMDLimiter(initial=8))
+        return app
+
+    @pytest.mark.asyncio
+    async def test_opt_in_sends_schema_and_converts_back(self, fake_openai, monkeypatch):
+        monkeypatch.setattr(llm_service, "EXTRACTION_STRUCTURED_OUTPUTS", True)
+
+        result = await llm_service.extract_deal_data("Acme raises a seed round")
+
+        assert fake_openai.last_request["response_format"]["type"] == "json_schema"
+        deal = await llm_service.validate_and_parse(result)
+        assert deal.metrics == {"ARR": "$1M"}
+
+    @pytest.mark.asyncio
+    async def test_json_mode_is_the_default(self, fake_openai):
+        await llm_service.extract_deal_data("Acme raises a seed round")
+        assert fake_openai.last_request["response_format"] == {"type": "json_object"}
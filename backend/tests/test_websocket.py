@@ -0,0 +1,426 @@
+import asyncio
+import json
+from typing import Optional
+from unittest.mock import patch
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import database
+import main
+from job_queue import WorkerPool
+from models import DealStatus, ExtractedDeal, WebSocketMessage
+from event_log import DealEventLog
+from tests.conftest import MIGRATIONS_DIR
+from websocket import DealFilter, WebSocketManager, parse_fields
+
+
+class FakeWebSocket:
+    """Records sent messages; each send takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent: list[dict] = []
+        self.closed_with = None
+        self.blocked = asyncio.Event()
+        self.blocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.blocked.wait()
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def subscribe(
+    manager: WebSocketManager,
+    deal_id: str,
+    last_seq: Optional[int] = None,
+    fields: Optional[frozenset[str]] = None,
+    **kwargs,
+) -> FakeWebSocket:
+    socket = FakeWebSocket(**kwargs)
+    await manager.connect(deal_id, socket, last_seq, fields)
+    return socket
+
+
+EXTRACTED = ExtractedDeal(
+    company_name="Acme", sector="Fintech", stage="Seed", investment_brief=["Strong team"]
+)
+
+
+class TestBroadcast:
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_does_not_delay_others(self):
+        manager = WebSocketManager()
+        slow = await subscribe(manager, "deal-1", delay=0.5)
+        fast = [await subscribe(manager, "deal-1") for _ in range(3)]
+
+        start = asyncio.get_running_loop().time()
+        await manager.broadcast_status("deal-1", DealStatus.EXTRACTING)
+        await manager.broadcast_status("deal-1", DealStatus.COMPLETED)
+        # The broadcast returns without waiting for any send
+        assert asyncio.get_running_loop().time() - start < 0.05
+
+        await asyncio.sleep(0.05)
+        for socket in fast:
+            assert [m["status"] for m in socket.sent] == ["extracting", "completed"]
+        assert slow.sent == []
+
+        await manager.flush()
+        assert [m["status"] for m in slow.sent] == ["extracting", "completed"]
+
+    @pytest.mark.asyncio
+    async def test_message_serialized_once_per_broadcast(self):
+        manager = WebSocketManager()
+        sockets = [await subscribe(manager, "deal-1") for _ in range(10)]
+
+        with patch.object(
+            WebSocketMessage, "model_dump_json", autospec=True,
+            side_effect=WebSocketMessage.model_dump_json,
+        ) as dump:
+            await manager.broadcast_status("deal-1", DealStatus.FAILED, "boom")
+        await manager.flush()
+
+        assert dump.call_count == 1
+        assert all(s.sent[0]["error"] == "boom" for s in sockets)
+
+    @pytest.mark.asyncio
+    async def test_only_subscribers_of_the_deal_receive(self):
+        manager = WebSocketManager()
+        mine = await subscribe(manager, "deal-1")
+        other = await subscribe(manager, "deal-2")
+
+        await manager.broadcast_status("deal-1", DealStatus.COMPLETED)
+        await manager.flush()
+
+        assert len(mine.sent) == 1
+        assert other.sent == []
+
+    @pytest.mark.asyncio
+    async def test_failed_send_disconnects(self):
+        manager = WebSocketManager()
+        broken = await subscribe(manager, "deal-1", fail=True)
+        healthy = await subscribe(manager, "deal-1")
+
+        await manager.broadcast_status("deal-1", DealStatus.EXTRACTING)
+        await manager.flush()
+        await asyncio.sleep(0)
+
+        assert broken not in manager.connections["deal-1"]
+        assert len(healthy.sent) == 1
+        assert manager.stats()["send_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disconnect_removes_empty_deal(self):
+        manager = WebSocketManager()
+        socket = await subscribe(manager, "deal-1")
+        manager.disconnect("deal-1", socket)
+        assert manager.connections == {}
+        # Broadcasting to a deal nobody watches is a no-op
+        await manager.broadcast_status("deal-1", DealStatus.COMPLETED)
+        assert manager.stats()["broadcasts"] == 0
+
+
+class TestSlowConsumerPolicy:
+    @pytest.mark.asyncio
+    async def test_drop_discards_oldest_queued_messages(self):
+        manager = WebSocketManager(queue_size=2, slow_consumer_policy="drop")
+        socket = await subscribe(manager, "deal-1")
+        socket.blocked.clear()
+
+        for status in (DealStatus.PENDING, DealStatus.EXTRACTING,
+                       DealStatus.VALIDATING, DealStatus.COMPLETED):
+            await manager.broadcast_status("deal-1", status)
+            await asyncio.sleep(0.01)
+        socket.blocked.set()
+        await manager.flush()
+
+        # The writer had already taken the first message; the newest two survive
+        assert [m["status"] for m in socket.sent] == ["pending", "validating", "completed"]
+        assert manager.stats()["dropped"] == 1
+        assert socket in manager.connections["deal-1"]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_closes_slow_client(self):
+        manager = WebSocketManager(queue_size=1, slow_consumer_policy="disconnect")
+        slow = await subscribe(manager, "deal-1")
+        fast = await subscribe(manager, "deal-1")
+        slow.blocked.clear()
+
+        for status in (DealStatus.PENDING, DealStatus.EXTRACTING, DealStatus.VALIDATING):
+            await manager.broadcast_status("deal-1", status)
+            await asyncio.sleep(0.01)
+        await manager.flush()
+        await asyncio.sleep(0)
+
+        assert slow.closed_with == 1013
+        assert list(manager.connections["deal-1"]) == [fast]
+        assert len(fast.sent) == 3
+        assert manager.stats()["slow_disconnects"] == 1
+
+    def test_unknown_policy_rejected(self):
+        with pytest.raises(ValueError):
+            WebSocketManager(slow_consumer_policy="block")
+
+
+class TestFirehose:
+    def test_filter_matching(self):
+        summary = {"status": "completed", "sector": "Fintech", "stage": "Seed"}
+        assert DealFilter().matches("deal_created", summary)
+        assert DealFilter(sectors=frozenset({"Fintech", "Climate"})).matches("x", summary)
+        assert not DealFilter(stages=frozenset({"Series A"})).matches("x", summary)
+        assert not DealFilter(events=frozenset({"deal_completed"})).matches("status_update", summary)
+
+    @pytest.mark.asyncio
+    async def test_status_events_carry_summary(self, db):
+        manager = WebSocketManager()
+        everything = FakeWebSocket()
+        failures = FakeWebSocket()
+        await manager.connect_firehose(everything)
+        await manager.connect_firehose(failures, DealFilter(statuses=frozenset({"failed"})))
+        deal = await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+
+        await manager.broadcast_created(deal)
+        await database.update_deal_status("deal-1", DealStatus.FAILED, "boom")
+        await manager.broadcast_status("deal-1", DealStatus.FAILED, "boom")
+        await manager.flush()
+
+        assert [m["type"] for m in everything.sent] == ["deal_created", "status_update"]
+        assert everything.sent[0]["data"]["status"] == "pending"
+        assert failures.sent == [{
+            "type": "status_update",
+            "deal_id": "deal-1",
+            "status": "failed",
+            "data": {
+                "id": "deal-1", "status": "failed", "company_name": None, "sector": None,
+                "stage": None, "created_at": deal.created_at.isoformat(),
+            },
+            "error": "boom",
+            "seq": None,
+        }]
+
+    @pytest.mark.asyncio
+    async def test_per_deal_subscribers_do_not_get_firehose_events(self, db):
+        manager = WebSocketManager()
+        socket = await subscribe(manager, "deal-1")
+        deal = await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        await manager.broadcast_created(deal)
+        await manager.flush()
+        assert socket.sent == []
+
+
+class TestCompletionPayload:
+    def test_parse_fields(self):
+        assert parse_fields(None) is None
+        assert parse_fields(["company_name,sector", "tags"]) == {"company_name", "sector", "tags"}
+        with pytest.raises(ValueError, match="raw_text"):
+            parse_fields(["company_name,raw_text"])
+
+    @pytest.mark.asyncio
+    async def test_completion_carries_selected_fields(self):
+        manager = WebSocketManager()
+        full = [await subscribe(manager, "deal-1") for _ in range(2)]
+        names = [await subscribe(manager, "deal-1", fields=frozenset({"company_name"}))
+                 for _ in range(2)]
+
+        await manager.broadcast_status("deal-1", DealStatus.VALIDATING)
+        await manager.broadcast_status("deal-1", DealStatus.COMPLETED, extracted=EXTRACTED)
+        await manager.flush()
+
+        assert all(s.sent[0]["data"] is None for s in full + names)
+        assert full[0].sent[1]["data"] == EXTRACTED.model_dump(mode="json")
+        assert names[0].sent[1]["data"] == {"company_name": "Acme"}
+        # Once for the status update, then once per distinct field selection
+        assert manager.serialized == 3
+
+    @pytest.mark.asyncio
+    async def test_firehose_adds_only_requested_fields(self, db):
+        manager = WebSocketManager()
+        summaries = FakeWebSocket()
+        briefs = FakeWebSocket()
+        await manager.connect_firehose(summaries)
+        await manager.connect_firehose(briefs, fields=frozenset({"investment_brief"}))
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        await database.update_deal_extracted("deal-1", EXTRACTED)
+
+        await manager.broadcast_status("deal-1", DealStatus.COMPLETED, extracted=EXTRACTED)
+        await manager.flush()
+
+        assert "investment_brief" not in summaries.sent[0]["data"]
+        assert briefs.sent[0]["data"]["investment_brief"] == ["Strong team"]
+        assert briefs.sent[0]["data"]["id"] == "deal-1"
+
+
+class TestCatchUp:
+    @pytest.fixture
+    async def logged(self, db):
+        manager = WebSocketManager(event_log=DealEventLog())
+        await database.create_deal("deal-1", "hash-1", "Acme raises a seed round")
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_unknown_deal_gets_no_snapshot(self, logged):
+        socket = await subscribe(logged, "missing")
+        await logged.broadcast_status("missing", DealStatus.PENDING)
+        await logged.flush()
+        assert [m["type"] for m in socket.sent] == ["status_update"]
+
+    @pytest.mark.asyncio
+    async def test_live_events_during_catch_up_are_sent_once_in_order(self, logged, monkeypatch):
+        await database.update_deal_status("deal-1", DealStatus.EXTRACTING)
+        await logged.broadcast_status("deal-1", DealStatus.EXTRACTING)
+
+        # Broadcast while the new subscriber is still reading the log
+        since = logged.event_log.since
+
+        async def slow_since(last_seq, deal_id=None):
+            rows = await since(last_seq, deal_id)
+            await logged.broadcast_status("deal-1", DealStatus.VALIDATING)
+            rows.extend(await since(rows[-1]["seq"], deal_id))
+            return rows
+
+        monkeypatch.setattr(logged.event_log, "since", slow_since)
+        socket = await subscribe(logged, "deal-1", last_seq=0)
+        await logged.broadcast_status("deal-1", DealStatus.COMPLETED)
+        await logged.flush()
+
+        seqs = [m["seq"] for m in socket.sent]
+        assert [m["status"] for m in socket.sent] == ["extracting", "validating", "completed"]
+        assert seqs == sorted(set(seqs))
+
+    @pytest.mark.asyncio
+    async def test_pruned_history_falls_back_to_snapshot(self, logged):
+        await logged.broadcast_status("deal-1", DealStatus.EXTRACTING)
+        await logged.broadcast_status("deal-1", DealStatus.VALIDATING)
+        async with database.connection() as conn:
+            await conn.execute("DELETE FROM deal_events WHERE seq = 1")
+            await conn.commit()
+
+        socket = await subscribe(logged, "deal-1", last_seq=0)
+        await logged.flush()
+        assert [(m["type"], m["seq"]) for m in socket.sent] == [("snapshot", 2)]
+
+    @pytest.mark.asyncio
+    async def test_firehose_replays_filtered_events(self, logged):
+        deal = await database.get_deal_by_id("deal-1")
+        await logged.broadcast_created(deal)
+        await logged.broadcast_status("deal-1", DealStatus.EXTRACTING)
+        await logged.broadcast_status("deal-1", DealStatus.FAILED, "boom")
+
+        socket = FakeWebSocket()
+        await logged.connect_firehose(
+            socket, DealFilter(events=frozenset({"status_update"})), last_seq=1
+        )
+        await logged.flush()
+        assert [(m["status"], m["seq"]) for m in socket.sent] == [("extracting", 2), ("failed", 3)]
+        assert socket.sent[1]["error"] == "boom"
+        assert socket.sent[1]["data"]["id"] == "deal-1"
+
+
+@pytest.fixture
+def live_app(tmp_path, monkeypatch):
+    """The app with its lifespan running and extraction replaced by a stub."""
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "deals.db"))
+    monkeypatch.setattr(database, "MIGRATIONS_PATH", MIGRATIONS_DIR)
+    database.deal_cache.clear()
+
+    async def extract(deal_id, ws_manager):
+        await database.update_deal_status(deal_id, DealStatus.EXTRACTING)
+        await ws_manager.broadcast_status(deal_id, DealStatus.EXTRACTING)
+        await database.update_deal_extracted(deal_id, EXTRACTED)
+        await ws_manager.broadcast_status(deal_id, DealStatus.COMPLETED, extracted=EXTRACTED)
+
+    monkeypatch.setattr(main, "process_deal_extraction", extract)
+    monkeypatch.setattr(main, "worker_pool", WorkerPool(main.run_extraction_job, workers=1,
+                                                          poll_interval=0.01))
+    monkeypatch.setattr(main, "ws_manager", WebSocketManager(event_log=DealEventLog()))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_firehose_streams_created_status_and_completed(live_app):
+    with live_app.websocket_connect("/ws/deals") as everything, \
+         live_app.websocket_connect("/ws/deals?event=deal_completed&sector=Fintech") as fintech:
+        response = live_app.post("/api/deals", json={"raw_text": "Acme raises a seed round"})
+        deal_id = response.json()["id"]
+
+        events = [everything.receive_json() for _ in range(3)]
+        assert [(e["type"], e["status"]) for e in events] == [
+            ("deal_created", "pending"),
+            ("status_update", "extracting"),
+            ("deal_completed", "completed"),
+        ]
+        assert all(e["deal_id"] == deal_id for e in events)
+
+        completed = fintech.receive_json()
+        assert completed["type"] == "deal_completed"
+        assert completed["data"]["company_name"] == "Acme"
+        assert completed["data"]["stage"] == "Seed"
+
+
+def test_firehose_resumes_from_deal_list_seq(live_app):
+    with live_app.websocket_connect("/ws/deals?event=deal_completed") as firehose:
+        live_app.post("/api/deals", json={"raw_text": "Acme raises a seed round"})
+        firehose.receive_json()
+    listed = live_app.get("/api/deals").json()
+
+    # A deal submitted between the list request and the socket opening
+    response = live_app.post("/api/deals", json={"raw_text": "Beta closes its Series A"})
+    deal_id = response.json()["id"]
+    with live_app.websocket_connect(f"/ws/deals?last_seq={listed['last_seq']}") as ws:
+        missed = [ws.receive_json() for _ in range(3)]
+    assert [(m["type"], m["deal_id"]) for m in missed] == [
+        ("deal_created", deal_id),
+        ("status_update", deal_id),
+        ("deal_completed", deal_id),
+    ]
+
+
+def test_deal_subscriber_gets_snapshot_then_resumes_from_last_seq(live_app):
+    with live_app.websocket_connect("/ws/deals?event=deal_completed") as firehose:
+        response = live_app.post("/api/deals", json={"raw_text": "Acme raises a seed round"})
+        deal_id = response.json()["id"]
+        completed = firehose.receive_json()
+
+    # Connecting after the extraction finished still shows the result
+    with live_app.websocket_connect(f"/ws/deals/{deal_id}") as ws:
+        snapshot = ws.receive_json()
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["status"] == "completed"
+    assert snapshot["seq"] == completed["seq"]
+    assert snapshot["data"]["investment_brief"] == ["Strong team"]
+
+    # Resuming from the created event replays only what came after it
+    with live_app.websocket_connect(f"/ws/deals/{deal_id}?last_seq={completed['seq'] - 2}") as ws:
+        replayed = [ws.receive_json() for _ in range(2)]
+    assert [(m["status"], m["seq"]) for m in replayed] == [
+        ("extracting", completed["seq"] - 1),
+        ("completed", completed["seq"]),
+    ]
+    assert replayed[0]["data"] is None
+    assert replayed[1]["data"]["company_name"] == "Acme"
+
+
+def test_deal_subscriber_selects_fields(live_app):
+    response = live_app.post("/api/deals", json={"raw_text": "Acme raises a seed round"})
+    deal_id = response.json()["id"]
+    with live_app.websocket_connect(f"/ws/deals/{deal_id}?fields=company_name,stage") as ws:
+        message = ws.receive_json()
+        while message["status"] != "completed":
+            message = ws.receive_json()
+    assert message["data"] == {"company_name": "Acme", "stage": "Seed"}
+
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with live_app.websocket_connect(f"/ws/deals/{deal_id}?fields=raw_text"):
+            pass
+    assert exc.value.code == 1008
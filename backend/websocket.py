@@ -1,56 +1,553 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Union
+
 from fastapi import WebSocket
-from typing import Dict, Set
-import json
+from pydantic import BaseModel
+
+from database import get_deal_by_id
+from event_bus import DealEvent, EventBus, LocalEventBus, create_event_bus
+from event_log import DealEventLog
+from models import DealResponse, DealStatus, DealSummary, ExtractedDeal, WebSocketMessage
+
+logger = logging.getLogger(__name__)
+
+# Messages buffered per connection before the slow-consumer policy applies
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+# What to do when a connection's queue is full: "drop" or "disconnect"
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop")
+# Seconds a single send may take before the connection is treated as dead
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+DROP = "drop"
+DISCONNECT = "disconnect"
+
+# Close code sent to a client disconnected for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Event types
+DEAL_CREATED = "deal_created"
+STATUS_UPDATE = "status_update"
+DEAL_COMPLETED = "deal_completed"
+# Current state of a deal, sent to a new subscriber
+SNAPSHOT = "snapshot"
+
+# Fields a completion event can carry; subscribers may select a subset
+EXTRACTED_FIELDS = frozenset(ExtractedDeal.model_fields)
+
+
+def parse_fields(values: Optional[Iterable[str]]) -> Optional[frozenset[str]]:
+    """Parse `fields` query values (repeated or comma-separated); None if not given."""
+    if not values:
+        return None
+    fields = frozenset(f.strip() for value in values for f in value.split(",") if f.strip())
+    unknown = fields - EXTRACTED_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return fields
 
-from models import DealStatus, WebSocketMessage
+
+def extracted_data(source: BaseModel, fields: Optional[frozenset[str]] = None) -> dict:
+    """The selected extracted fields of a deal (all of them if `fields` is None)."""
+    return source.model_dump(mode="json", include=EXTRACTED_FIELDS if fields is None else fields)
+
+
+@dataclass(frozen=True)
+class DealFilter:
+    """Which firehose events a subscriber wants; an empty set matches anything."""
+    events: frozenset[str] = frozenset()
+    statuses: frozenset[str] = frozenset()
+    sectors: frozenset[str] = frozenset()
+    stages: frozenset[str] = frozenset()
+
+    def matches(self, event: str, summary: dict) -> bool:
+        return (
+            (not self.events or event in self.events)
+            and (not self.statuses or summary["status"] in self.statuses)
+            and (not self.sectors or summary["sector"] in self.sectors)
+            and (not self.stages or summary["stage"] in self.stages)
+        )
+
+
+class Subscriber:
+    """One WebSocket connection with a bounded send queue drained by a writer task."""
+
+    def __init__(
+        self,
+        deal_id: Optional[str],
+        websocket: WebSocket,
+        queue_size: int,
+        on_error: Callable[["Subscriber"], None],
+        deal_filter: Optional[DealFilter] = None,
+        fields: Optional[frozenset[str]] = None,
+    ):
+        # deal_id is None for firehose subscribers, which use deal_filter
+        self.deal_id = deal_id
+        self.deal_filter = deal_filter or DealFilter()
+        # Extracted fields sent with completion events; None means all
+        self.fields = fields
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        # (seq, text) of live messages held back while catching up
+        self.backlog: Optional[list[tuple[Optional[int], str]]] = None
+        # Events up to this seq were sent while catching up
+        self.after_seq = 0
+        self._on_error = on_error
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write())
+
+    def offer(self, text: str) -> bool:
+        """Queue a message without waiting; False if the queue is full."""
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def replace_oldest(self, text: str):
+        """Make room by discarding the oldest queued message."""
+        self.queue.get_nowait()
+        self.queue.task_done()
+        self.queue.put_nowait(text)
+
+    async def _write(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._on_error(self)
+                return
+            finally:
+                self.queue.task_done()
+
+    def stop(self):
+        """Cancel the writer and discard unsent messages."""
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
 
 
 class WebSocketManager:
-    """Manages WebSocket connections for real-time deal status updates."""
+    """Manages WebSocket connections for real-time deal status updates.
+
+    Clients subscribe to a single deal, or to the firehose of events for
+    all deals (optionally filtered, see DealFilter). Firehose events carry
+    the deal's summary so list views need not refetch. Completion events
+    also carry the extracted fields each subscriber selected (all of them
+    for a deal subscription, none for the firehose unless asked), so the
+    result need not be refetched either.
+
+    With an `event_log`, status events are numbered (`seq`) and logged
+    before they are sent. A new subscriber first gets the deal's current
+    state, or with `last_seq` only the events it missed; live events that
+    arrive meanwhile are held back and sent after, without duplicates.
 
-    def __init__(self):
-        # Map of deal_id -> set of connected websockets
-        self.connections: Dict[str, Set[WebSocket]] = {}
+    A broadcast serializes its message once and queues the text on each
+    subscriber without waiting; per-connection writer tasks do the sends.
+    A slow client therefore delays neither other subscribers nor the
+    extraction that broadcast. When a connection's queue is full, the
+    `slow_consumer_policy` either drops its oldest queued message ("drop")
+    or closes the connection ("disconnect").
 
-    async def connect(self, deal_id: str, websocket: WebSocket):
-        """Accept connection and subscribe to deal updates."""
+    Status events reach subscribers through the `bus`. The default one
+    delivers within this process; with several server processes, use one
+    that delivers to all of them (see event_bus). Streamed partial fields
+    always stay within the process running the extraction.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY,
+        event_log: Optional[DealEventLog] = None,
+        bus: Optional[EventBus] = None,
+    ):
+        if slow_consumer_policy not in (DROP, DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy!r}")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.event_log = event_log
+        self.bus = bus or LocalEventBus()
+        self.bus.subscribe(self._dispatch)
+        # Map of deal_id -> connected websockets and their subscribers
+        self.connections: Dict[str, Dict[WebSocket, Subscriber]] = {}
+        self.firehose: Dict[WebSocket, Subscriber] = {}
+        self._closing: set[asyncio.Task] = set()
+        # Keeps seq order and delivery order the same
+        self._ordered = asyncio.Lock()
+
+        # Counters
+        self.broadcasts = 0
+        self.serialized = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.send_errors = 0
+
+    async def connect(
+        self,
+        deal_id: str,
+        websocket: WebSocket,
+        last_seq: Optional[int] = None,
+        fields: Optional[frozenset[str]] = None,
+    ):
+        """Accept connection and subscribe to deal updates.
+
+        Sends a snapshot of the deal first, or the events after `last_seq`
+        if the log still has them all. Completion events carry the
+        extracted `fields` (default: all).
+        """
         await websocket.accept()
-        if deal_id not in self.connections:
-            self.connections[deal_id] = set()
-        self.connections[deal_id].add(websocket)
+        subscriber = Subscriber(
+            deal_id, websocket, self.queue_size, self._on_send_error, fields=fields
+        )
+        self.connections.setdefault(deal_id, {})[websocket] = subscriber
+        await self._catch_up(subscriber, lambda: self._deal_catch_up(deal_id, last_seq, fields))
 
     def disconnect(self, deal_id: str, websocket: WebSocket):
         """Remove connection from deal subscriptions."""
-        if deal_id in self.connections:
-            self.connections[deal_id].discard(websocket)
-            if not self.connections[deal_id]:
-                del self.connections[deal_id]
+        subscribers = self.connections.get(deal_id)
+        if subscribers is None:
+            return
+        subscriber = subscribers.pop(websocket, None)
+        if subscriber is not None:
+            subscriber.stop()
+        if not subscribers:
+            del self.connections[deal_id]
+
+    async def connect_firehose(
+        self,
+        websocket: WebSocket,
+        deal_filter: Optional[DealFilter] = None,
+        last_seq: Optional[int] = None,
+        fields: frozenset[str] = frozenset(),
+    ):
+        """Accept connection and subscribe to events for all deals matching the filter.
+
+        With `last_seq`, logged events after it are replayed first.
+        Completion events carry the extracted `fields` (default: none).
+        """
+        await websocket.accept()
+        subscriber = Subscriber(
+            None, websocket, self.queue_size, self._on_send_error, deal_filter, fields
+        )
+        self.firehose[websocket] = subscriber
+        await self._catch_up(
+            subscriber,
+            lambda: self._firehose_catch_up(subscriber.deal_filter, last_seq, fields),
+        )
+
+    def disconnect_firehose(self, websocket: WebSocket):
+        """Remove a firehose subscription."""
+        subscriber = self.firehose.pop(websocket, None)
+        if subscriber is not None:
+            subscriber.stop()
+
+    def _remove(self, subscriber: Subscriber):
+        if subscriber.deal_id is None:
+            self.disconnect_firehose(subscriber.websocket)
+        else:
+            self.disconnect(subscriber.deal_id, subscriber.websocket)
+
+    async def _catch_up(
+        self, subscriber: Subscriber, load: Callable[[], Awaitable[list[WebSocketMessage]]]
+    ):
+        """Send catch-up messages, then the live ones that arrived meanwhile."""
+        if self.event_log is None:
+            subscriber.start()
+            return
+        subscriber.backlog = []
+        try:
+            messages = await load()
+            for message in messages:
+                await subscriber.websocket.send_text(message.model_dump_json())
+        except Exception:
+            self._remove(subscriber)
+            raise
+        subscriber.after_seq = max((m.seq for m in messages if m.seq is not None), default=0)
+        backlog, subscriber.backlog = subscriber.backlog, None
+        for seq, text in backlog:
+            if seq is None or seq > subscriber.after_seq:
+                self._offer(subscriber, text)
+        subscriber.start()
+
+    async def _deal_catch_up(
+        self, deal_id: str, last_seq: Optional[int], fields: Optional[frozenset[str]]
+    ) -> list[WebSocketMessage]:
+        if last_seq is not None and await self.event_log.covers(last_seq):
+            rows = await self.event_log.since(last_seq, deal_id)
+            data = None
+            if any(row["status"] == DealStatus.COMPLETED.value for row in rows):
+                deal = await get_deal_by_id(deal_id)
+                data = extracted_data(deal, fields) if deal is not None else None
+            return [
+                WebSocketMessage(
+                    type=STATUS_UPDATE,
+                    deal_id=deal_id,
+                    status=row["status"],
+                    data=data if row["status"] == DealStatus.COMPLETED.value else None,
+                    error=row["error"],
+                    seq=row["seq"],
+                )
+                for row in rows
+            ]
+        # Read the seq first: the state may then be newer, but never older
+        seq = await self.event_log.latest_seq(deal_id)
+        deal = await get_deal_by_id(deal_id)
+        if deal is None:
+            return []
+        data = extracted_data(deal, fields) if deal.status == DealStatus.COMPLETED else None
+        return [WebSocketMessage(
+            type=SNAPSHOT,
+            deal_id=deal_id,
+            status=deal.status,
+            data=data,
+            error=deal.last_error,
+            seq=seq,
+        )]
+
+    async def _firehose_catch_up(
+        self, deal_filter: DealFilter, last_seq: Optional[int], fields: frozenset[str]
+    ) -> list[WebSocketMessage]:
+        if last_seq is None:
+            return []
+        messages = []
+        for row in await self.event_log.since(last_seq):
+            summary = DealSummary(
+                id=row["deal_id"],
+                status=row["status"],
+                company_name=row["company_name"],
+                sector=row["sector"],
+                stage=row["stage"],
+                created_at=row["created_at"],
+            ).model_dump(mode="json")
+            if deal_filter.matches(row["type"], summary):
+                if fields and row["type"] == DEAL_COMPLETED:
+                    deal = await get_deal_by_id(row["deal_id"])
+                    if deal is not None:
+                        summary.update(extracted_data(deal, fields))
+                messages.append(WebSocketMessage(
+                    type=row["type"],
+                    deal_id=row["deal_id"],
+                    status=row["status"],
+                    data=summary,
+                    error=row["error"],
+                    seq=row["seq"],
+                ))
+        return messages
+
+    async def _append(
+        self, deal_id: str, event: str, status: DealStatus, error: Optional[str] = None
+    ) -> Optional[int]:
+        if self.event_log is None:
+            return None
+        return await self.event_log.append(deal_id, event, status.value, error)
+
+    async def broadcast_created(self, deal: Union[DealResponse, DealSummary]):
+        """Tell firehose subscribers about a newly submitted deal."""
+        async with self._ordered:
+            seq = await self._append(deal.id, DEAL_CREATED, deal.status)
+            await self.bus.publish(DealEvent(
+                deal_id=deal.id, type=DEAL_CREATED, status=deal.status, seq=seq, deal=deal
+            ))
 
     async def broadcast_status(
-        self, deal_id: str, status: DealStatus, error: str = None
+        self,
+        deal_id: str,
+        status: DealStatus,
+        error: str = None,
+        extracted: Optional[ExtractedDeal] = None,
     ):
-        """Broadcast status update to all subscribers of a deal."""
+        """Broadcast status update to subscribers of a deal and the firehose.
+
+        Pass `extracted` with a COMPLETED update so subscribers get the
+        result without refetching the deal.
+        """
+        event = DEAL_COMPLETED if status == DealStatus.COMPLETED else STATUS_UPDATE
+        # Just written by the caller, so normally a deal cache hit
+        deal = await get_deal_by_id(deal_id) if self.firehose else None
+
+        async with self._ordered:
+            seq = await self._append(deal_id, event, status, error)
+            await self.bus.publish(DealEvent(
+                deal_id=deal_id,
+                type=event,
+                status=status,
+                error=error,
+                seq=seq,
+                deal=deal,
+                extracted=extracted,
+            ))
+
+    async def _dispatch(self, event: DealEvent):
+        """Deliver an event from the bus to this process's subscribers."""
+        deal, extracted = event.deal, event.extracted
+        # Events from another process, or published before the firehose had
+        # subscribers, come without the deal
+        completed = event.remote and event.type == DEAL_COMPLETED
+        if deal is None and (self.firehose or completed and event.deal_id in self.connections):
+            deal = await get_deal_by_id(event.deal_id)
+            if completed:
+                extracted = deal
+        if event.type != DEAL_CREATED and event.deal_id in self.connections:
+            message = WebSocketMessage(
+                type=STATUS_UPDATE,
+                deal_id=event.deal_id,
+                status=event.status,
+                error=event.error,
+                seq=event.seq,
+            )
+            self._publish(event.deal_id, message, extracted)
+        if deal is not None:
+            self._publish_firehose(
+                event.type, deal, event.status, event.error, event.seq, extracted
+            )
+
+    async def broadcast_partial(self, deal_id: str, event: dict):
+        """Broadcast a field (or array item) streamed from an in-progress extraction."""
         if deal_id not in self.connections:
             return
 
         message = WebSocketMessage(
-            type="status_update",
+            type="partial_field",
             deal_id=deal_id,
+            status=DealStatus.EXTRACTING,
+            data=event,
+        )
+        self._publish(deal_id, message)
+
+    def _publish(
+        self, deal_id: str, message: WebSocketMessage, extracted: Optional[BaseModel] = None
+    ):
+        self._deliver(list(self.connections.get(deal_id, {}).values()), message, extracted)
+
+    def _publish_firehose(
+        self,
+        event: str,
+        deal: Union[DealResponse, DealSummary],
+        status: DealStatus,
+        error: Optional[str] = None,
+        seq: Optional[int] = None,
+        extracted: Optional[BaseModel] = None,
+    ):
+        summary = DealSummary(
+            id=deal.id,
             status=status,
-            error=error,
+            company_name=deal.company_name,
+            sector=deal.sector,
+            stage=deal.stage,
+            created_at=deal.created_at,
+        ).model_dump(mode="json")
+        subscribers = [
+            s for s in self.firehose.values() if s.deal_filter.matches(event, summary)
+        ]
+        if subscribers:
+            message = WebSocketMessage(
+                type=event, deal_id=deal.id, status=status, data=summary, error=error, seq=seq
+            )
+            self._deliver(subscribers, message, extracted)
+
+    def _deliver(
+        self,
+        subscribers: list[Subscriber],
+        message: WebSocketMessage,
+        extracted: Optional[BaseModel] = None,
+    ):
+        """Queue a message on each subscriber, serialized once per field selection."""
+        texts: dict[Optional[frozenset[str]], str] = {}
+        self.broadcasts += 1
+        # A slow subscriber may be disconnected while we iterate
+        for subscriber in subscribers:
+            if message.seq is not None and message.seq <= subscriber.after_seq:
+                continue
+            key = subscriber.fields if extracted is not None else None
+            text = texts.get(key)
+            if text is None:
+                text = texts[key] = self._serialize(message, extracted, key)
+            if subscriber.backlog is not None:
+                subscriber.backlog.append((message.seq, text))
+            else:
+                self._offer(subscriber, text)
+
+    def _serialize(
+        self,
+        message: WebSocketMessage,
+        extracted: Optional[BaseModel],
+        fields: Optional[frozenset[str]],
+    ) -> str:
+        self.serialized += 1
+        if extracted is not None:
+            data = {**(message.data or {}), **extracted_data(extracted, fields)}
+            message = message.model_copy(update={"data": data})
+        return message.model_dump_json()
+
+    def _offer(self, subscriber: Subscriber, text: str):
+        if subscriber.offer(text):
+            return
+        if self.slow_consumer_policy == DROP:
+            subscriber.replace_oldest(text)
+            self.dropped += 1
+        else:
+            self._disconnect_slow(subscriber)
+
+    def _disconnect_slow(self, subscriber: Subscriber):
+        logger.warning(
+            "[%s] Disconnecting WebSocket client %d message(s) behind",
+            subscriber.deal_id, subscriber.queue.qsize(),
         )
+        self.slow_disconnects += 1
+        self._remove(subscriber)
+        # Closing may block on the same slow client, so don't wait for it
+        task = asyncio.create_task(self._close(subscriber.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
 
-        dead_connections = set()
-        for websocket in self.connections[deal_id]:
-            try:
-                await websocket.send_text(message.model_dump_json())
-            except Exception:
-                dead_connections.add(websocket)
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), WS_SEND_TIMEOUT
+            )
+        except Exception:
+            pass
+
+    def _on_send_error(self, subscriber: Subscriber):
+        self.send_errors += 1
+        self._remove(subscriber)
+
+    async def flush(self):
+        """Wait until every queued message has been sent (or dropped)."""
+        for subscriber in self._subscribers():
+            await subscriber.queue.join()
+
+    def _subscribers(self) -> list[Subscriber]:
+        subscribers = [s for subs in self.connections.values() for s in subs.values()]
+        return subscribers + list(self.firehose.values())
 
-        # Clean up dead connections
-        for ws in dead_connections:
-            self.connections[deal_id].discard(ws)
+    def stats(self) -> dict:
+        subscribers = self._subscribers()
+        return {
+            "connections": len(subscribers),
+            "deals": len(self.connections),
+            "firehose": len(self.firehose),
+            "queued": sum(s.queue.qsize() for s in subscribers),
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "broadcasts": self.broadcasts,
+            "serialized": self.serialized,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "send_errors": self.send_errors,
+        }
 
 
 # Global instance
-ws_manager = WebSocketManager()
+_event_log = DealEventLog()
+ws_manager = WebSocketManager(event_log=_event_log, bus=create_event_bus(_event_log))
@@ -23,6 +23,13 @@ interface DealDetailProps {
   onClose: () => void
 }
 
+const overviewLabels: Record<string, string> = {
+  sector: 'Sector',
+  geography: 'Geography',
+  stage: 'Stage',
+  round_size: 'Round Size',
+}
+
 const statusColors: Record<string, string> = {
   pending: '#ff9800',
   extracting: '#2196f3',
@@ -34,7 +41,7 @@ const statusColors: Record<string, string> = {
 export function DealDetail({ dealId, onClose }: DealDetailProps) {
   const [deal, setDeal] = useState<Deal | null>(null)
   const [loading, setLoading] = useState(true)
-  const { status: wsStatus } = useWebSocket(dealId)
+  const { status: wsStatus, error: wsError, partial, extracted } = useWebSocket(dealId)
 
   useEffect(() => {
     const fetchDeal = async () => {
@@ -53,15 +60,22 @@ export function DealDetail({ dealId, onClose }: DealDetailProps) {
     fetchDeal()
   }, [dealId])
 
-  // Refetch when WebSocket status changes
+  // Status updates and the completion event carry everything that changes,
+  // so apply them in place instead of refetching the deal
+  useEffect(() => {
+    if (!wsStatus) return
+    setDeal((prev) => prev && {
+      ...prev,
+      status: wsStatus,
+      last_error: wsStatus === 'failed' ? wsError : prev.last_error,
+    })
+  }, [wsStatus, wsError])
+
   useEffect(() => {
-    if (wsStatus && deal && wsStatus !== deal.status) {
-      fetch(`/api/deals/${dealId}`)
-        .then((res) => res.json())
-        .then(setDeal)
-        .catch(console.error)
+    if (extracted) {
+      setDeal((prev) => prev && { ...prev, ...(extracted as Partial<Deal>) })
     }
-  }, [wsStatus, dealId, deal])
+  }, [extracted])
 
   if (loading) {
     return <div style={styles.container}>Loading...</div>
@@ -72,11 +86,18 @@ export function DealDetail({ dealId, onClose }: DealDetailProps) {
   }
 
   const currentStatus = wsStatus || deal.status
+  const streamedName = typeof partial.company_name === 'string' ? partial.company_name : null
+  const streamedBrief = Array.isArray(partial.investment_brief)
+    ? (partial.investment_brief as string[]).filter(Boolean)
+    : []
+  const streamedOverview = (['sector', 'geography', 'stage', 'round_size'] as const).filter(
+    (key) => typeof partial[key] === 'string' && partial[key]
+  )
 
   return (
     <div style={styles.container}>
       <div style={styles.header}>
-        <h2 style={styles.title}>{deal.company_name || 'Processing...'}</h2>
+        <h2 style={styles.title}>{deal.company_name || streamedName || 'Processing...'}</h2>
         <button onClick={onClose} style={styles.closeButton}>×</button>
       </div>
 
@@ -94,6 +115,32 @@ export function DealDetail({ dealId, onClose }: DealDetailProps) {
         )}
       </div>
 
+      {currentStatus !== 'completed' && (streamedOverview.length > 0 || streamedBrief.length > 0) && (
+        <>
+          {streamedOverview.length > 0 && (
+            <section style={styles.section}>
+              <h3 style={styles.sectionTitle}>Overview</h3>
+              <div style={styles.grid}>
+                {streamedOverview.map((key) => (
+                  <Field key={key} label={overviewLabels[key]} value={partial[key] as string} />
+                ))}
+              </div>
+            </section>
+          )}
+
+          {streamedBrief.length > 0 && (
+            <section style={styles.section}>
+              <h3 style={styles.sectionTitle}>Investment Brief</h3>
+              <ul style={styles.bullets}>
+                {streamedBrief.map((bullet, i) => (
+                  <li key={i}>{bullet}</li>
+                ))}
+              </ul>
+            </section>
+          )}
+        </>
+      )}
+
       {currentStatus === 'completed' && (
         <>
           <section style={styles.section}>
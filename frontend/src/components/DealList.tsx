@@ -9,11 +9,23 @@ interface Deal {
   created_at: string
 }
 
+interface DealEvent {
+  type: 'deal_created' | 'status_update' | 'deal_completed'
+  deal_id: string
+  status: string
+  data: Deal
+  error?: string
+  seq: number | null
+}
+
 interface DealListProps {
   onSelect: (dealId: string) => void
   refreshTrigger: number
 }
 
+const PAGE_SIZE = 10
+const RECONNECT_DELAY_MS = 2000
+
 const statusColors: Record<string, string> = {
   pending: '#ff9800',
   extracting: '#2196f3',
@@ -22,16 +34,28 @@ const statusColors: Record<string, string> = {
   failed: '#f44336',
 }
 
+function applyEvent(deals: Deal[], event: DealEvent): Deal[] {
+  if (event.type === 'deal_created') {
+    if (deals.some((deal) => deal.id === event.deal_id)) return deals
+    return [event.data, ...deals].slice(0, PAGE_SIZE)
+  }
+  // Deals outside the visible page are ignored
+  return deals.map((deal) => (deal.id === event.deal_id ? event.data : deal))
+}
+
 export function DealList({ onSelect, refreshTrigger }: DealListProps) {
   const [deals, setDeals] = useState<Deal[]>([])
   const [loading, setLoading] = useState(true)
+  // Event seq the first list was read at; the firehose resumes from it
+  const [listSeq, setListSeq] = useState<number | null>(null)
 
   useEffect(() => {
     const fetchDeals = async () => {
       try {
-        const res = await fetch('/api/deals')
+        const res = await fetch(`/api/deals?limit=${PAGE_SIZE}`)
         const data = await res.json()
         setDeals(data.deals)
+        setListSeq((prev) => prev ?? data.last_seq ?? 0)
       } catch (err) {
         console.error('Failed to fetch deals:', err)
       } finally {
@@ -40,10 +64,45 @@ export function DealList({ onSelect, refreshTrigger }: DealListProps) {
     }
 
     fetchDeals()
-    const interval = setInterval(fetchDeals, 5000)
-    return () => clearInterval(interval)
   }, [refreshTrigger])
 
+  // Live updates for every deal over one WebSocket instead of polling.
+  // Opened once the first list has loaded, so changes made in between are
+  // replayed rather than lost.
+  useEffect(() => {
+    if (listSeq === null) return
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+    let ws: WebSocket | null = null
+    let reconnect: number | undefined
+    let stopped = false
+    // Last event seen; the server replays anything after it
+    let lastSeq = listSeq
+
+    const connect = () => {
+      ws = new WebSocket(`${protocol}//${window.location.host}/ws/deals?last_seq=${lastSeq}`)
+      ws.onmessage = (event) => {
+        const message: DealEvent = JSON.parse(event.data)
+        if (message.seq !== null) {
+          if (message.seq <= lastSeq) return
+          lastSeq = message.seq
+        }
+        setDeals((prev) => applyEvent(prev, message))
+      }
+      ws.onclose = () => {
+        if (!stopped) {
+          reconnect = window.setTimeout(connect, RECONNECT_DELAY_MS)
+        }
+      }
+    }
+
+    connect()
+    return () => {
+      stopped = true
+      window.clearTimeout(reconnect)
+      ws?.close()
+    }
+  }, [listSeq])
+
   if (loading) {
     return <p>Loading deals...</p>
   }
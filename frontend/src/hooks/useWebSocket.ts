@@ -1,51 +1,100 @@
-import { useEffect, useRef, useCallback, useState } from 'react'
+import { useEffect, useState } from 'react'
+
+interface PartialField {
+  field: string
+  value: unknown
+  index?: number
+}
 
 interface WebSocketMessage {
   type: string
   deal_id: string
   status: string
+  // A streamed field for partial_field messages; extracted fields on completion
+  data?: PartialField | Record<string, unknown>
   error?: string
+  seq?: number | null
 }
 
+// Fields streamed from an in-progress extraction, keyed by field name
+export type PartialDeal = Record<string, unknown>
+
+// Extracted fields sent with the completion event (or a completed snapshot)
+export type ExtractedFields = Record<string, unknown>
+
+const RECONNECT_DELAY_MS = 2000
+const TERMINAL_STATUSES = ['completed', 'failed']
+
 export function useWebSocket(dealId: string | null) {
   const [status, setStatus] = useState<string | null>(null)
   const [error, setError] = useState<string | null>(null)
-  const wsRef = useRef<WebSocket | null>(null)
+  const [partial, setPartial] = useState<PartialDeal>({})
+  const [extracted, setExtracted] = useState<ExtractedFields | null>(null)
 
-  const connect = useCallback(() => {
+  useEffect(() => {
+    setPartial({})
+    setExtracted(null)
     if (!dealId) return
 
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
-    const wsUrl = `${protocol}//${window.location.host}/ws/deals/${dealId}`
+    let ws: WebSocket | null = null
+    let reconnect: number | undefined
+    let stopped = false
+    let finished = false
+    // Last event seen; sent on reconnect so only missed events are replayed
+    let lastSeq: number | null = null
 
-    const ws = new WebSocket(wsUrl)
-    wsRef.current = ws
+    const connect = () => {
+      const query = lastSeq === null ? '' : `?last_seq=${lastSeq}`
+      ws = new WebSocket(`${protocol}//${window.location.host}/ws/deals/${dealId}${query}`)
 
-    ws.onmessage = (event) => {
-      const message: WebSocketMessage = JSON.parse(event.data)
-      setStatus(message.status)
-      if (message.error) {
-        setError(message.error)
+      ws.onmessage = (event) => {
+        const message: WebSocketMessage = JSON.parse(event.data)
+        if (message.seq != null) {
+          if (message.type !== 'snapshot' && lastSeq !== null && message.seq <= lastSeq) {
+            return
+          }
+          lastSeq = Math.max(lastSeq ?? 0, message.seq)
+        }
+        if (message.type === 'partial_field' && message.data) {
+          const { field, value, index } = message.data as PartialField
+          setPartial((prev) => {
+            if (index === undefined) {
+              return { ...prev, [field]: value }
+            }
+            const items = Array.isArray(prev[field]) ? [...(prev[field] as unknown[])] : []
+            items[index] = value
+            return { ...prev, [field]: items }
+          })
+        } else if (message.status === 'completed' && message.data) {
+          setExtracted(message.data)
+        }
+        finished = TERMINAL_STATUSES.includes(message.status)
+        setStatus(message.status)
+        if (message.error) {
+          setError(message.error)
+        }
       }
-    }
 
-    ws.onerror = () => {
-      setError('WebSocket connection error')
-    }
+      ws.onerror = () => {
+        setError('WebSocket connection error')
+      }
 
-    ws.onclose = () => {
-      wsRef.current = null
+      ws.onclose = () => {
+        ws = null
+        if (!stopped && !finished) {
+          reconnect = window.setTimeout(connect, RECONNECT_DELAY_MS)
+        }
+      }
     }
 
+    connect()
     return () => {
-      ws.close()
+      stopped = true
+      window.clearTimeout(reconnect)
+      ws?.close()
     }
   }, [dealId])
 
-  useEffect(() => {
-    const cleanup = connect()
-    return cleanup
-  }, [connect])
-
-  return { status, error }
+  return { status, error, partial, extracted }
 }
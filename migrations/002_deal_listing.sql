@@ -0,0 +1,18 @@
+-- Keyset pagination on (created_at, id) with optional filters.
+CREATE INDEX IF NOT EXISTS idx_deals_created_id ON deals(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_deals_status_created ON deals(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_deals_stage_created ON deals(stage, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_deals_sector_created ON deals(sector, created_at DESC, id DESC);
+
+-- One row per (tag, deal) so tag filters can seek and paginate by
+-- (created_at, id) without scanning the JSON tags column.
+CREATE TABLE IF NOT EXISTS deal_tags (
+    tag TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    deal_id TEXT NOT NULL,
+    PRIMARY KEY (tag, created_at, deal_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_deal_tags_deal ON deal_tags(deal_id);
+
+-- Existing rows are backfilled in chunks by 003_backfill_deal_tags.sql.
@@ -0,0 +1,6 @@
+-- backfill: table=deals batch_size=1000
+-- Populate deal_tags for deals extracted before the table existed.
+INSERT OR IGNORE INTO deal_tags (tag, created_at, deal_id)
+SELECT DISTINCT lower(j.value), d.created_at, d.id
+FROM deals d, json_each(d.tags) j
+WHERE d.rowid > :start AND d.rowid <= :end AND d.tags IS NOT NULL;
@@ -0,0 +1,21 @@
+-- Durable extraction job queue leased by the worker pool.
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deal_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued | leased | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    available_at TIMESTAMP NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, available_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_expires_at);
+
+-- At most one queued or running job per deal
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_deal
+    ON jobs(deal_id) WHERE status IN ('queued', 'leased');
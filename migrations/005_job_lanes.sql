@@ -0,0 +1,4 @@
+-- Priority lanes for the extraction job queue.
+ALTER TABLE jobs ADD COLUMN lane TEXT NOT NULL DEFAULT 'interactive';
+
+CREATE INDEX IF NOT EXISTS idx_jobs_lane_ready ON jobs(lane, status, available_at, id);
@@ -0,0 +1,14 @@
+-- One row per model tier tried for a deal by the extraction cascade.
+CREATE TABLE IF NOT EXISTS extraction_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deal_id TEXT NOT NULL,
+    tier INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    reason TEXT,
+    latency_ms REAL NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_extraction_attempts_deal ON extraction_attempts(deal_id, id);
+CREATE INDEX IF NOT EXISTS idx_extraction_attempts_model ON extraction_attempts(tier, model);
@@ -0,0 +1,12 @@
+-- Append-only log of deal status events. seq orders every event across all
+-- deals, so WebSocket clients can resume from the last one they saw.
+CREATE TABLE IF NOT EXISTS deal_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    deal_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_deal_events_deal ON deal_events(deal_id, seq);